@@ -0,0 +1,113 @@
+"""Binary encoding of Redis cache entries.
+
+Every entry starts with one format byte, so the layout can change without
+misreading old values: an entry with an unknown format byte (including the
+plain-JSON text written before this module existed) decodes as a cache miss
+and is simply rebuilt.
+
+- FORMAT_JSON: UTF-8 JSON
+- FORMAT_JSON_ZLIB: zlib-compressed JSON, used above `compress_threshold`
+  bytes (zones with their polygons, menu items)
+
+JSON is produced by orjson when it is installed and by the standard library
+otherwise; both read each other's output.
+
+Benchmark with `python -m backend.cache_codec`.
+"""
+import json
+import zlib
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+FORMAT_JSON = 1
+FORMAT_JSON_ZLIB = 2
+
+COMPRESS_THRESHOLD = 4096  # bytes of JSON
+COMPRESS_LEVEL = 1         # the payloads are repetitive; speed matters more
+
+
+class CacheDecodeError(ValueError):
+    """Entry in an unknown or corrupt format; treat as a miss"""
+
+
+def _dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=str, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class CacheCodec:
+    def __init__(self, compress_threshold: int = COMPRESS_THRESHOLD, level: int = COMPRESS_LEVEL):
+        self.compress_threshold = compress_threshold
+        self.level = level
+
+    def encode(self, data: Any) -> bytes:
+        body = _dumps(data)
+        if len(body) >= self.compress_threshold:
+            return bytes([FORMAT_JSON_ZLIB]) + zlib.compress(body, self.level)
+        return bytes([FORMAT_JSON]) + body
+
+    def decode(self, raw: bytes) -> Any:
+        if not raw:
+            raise CacheDecodeError("empty cache entry")
+        fmt, body = raw[0], raw[1:]
+        try:
+            if fmt == FORMAT_JSON:
+                return _loads(body)
+            if fmt == FORMAT_JSON_ZLIB:
+                return _loads(zlib.decompress(body))
+        except (ValueError, zlib.error) as e:
+            raise CacheDecodeError(str(e)) from e
+        raise CacheDecodeError(f"unknown cache format {fmt}")
+
+
+def _benchmark(rounds: int = 2000):
+    """Compare the legacy text JSON entries with the codec on zone/menu-sized payloads"""
+    import random
+    import time
+
+    zones = [{
+        "_id": f"{i:024x}", "name": f"Зона {i}", "color": "#22c55e", "enabled": True,
+        "delivery_fee": 50, "min_order_amount": 300, "priority": i,
+        "geometry": {"type": "Polygon", "coordinates": [[
+            [24.71 + random.random() / 10, 48.92 + random.random() / 10] for _ in range(65)
+        ]]},
+    } for i in range(12)]
+    menu = [{
+        "_id": f"{i:024x}", "name": f"Страва {i}", "description": "Опис страви " * 5,
+        "price": 120 + i, "category_id": f"{i % 10:024x}", "available": True,
+        "modifier_ids": [f"{j:024x}" for j in range(4)], "tags": ["popular", "new"],
+    } for i in range(150)]
+
+    codec = CacheCodec()
+    for name, payload in (("zones", zones), ("menu", menu)):
+        legacy = json.dumps(payload, default=str)
+        encoded = codec.encode(payload)
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            json.loads(legacy)
+        legacy_us = (time.perf_counter() - start) / rounds * 1e6
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            codec.decode(encoded)
+        codec_us = (time.perf_counter() - start) / rounds * 1e6
+
+        print(f"{name:6} legacy {len(legacy.encode()):7d} B {legacy_us:8.1f} us/decode | "
+              f"codec {len(encoded):7d} B {codec_us:8.1f} us/decode "
+              f"(format {encoded[0]}, orjson={'yes' if orjson else 'no'})")
+
+
+if __name__ == "__main__":
+    _benchmark()
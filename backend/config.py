@@ -1,3 +1,5 @@
+import hashlib
+import hmac
 import os
 from dotenv import load_dotenv
 
@@ -14,10 +16,27 @@ REDIS_URL = os.getenv("REDIS_URL")
 if not REDIS_URL:
     raise ValueError("REDIS_URL environment variable is required. Set it in .env file.")
 
-# Redis Pub/Sub channels
-CHANNEL_ORDERS_NEW = "pos:orders:new"
-CHANNEL_STATS_UPDATE = "pos:stats:update"
-REDIS_CHANNELS = [CHANNEL_ORDERS_NEW, CHANNEL_STATS_UPDATE]
+# Redis Pub/Sub invalidation channels (order events go through STREAM_ORDERS)
+CHANNEL_SETTINGS = "pos:settings:invalidate"
+CHANNEL_MENU = "pos:menu:invalidate"
+CHANNEL_ZONES = "pos:zones:invalidate"
+CHANNEL_CACHE = "pos:cache:invalidate"
+CHANNEL_PROMO = "pos:promo:invalidate"
+
+# WebSocket fan-out: max queued messages per client before it is evicted
+WS_CLIENT_QUEUE_SIZE = int(os.getenv("WS_CLIENT_QUEUE_SIZE", "100"))
+# Lets a /ws connection subscribe to the "kitchen" topic (every order in full).
+# Defaults to a secret derived from MONGODB_URL, so all workers agree on it
+WS_STAFF_TOKEN = os.getenv("WS_STAFF_TOKEN") or hmac.new(
+    MONGODB_URL.encode(), b"ws-staff", hashlib.sha256
+).hexdigest()
+
+# Order numbers reserved per worker in one counter round-trip (1 = no pre-allocation)
+ORDER_NUMBER_BLOCK_SIZE = max(1, int(os.getenv("ORDER_NUMBER_BLOCK_SIZE", "1")))
+
+# Background jobs: concurrent workers per process and attempts before dead-lettering
+JOB_WORKERS = max(1, int(os.getenv("JOB_WORKERS", "2")))
+JOB_MAX_ATTEMPTS = max(1, int(os.getenv("JOB_MAX_ATTEMPTS", "5")))
 
 # Restaurant settings
 RESTAURANT_NAME = "PoS"
@@ -28,6 +47,9 @@ RESTAURANT_HOURS = "08:00 - 21:00"
 # Telegram Bot settings
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+# Notifications arriving within this many seconds are sent as one digest
+TELEGRAM_DIGEST_WINDOW = float(os.getenv("TELEGRAM_DIGEST_WINDOW", "2"))
 
 # Google Maps API (for delivery zone geocoding)
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
@@ -1,42 +1,47 @@
+import asyncio
 import logging
-from pymongo.mongo_client import MongoClient
+from pymongo import AsyncMongoClient
 from pymongo.server_api import ServerApi
-from pymongo.database import Database
-from pymongo.collection import Collection
+from pymongo.asynchronous.database import AsyncDatabase
+from pymongo.asynchronous.collection import AsyncCollection
 from .config import MONGODB_URL, MONGODB_DB_NAME
+from .indexes import ensure_indexes
 
 logger = logging.getLogger(__name__)
 
-client: MongoClient = None
-db: Database = None
+client: AsyncMongoClient = None
+db: AsyncDatabase = None
 connected: bool = False
+_index_task: asyncio.Task = None
 
 # Collections
-products: Collection = None
-orders: Collection = None
-categories: Collection = None
-settings: Collection = None
-feedbacks: Collection = None
-promo_codes: Collection = None
-modifiers: Collection = None
-combos: Collection = None
-menu_items: Collection = None
-product_tags: Collection = None
-audit_logs: Collection = None
-projects: Collection = None
-delivery_zones: Collection = None
-branches: Collection = None
-customers: Collection = None
-customer_categories: Collection = None
-site_pages: Collection = None
-
-
-def connect_db():
-    """Connect to MongoDB Atlas"""
-    global client, db, products, orders, categories, settings, feedbacks, promo_codes, modifiers, combos, menu_items, product_tags, audit_logs, projects, delivery_zones, branches, customers, customer_categories, site_pages, connected
+products: AsyncCollection = None
+orders: AsyncCollection = None
+categories: AsyncCollection = None
+settings: AsyncCollection = None
+feedbacks: AsyncCollection = None
+promo_codes: AsyncCollection = None
+modifiers: AsyncCollection = None
+combos: AsyncCollection = None
+menu_items: AsyncCollection = None
+product_tags: AsyncCollection = None
+audit_logs: AsyncCollection = None
+projects: AsyncCollection = None
+delivery_zones: AsyncCollection = None
+branches: AsyncCollection = None
+customers: AsyncCollection = None
+customer_categories: AsyncCollection = None
+site_pages: AsyncCollection = None
+counters: AsyncCollection = None
+sales_rollups: AsyncCollection = None
+
+
+async def connect_db():
+    """Connect to MongoDB Atlas using the async driver"""
+    global client, db, products, orders, categories, settings, feedbacks, promo_codes, modifiers, combos, menu_items, product_tags, audit_logs, projects, delivery_zones, branches, customers, customer_categories, site_pages, counters, sales_rollups, connected, _index_task
 
     try:
-        client = MongoClient(MONGODB_URL, server_api=ServerApi('1'))
+        client = AsyncMongoClient(MONGODB_URL, server_api=ServerApi('1'))
         db = client[MONGODB_DB_NAME]
 
         products = db["products"]
@@ -56,71 +61,106 @@ def connect_db():
         customers = db["customers"]
         customer_categories = db["customer_categories"]
         site_pages = db["site_pages"]
-
-        # Create indexes
-        products.create_index("category_id")
-        products.create_index("available")
-        products.create_index("tags")
-        products.create_index("is_alcohol")
-        products.create_index("project_id")
-        orders.create_index("created_at")
-        orders.create_index("status")
-        categories.create_index("sort_order")
-        feedbacks.create_index("created_at")
-        promo_codes.create_index("code", unique=True)
-        combos.create_index("available")
-        menu_items.create_index("product_id")
-        menu_items.create_index("is_active")
-        menu_items.create_index("sort_order")
-        product_tags.create_index("name", unique=True)
-        audit_logs.create_index([("created_at", -1)])
-        audit_logs.create_index("entity_type")
-        projects.create_index("name")
-        delivery_zones.create_index([("geometry", "2dsphere")])
-        delivery_zones.create_index("enabled")
-        delivery_zones.create_index("priority")
-        branches.create_index("name")
-        branches.create_index("is_active")
-        customers.create_index("phone", unique=True)
-        customers.create_index("category_ids")
-        customers.create_index([("created_at", -1)])
-        customers.create_index([("total_spent", -1)])
-        customer_categories.create_index("name")
-        customer_categories.create_index("is_active")
-        site_pages.create_index("sort_order")
-        site_pages.create_index("is_published")
-        site_pages.create_index([("sort_order", 1), ("is_published", 1)])
-
-        orders.create_index("order_type")
-        orders.create_index("payment_status")
-
-        # Compound indexes for common query patterns
-        orders.create_index([("status", 1), ("created_at", -1)])
-        orders.create_index([("order_type", 1), ("created_at", -1)])
-        products.create_index([("category_id", 1), ("available", 1)])
-        menu_items.create_index([("item_type", 1), ("combo_id", 1)])
-        menu_items.create_index([("item_type", 1), ("product_id", 1)])
-        audit_logs.create_index([("entity_type", 1), ("entity_id", 1)])
-        promo_codes.create_index([("is_active", 1), ("valid_from", 1), ("valid_to", 1)])
+        counters = db["counters"]
+        sales_rollups = db["sales_rollups"]
 
         # Test connection
-        client.admin.command('ping')
+        await client.admin.command('ping')
         connected = True
         logger.info("Connected to MongoDB: %s", MONGODB_DB_NAME)
+
+        # Index DDL runs in the background and is a no-op once the spec is applied
+        _index_task = asyncio.create_task(ensure_indexes(db))
     except Exception as e:
         connected = False
         logger.error("MongoDB connection failed: %s", e, exc_info=True)
         logger.info("Running in demo mode without database")
 
 
-def close_db():
+async def close_db():
     """Close MongoDB connection"""
     global client
+    if _index_task and not _index_task.done():
+        _index_task.cancel()
     if client:
-        client.close()
+        await client.close()
         logger.info("MongoDB connection closed")
 
 
-def get_db() -> Database:
+def get_db() -> AsyncDatabase:
     """Get database instance"""
     return db
+
+
+def _benchmark(requests: int = 2000, concurrency: int = 50, docs: int = 500):
+    """Concurrent reads through the old sync client vs the async driver.
+
+    Needs a reachable MONGODB_URL; works on a scratch database that is
+    dropped afterwards. "sync" is how handlers used to call PyMongo: a
+    blocking call inside async def, which stalls the event loop for the
+    whole round-trip, so concurrent requests queue behind each other.
+    """
+    import time
+    from pymongo import MongoClient
+
+    bench_db = f"{MONGODB_DB_NAME}_benchmark"
+
+    async def measure(label, read):
+        lag = 0.0
+        done = asyncio.Event()
+
+        async def ticker():
+            # How late a 1 ms timer fires: what every other request waits
+            nonlocal lag
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.001)
+                lag = max(lag, time.perf_counter() - start - 0.001)
+
+        async def worker(n):
+            for i in range(n, requests, concurrency):
+                await read(i)
+
+        tick = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await tick
+        print(f"{label:5} {requests} reads x{concurrency} in {elapsed * 1000:8.1f} ms "
+              f"({requests / elapsed:7.0f} req/s), max event loop lag {lag * 1000:6.1f} ms")
+
+    async def run():
+        sync_client = MongoClient(MONGODB_URL, server_api=ServerApi('1'))
+        async_client = AsyncMongoClient(MONGODB_URL, server_api=ServerApi('1'))
+        sync_orders = sync_client[bench_db]["orders"]
+        async_orders = async_client[bench_db]["orders"]
+        try:
+            await async_orders.drop()
+            await async_orders.insert_many([
+                {"n": i, "status": "new", "total": 100 + i % 50, "items": [{"name": "Капучіно", "qty": 1, "price": 65}]}
+                for i in range(docs)
+            ])
+            await async_orders.create_index("n")
+
+            async def sync_read(i):
+                sync_orders.find_one({"n": i % docs})
+
+            async def async_read(i):
+                await async_orders.find_one({"n": i % docs})
+
+            # Warm up both connection pools
+            await sync_read(0)
+            await async_read(0)
+            await measure("sync", sync_read)
+            await measure("async", async_read)
+        finally:
+            await async_client.drop_database(bench_db)
+            sync_client.close()
+            await async_client.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,126 @@
+"""Idempotency keys for POST requests that must not run twice.
+
+The client sends the same Idempotency-Key header with every retry of one
+logical request. The first request to arrive claims the key in Redis (SET
+NX with a short PENDING_TTL) and, once it has succeeded, stores its
+response there for IDEMPOTENCY_TTL. A duplicate arriving while the first
+is still running waits for its result - through a shared future in the
+same process, by polling the key across workers - and one arriving later
+gets the stored response replayed. A failed request releases its key so
+the client can retry.
+
+Redis only makes duplicates cheap; it is not the guarantee. When it is
+unavailable begin() lets the request through, so the caller must also
+store the key under a unique index (orders.idempotency_key).
+"""
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from .redis_manager import redis_manager
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = 86400  # 24 hours
+PENDING_TTL = 60         # a crashed request's claim expires after this
+WAIT_TIMEOUT = 15        # how long a duplicate waits for the first request
+POLL_INTERVAL = 0.1
+
+_PENDING = json.dumps({"state": "pending"})
+
+
+class IdempotencyConflict(Exception):
+    """The first request with this key is still running"""
+
+
+class IdempotencyStore:
+    def __init__(self, prefix: str, ttl: int = IDEMPOTENCY_TTL):
+        self.prefix = prefix
+        self.ttl = ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def _claim(self, key: str) -> Optional[dict]:
+        """None if the key is now ours, else its current state"""
+        if redis_manager.redis is None:
+            return None
+        try:
+            if await redis_manager.redis.set(self._redis_key(key), _PENDING, nx=True, ex=PENDING_TTL):
+                return None
+            raw = await redis_manager.redis.get(self._redis_key(key))
+        except Exception as e:
+            logger.error("Idempotency store unavailable: %s", e)
+            return None
+        try:
+            return json.loads(raw) if raw else {"state": "pending"}
+        except ValueError:
+            return {"state": "pending"}
+
+    async def begin(self, key: str) -> Optional[Any]:
+        """Claim `key` for this request.
+
+        Returns None when the caller should run the request (and then call
+        complete() or abort()), or the response of the request that already
+        ran under this key. Raises IdempotencyConflict if that request is
+        still running after WAIT_TIMEOUT.
+        """
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while True:
+            future = self._inflight.get(key)
+            if future is not None:
+                try:
+                    response = await asyncio.wait_for(
+                        asyncio.shield(future), max(deadline - time.monotonic(), 0)
+                    )
+                except asyncio.TimeoutError:
+                    raise IdempotencyConflict(key)
+                if response is not None:
+                    return response
+                continue  # the first request failed; try to claim the key
+
+            state = await self._claim(key)
+            if key in self._inflight:
+                continue  # claimed by another request of this process meanwhile
+            if state is None:
+                self._inflight[key] = asyncio.get_running_loop().create_future()
+                return None
+            if state.get("state") == "done":
+                return state.get("response")
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict(key)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def complete(self, key: str, response: Any):
+        """Store the response and hand it to the waiting duplicates"""
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(response)
+        if redis_manager.redis is None:
+            return
+        try:
+            await redis_manager.redis.set(
+                self._redis_key(key),
+                json.dumps({"state": "done", "response": response}, default=str),
+                ex=self.ttl
+            )
+        except Exception as e:
+            logger.error("Failed to store idempotent response: %s", e)
+
+    async def abort(self, key: str):
+        """Release the key after a failed request"""
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(None)
+        if redis_manager.redis is None:
+            return
+        try:
+            await redis_manager.redis.delete(self._redis_key(key))
+        except Exception as e:
+            logger.error("Failed to release idempotency key: %s", e)
+
+
+order_idempotency = IdempotencyStore("idem:orders")
@@ -0,0 +1,201 @@
+"""Declarative MongoDB index spec.
+
+INDEX_SPEC lists every index the app relies on. On startup
+ensure_indexes() runs in the background: it compares the hash of the spec
+with the one stored in counters[INDEX_MARKER_ID] and, only when they
+differ, diffs the spec against list_indexes() and builds what is missing.
+One worker claims the build at a time; the others skip it. Worker boot
+never waits for index DDL.
+
+Apply or verify by hand with `python -m backend.migrations.indexes`.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+logger = logging.getLogger(__name__)
+
+INDEX_MARKER_ID = "indexes:spec"
+BUILD_LEASE = timedelta(minutes=10)  # a crashed builder's claim expires after this
+
+
+def index(*fields, **options) -> dict:
+    """One index: fields are names (ascending) or (name, direction) pairs"""
+    keys = [(f, ASCENDING) if isinstance(f, str) else tuple(f) for f in fields]
+    return {"keys": keys, **options}
+
+
+INDEX_SPEC: Dict[str, List[dict]] = {
+    "products": [
+        index("category_id"),
+        index("available"),
+        index("tags"),
+        index("is_alcohol"),
+        index("project_id"),
+        index("category_id", "available"),
+    ],
+    "orders": [
+        index("created_at"),
+        index("status"),
+        index("order_type"),
+        index("payment_status"),
+        index("updated_at"),
+        index("status", ("created_at", DESCENDING)),
+        index(("created_at", DESCENDING), ("_id", DESCENDING)),
+        index("order_type", ("created_at", DESCENDING)),
+        index("idempotency_key", unique=True, sparse=True),
+        index("customer_phone", ("created_at", DESCENDING), ("_id", DESCENDING)),
+    ],
+    "categories": [
+        index("sort_order"),
+    ],
+    "feedbacks": [
+        index("created_at"),
+    ],
+    "promo_codes": [
+        index("code", unique=True),
+        index("is_active", "valid_from", "valid_to"),
+    ],
+    "combos": [
+        index("available"),
+    ],
+    "menu_items": [
+        index("product_id"),
+        index("is_active"),
+        index("sort_order"),
+        index("item_type", "combo_id"),
+        index("item_type", "product_id"),
+    ],
+    "product_tags": [
+        index("name", unique=True),
+    ],
+    "audit_logs": [
+        index(("created_at", DESCENDING)),
+        index("entity_type"),
+        index("entity_type", "entity_id"),
+    ],
+    "projects": [
+        index("name"),
+    ],
+    "delivery_zones": [
+        index(("geometry", "2dsphere")),
+        index("enabled"),
+        index("priority"),
+    ],
+    "branches": [
+        index("name"),
+        index("is_active"),
+    ],
+    "customers": [
+        index("phone", unique=True),
+        index("category_ids"),
+        index(("created_at", DESCENDING)),
+        index(("total_spent", DESCENDING)),
+    ],
+    "customer_categories": [
+        index("name"),
+        index("is_active"),
+    ],
+    "site_pages": [
+        index("sort_order"),
+        index("is_published"),
+        index("sort_order", "is_published"),
+    ],
+    "sales_rollups": [
+        index("dim", "granularity", "bucket"),
+        index("bucket"),
+    ],
+}
+
+
+def spec_hash(spec: Dict[str, List[dict]] = INDEX_SPEC) -> str:
+    canonical = json.dumps(spec, sort_keys=True, default=list)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _model(spec: dict) -> IndexModel:
+    options = {k: v for k, v in spec.items() if k != "keys"}
+    return IndexModel(spec["keys"], **options)
+
+
+async def diff(db, spec: Dict[str, List[dict]] = INDEX_SPEC) -> dict:
+    """Compare the spec with the live indexes.
+
+    Returns {"missing": [(collection, spec)], "conflicting": [(collection,
+    spec, existing)], "extra": [(collection, name)]}; an index conflicts
+    when the same keys exist with a different uniqueness.
+    """
+    result = {"missing": [], "conflicting": [], "extra": []}
+    for collection, specs in spec.items():
+        existing = {}
+        async for info in await db[collection].list_indexes():
+            existing[tuple((k, v) for k, v in info["key"].items())] = info
+
+        wanted = set()
+        for item in specs:
+            keys = tuple(tuple(k) for k in item["keys"])
+            wanted.add(keys)
+            info = existing.get(keys)
+            if info is None:
+                result["missing"].append((collection, item))
+            elif bool(info.get("unique")) != bool(item.get("unique")):
+                result["conflicting"].append((collection, item, info))
+
+        for keys, info in existing.items():
+            if keys not in wanted and info["name"] != "_id_":
+                result["extra"].append((collection, info["name"]))
+    return result
+
+
+async def apply(db, spec: Dict[str, List[dict]] = INDEX_SPEC) -> dict:
+    """Build the missing indexes (one createIndexes per collection)"""
+    changes = await diff(db, spec)
+    by_collection: Dict[str, List[IndexModel]] = {}
+    for collection, item in changes["missing"]:
+        by_collection.setdefault(collection, []).append(_model(item))
+    for collection, models in by_collection.items():
+        names = await db[collection].create_indexes(models)
+        logger.info("Built indexes on %s: %s", collection, ", ".join(names))
+    for collection, item, info in changes["conflicting"]:
+        logger.warning("Index %s on %s differs from the spec (unique=%s); drop it to rebuild",
+                       info["name"], collection, bool(item.get("unique")))
+    return changes
+
+
+async def ensure_indexes(db):
+    """Apply the spec once per spec version across all workers"""
+    markers = db["counters"]
+    current = spec_hash()
+    try:
+        marker = await markers.find_one({"_id": INDEX_MARKER_ID})
+        if marker and marker.get("hash") == current:
+            return
+
+        # Claim the build so concurrently booting workers don't all diff and build
+        now = datetime.utcnow()
+        try:
+            claimed = await markers.find_one_and_update(
+                {"_id": INDEX_MARKER_ID, "hash": {"$ne": current},
+                 "$or": [{"building_until": {"$exists": False}}, {"building_until": {"$lt": now}}]},
+                {"$set": {"building_until": now + BUILD_LEASE}},
+                upsert=True
+            )
+        except Exception:
+            return  # duplicate key on upsert: another worker holds the claim or is done
+        if claimed is None and marker is not None:
+            return
+
+        changes = await apply(db)
+        update = {"$unset": {"building_until": ""}}
+        if not changes["conflicting"]:
+            update["$set"] = {"hash": current, "applied_at": datetime.utcnow()}
+        await markers.update_one({"_id": INDEX_MARKER_ID}, update)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error("Index build failed: %s", e)
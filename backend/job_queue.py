@@ -0,0 +1,197 @@
+"""Redis-backed background job queue.
+
+Request handlers enqueue side effects (Telegram, customer profile updates,
+...) and return; a pool of worker tasks in every process runs them.
+
+- Jobs are JSON documents pushed onto JOBS_QUEUE. A worker atomically moves
+  one into its own processing list (BLMOVE) and removes it only after the
+  handler finished, so a crashed worker never loses a job.
+- Failed jobs are retried with exponential backoff through the JOBS_DELAYED
+  sorted set; after max_attempts they go to the JOBS_DEAD list.
+- Each process keeps a heartbeat key; processing lists of processes whose
+  heartbeat expired are pushed back onto the queue.
+
+Handlers must be idempotent: a job can run more than once. When Redis is
+unavailable the job runs as a local task instead (best effort, no retries).
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Optional
+from uuid import uuid4
+
+from .config import JOB_WORKERS, JOB_MAX_ATTEMPTS
+from .redis_manager import redis_manager
+
+logger = logging.getLogger(__name__)
+
+JOBS_QUEUE = "jobs:queue"
+JOBS_DELAYED = "jobs:delayed"
+JOBS_DEAD = "jobs:dead"
+JOBS_PROCESSING = "jobs:processing"  # hash: processing list -> owning process
+JOBS_HEARTBEAT = "jobs:heartbeat:{owner}"
+
+JOB_DEAD_LIMIT = 1000
+JOB_RETRY_BASE_DELAY = 2  # seconds, doubled on every attempt
+JOB_RETRY_MAX_DELAY = 300
+HEARTBEAT_TTL = 30
+RECOVERY_INTERVAL = 30
+
+JobHandler = Callable[[dict], Awaitable[None]]
+
+
+class JobQueue:
+    def __init__(self, workers: int = JOB_WORKERS, max_attempts: int = JOB_MAX_ATTEMPTS):
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.handlers: dict = {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks: list = []
+        self._local_tasks: set = set()
+
+    def handler(self, name: str):
+        """Register a coroutine as the handler for jobs called `name`"""
+        def decorator(func: JobHandler) -> JobHandler:
+            self.handlers[name] = func
+            return func
+        return decorator
+
+    async def enqueue(self, name: str, payload: dict, max_attempts: Optional[int] = None):
+        """Schedule a job; returns as soon as it is queued"""
+        job = {
+            "id": uuid4().hex,
+            "name": name,
+            "payload": payload,
+            "attempts": 0,
+            "max_attempts": max_attempts or self.max_attempts,
+            "enqueued_at": time.time(),
+        }
+        if redis_manager.redis is not None:
+            try:
+                await redis_manager.redis.lpush(JOBS_QUEUE, json.dumps(job, default=str))
+                return
+            except Exception as e:
+                logger.error("Failed to enqueue job %s, running it locally: %s", name, e)
+
+        task = asyncio.create_task(self._run_local(job))
+        self._local_tasks.add(task)
+        task.add_done_callback(self._local_tasks.discard)
+
+    async def _run_local(self, job: dict):
+        try:
+            await self._handle(job)
+        except Exception as e:
+            logger.error("Job %s failed: %s", job["name"], e)
+
+    async def _handle(self, job: dict):
+        handler = self.handlers.get(job["name"])
+        if handler is None:
+            raise LookupError(f"No handler registered for job {job['name']}")
+        await handler(job["payload"])
+
+    async def start(self):
+        """Start the worker pool and the maintenance loop"""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintenance()))
+        logger.info("Job queue started with %d workers", self.workers)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._local_tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, index: int):
+        processing = f"jobs:processing:{self.owner}:{index}"
+        registered = False
+        while True:
+            redis = redis_manager.redis
+            if redis is None:
+                await asyncio.sleep(5)
+                continue
+            try:
+                if not registered:
+                    await redis.hset(JOBS_PROCESSING, processing, self.owner)
+                    registered = True
+                raw = await redis.blmove(JOBS_QUEUE, processing, 5, "RIGHT", "LEFT")
+                if raw is not None:
+                    await self._process(redis, raw, processing)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Job worker error: %s", e)
+                await asyncio.sleep(5)
+
+    async def _process(self, redis, raw: str, processing: str):
+        try:
+            job = json.loads(raw)
+        except ValueError:
+            logger.error("Dropping malformed job: %.200s", raw)
+            await redis.lrem(processing, 1, raw)
+            return
+
+        try:
+            await self._handle(job)
+            await redis.lrem(processing, 1, raw)
+            return
+        except Exception as e:
+            job["attempts"] = job.get("attempts", 0) + 1
+            job["last_error"] = str(e)
+
+        async with redis.pipeline(transaction=True) as pipe:
+            if job["attempts"] >= job.get("max_attempts", self.max_attempts):
+                logger.error("Job %s (%s) dead-lettered after %d attempts: %s",
+                             job["name"], job["id"], job["attempts"], job["last_error"])
+                pipe.lpush(JOBS_DEAD, json.dumps(job, default=str))
+                pipe.ltrim(JOBS_DEAD, 0, JOB_DEAD_LIMIT - 1)
+            else:
+                delay = min(JOB_RETRY_MAX_DELAY, JOB_RETRY_BASE_DELAY * 2 ** (job["attempts"] - 1))
+                logger.warning("Job %s (%s) failed, retrying in %ds: %s",
+                               job["name"], job["id"], delay, job["last_error"])
+                pipe.zadd(JOBS_DELAYED, {json.dumps(job, default=str): time.time() + delay})
+            pipe.lrem(processing, 1, raw)
+            await pipe.execute()
+
+    async def _maintenance(self):
+        """Heartbeat, move due retries back to the queue, recover orphaned jobs"""
+        last_recovery = 0.0
+        while True:
+            redis = redis_manager.redis
+            try:
+                if redis is not None:
+                    await redis.set(JOBS_HEARTBEAT.format(owner=self.owner), 1, ex=HEARTBEAT_TTL)
+                    await self._promote_due(redis)
+                    if time.monotonic() - last_recovery > RECOVERY_INTERVAL:
+                        last_recovery = time.monotonic()
+                        await self._recover_orphans(redis)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Job queue maintenance error: %s", e)
+            await asyncio.sleep(1)
+
+    async def _promote_due(self, redis):
+        due = await redis.zrangebyscore(JOBS_DELAYED, 0, time.time(), start=0, num=100)
+        for raw in due:
+            # ZREM succeeds for exactly one process, so a retry is queued once
+            if await redis.zrem(JOBS_DELAYED, raw):
+                await redis.lpush(JOBS_QUEUE, raw)
+
+    async def _recover_orphans(self, redis):
+        for processing, owner in (await redis.hgetall(JOBS_PROCESSING)).items():
+            if owner == self.owner or await redis.exists(JOBS_HEARTBEAT.format(owner=owner)):
+                continue
+            moved = 0
+            while await redis.lmove(processing, JOBS_QUEUE, "RIGHT", "LEFT") is not None:
+                moved += 1
+            await redis.hdel(JOBS_PROCESSING, processing)
+            if moved:
+                logger.warning("Requeued %d jobs from dead worker %s", moved, owner)
+
+
+job_queue = JobQueue()
@@ -0,0 +1,144 @@
+"""Background job handlers for order side effects.
+
+Imported by main.py so every process registers them with the job queue.
+Handlers may run more than once and must stay idempotent.
+"""
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from . import database
+from .job_queue import job_queue
+from .telegram_bot import send_order_notification, send_status_notification
+from .utils.phone import normalize_phone
+
+JOB_TELEGRAM_NEW_ORDER = "telegram.new_order"
+JOB_TELEGRAM_STATUS_CHANGED = "telegram.status_changed"
+JOB_CUSTOMER_ORDER_CREATED = "customer.order_created"
+JOB_CUSTOMER_ORDERS_CREATED = "customer.orders_created"
+JOB_CUSTOMER_ORDER_COMPLETED = "customer.order_completed"
+
+CUSTOMER_RECENT_ORDERS = 20  # order ids embedded in customers.order_history
+# Completed order ids kept on the customer to make completion counting idempotent;
+# a redelivery comes long before this many newer orders complete
+CUSTOMER_COMPLETED_ORDERS = 100
+
+
+@job_queue.handler(JOB_TELEGRAM_NEW_ORDER)
+async def notify_new_order(payload: dict):
+    # Only buffers the message durably; the notifier's flusher sends it in
+    # the next digest and retries or dead-letters it on its own
+    await send_order_notification(payload["order"])
+
+
+@job_queue.handler(JOB_TELEGRAM_STATUS_CHANGED)
+async def notify_status_changed(payload: dict):
+    await send_status_notification(payload["order_number"], payload["status"])
+
+
+def _customer_filter(phone_norm: str, order_ids: list) -> dict:
+    # Doesn't match a customer that already has these orders, so a retried
+    # job changes nothing
+    return {"phone": phone_norm, "order_history": {"$nin": order_ids}}
+
+
+def _customer_update(name: str, order_ids: list, now: datetime, upsert: bool) -> dict:
+    """Record orders on a customer; with upsert, also the fields of a new customer"""
+    update = {
+        # Only the most recent orders are embedded; the full history is
+        # queried from orders by customer_phone
+        "$push": {"order_history": {"$each": order_ids, "$slice": -CUSTOMER_RECENT_ORDERS}},
+        "$set": {"updated_at": now}
+    }
+    if name:
+        update["$set"]["name"] = name
+    if upsert:
+        update["$setOnInsert"] = {
+            "order_count": 0, "total_spent": 0.0, "category_ids": [], "notes": "", "created_at": now
+        }
+        if not name:
+            update["$setOnInsert"]["name"] = ""
+    return update
+
+
+@job_queue.handler(JOB_CUSTOMER_ORDER_CREATED)
+async def record_customer_order(payload: dict):
+    """Auto-create/update the customer record for a new order"""
+    if not database.connected or database.customers is None:
+        return
+    phone_norm = normalize_phone(payload["customer_phone"])
+    if not phone_norm:
+        return
+
+    order_ids = [payload["order_id"]]
+    customer_name = (payload.get("customer_name") or "").strip()
+    now = datetime.utcnow()
+    try:
+        await database.customers.update_one(
+            _customer_filter(phone_norm, order_ids),
+            _customer_update(customer_name, order_ids, now, upsert=True),
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The customer exists and already has the order (so the filter missed
+        # and the upsert tried to insert), or was inserted concurrently
+        await database.customers.update_one(
+            _customer_filter(phone_norm, order_ids),
+            _customer_update(customer_name, order_ids, now, upsert=False)
+        )
+
+
+@job_queue.handler(JOB_CUSTOMER_ORDERS_CREATED)
+async def record_customer_orders(payload: dict):
+    """Customer records for a batch of orders, one bulk write per batch"""
+    if not database.connected or database.customers is None:
+        return
+
+    names = {}    # phone -> latest non-empty name
+    records = []  # (phone, order_id)
+    for entry in payload["orders"]:
+        phone_norm = normalize_phone(entry.get("customer_phone") or "")
+        if not phone_norm:
+            continue
+        names[phone_norm] = (entry.get("customer_name") or "").strip() or names.get(phone_norm, "")
+        records.append((phone_norm, entry["order_id"]))
+    if not records:
+        return
+
+    # One update per order, each guarded by its own id: on a retry the orders
+    # already recorded are skipped without skipping the rest of the batch
+    now = datetime.utcnow()
+    try:
+        await database.customers.bulk_write([
+            UpdateOne(_customer_filter(phone_norm, [order_id]),
+                      _customer_update(names[phone_norm], [order_id], now, upsert=True), upsert=True)
+            for phone_norm, order_id in records
+        ], ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if any(err.get("code") != 11000 for err in errors):
+            raise
+        # Same as in record_customer_order: retry those as plain updates
+        await database.customers.bulk_write([
+            UpdateOne(_customer_filter(phone_norm, [order_id]),
+                      _customer_update(names[phone_norm], [order_id], now, upsert=False))
+            for phone_norm, order_id in (records[err["index"]] for err in errors)
+        ], ordered=False)
+
+
+@job_queue.handler(JOB_CUSTOMER_ORDER_COMPLETED)
+async def record_customer_completion(payload: dict):
+    """Add a completed order to the customer's totals"""
+    if not database.connected or database.customers is None:
+        return
+    order_id = payload["order_id"]
+    await database.customers.update_one(
+        # A redelivered job finds the order already counted and changes nothing
+        {"phone": normalize_phone(payload["customer_phone"]), "completed_orders": {"$ne": order_id}},
+        {
+            "$inc": {"order_count": 1, "total_spent": payload.get("total", 0)},
+            "$push": {"completed_orders": {"$each": [order_id], "$slice": -CUSTOMER_COMPLETED_ORDERS}},
+            "$set": {"updated_at": datetime.utcnow()}
+        }
+    )
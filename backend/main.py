@@ -9,6 +9,15 @@ import pymongo.errors
 from . import database
 from .database import connect_db, close_db
 from .redis_manager import redis_manager
+from .websocket_hub import websocket_hub
+from .settings_service import settings_service
+from .job_queue import job_queue
+# Register their invalidation handlers before redis_manager.connect()
+from .menu_cache import menu_cache  # noqa: F401
+from .utils.zones import zone_index  # noqa: F401
+from .utils.promo import promo_table  # noqa: F401
+from .utils.geocoding import geocoder
+from .telegram_bot import notifier
 from .utils.data_fetchers import init_default_data
 
 from .routers import (
@@ -25,14 +34,22 @@ from .routers import (
 async def lifespan(app: FastAPI):
     # Startup
     try:
-        connect_db()
+        await connect_db()
+        await settings_service.start()
         await redis_manager.connect()
-        init_default_data()
+        await websocket_hub.start()
+        await job_queue.start()
+        await notifier.start()
+        await init_default_data()
     except Exception as e:
         print(f"Startup error: {e}")
     yield
     # Shutdown
-    close_db()
+    await websocket_hub.stop()
+    await job_queue.stop()
+    await notifier.close()
+    await geocoder.close()
+    await close_db()
     await redis_manager.close()
 
 
@@ -46,7 +63,7 @@ async def branch_setup_check(request: Request, call_next):
     if (path.startswith("/admin")
             and not path.startswith("/admin/branches")
             and database.connected):
-        count = database.branches.count_documents({})
+        count = await database.branches.count_documents({})
         if count == 0:
             return RedirectResponse(url="/admin/branches?onboarding=1", status_code=302)
     return await call_next(request)
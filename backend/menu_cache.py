@@ -0,0 +1,149 @@
+"""In-process cache for the customer menu and POS pages.
+
+The categories/products payload and the rendered HTML are built once and
+served from memory until a menu write (products, menu items, combos,
+categories, modifiers) calls `menu_cache.invalidate()`. Invalidation is
+broadcast on CHANNEL_MENU so every worker drops its copy. Pages carry a
+content-hash ETag, so repeat visits get a 304 without a body. The
+PriceBook used to reprice orders lives and expires with the snapshot.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from typing import Callable, Optional
+
+from fastapi import Request
+from fastapi.responses import HTMLResponse, Response
+
+from . import database
+from .config import CHANNEL_MENU
+from .redis_manager import redis_manager
+from .utils.data_fetchers import get_categories_list, get_products_list, get_menu_items_list
+from .utils.demo_data import DEMO_PRODUCTS, DEMO_COMBOS, DEMO_MODIFIERS
+from .utils.pricing import PriceBook
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on staleness if an invalidation message is ever lost
+TTL_MENU_SNAPSHOT = 300  # 5 minutes
+
+
+class CachedPage:
+    __slots__ = ("html", "etag")
+
+    def __init__(self, html: str):
+        self.html = html
+        self.etag = '"' + hashlib.md5(html.encode("utf-8")).hexdigest() + '"'
+
+
+class MenuCache:
+    def __init__(self):
+        self._snapshot: Optional[dict] = None
+        self._pages: dict = {}  # (page, extra key) -> CachedPage
+        self._price_book: Optional[PriceBook] = None
+        self._built_at = 0.0
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        redis_manager.on_invalidation(CHANNEL_MENU, self._on_invalidation)
+
+    def _drop(self):
+        self._generation += 1
+        self._snapshot = None
+        self._pages = {}
+        self._price_book = None
+
+    def _expired(self) -> bool:
+        return time.monotonic() - self._built_at > TTL_MENU_SNAPSHOT
+
+    async def _build_snapshot(self) -> dict:
+        categories = await get_categories_list()
+        products = await get_menu_items_list(active_only=True)
+        if not products:
+            products = await get_products_list(available_only=True)
+        return {"categories": categories, "products": products}
+
+    async def get_snapshot(self) -> dict:
+        """Categories and active menu products, built once per menu version"""
+        if not database.connected:
+            return await self._build_snapshot()
+
+        if self._snapshot is not None and not self._expired():
+            return self._snapshot
+
+        async with self._lock:
+            if self._snapshot is not None and not self._expired():
+                return self._snapshot
+            if self._expired():
+                self._drop()
+            generation = self._generation
+            snapshot = await self._build_snapshot()
+            # A write landed while we were building; serve it but don't keep it
+            if generation == self._generation:
+                self._snapshot = snapshot
+                self._built_at = time.monotonic()
+            return snapshot
+
+    async def get_price_book(self) -> PriceBook:
+        """Prices of every product, combo and modifier option, for repricing orders"""
+        if not database.connected or database.products is None:
+            return PriceBook(DEMO_PRODUCTS, DEMO_COMBOS, DEMO_MODIFIERS)
+
+        book = self._price_book
+        if book is not None and not self._expired():
+            return book
+
+        async with self._lock:
+            if self._price_book is not None and not self._expired():
+                return self._price_book
+            if self._expired():
+                self._drop()
+            generation = self._generation
+            # Unavailable products are included so they are rejected by name
+            book = PriceBook(
+                await database.products.find().to_list(),
+                await database.combos.find().to_list(),
+                await database.modifiers.find().to_list()
+            )
+            if generation == self._generation:
+                self._price_book = book
+                if self._snapshot is None:
+                    self._built_at = time.monotonic()
+            return book
+
+    async def get_page(self, name: str, render: Callable[[dict], str], key=None) -> CachedPage:
+        """Rendered HTML for a page, built from the menu snapshot on first use"""
+        cache_key = (name, key)
+        page = self._pages.get(cache_key)
+        if page is not None and not self._expired():
+            return page
+
+        generation = self._generation
+        snapshot = await self.get_snapshot()
+        page = CachedPage(render(snapshot))
+        if database.connected and generation == self._generation:
+            self._pages[cache_key] = page
+        return page
+
+    async def invalidate(self):
+        """Drop the cached menu here and on every other worker"""
+        self._drop()
+        try:
+            await redis_manager.publish(CHANNEL_MENU, {"type": "menu_invalidated"})
+        except Exception as e:
+            logger.error("Failed to publish menu invalidation: %s", e)
+
+    async def _on_invalidation(self, data):
+        self._drop()
+
+
+def page_response(request: Request, page: CachedPage) -> Response:
+    """HTML response with ETag, or 304 if the client already has this version"""
+    headers = {"ETag": page.etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if page.etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=page.html, headers=headers)
+
+
+menu_cache = MenuCache()
@@ -0,0 +1,89 @@
+"""
+Migration: Apply or verify the MongoDB index spec (backend/indexes.py).
+
+`verify` lists missing, conflicting and unexpected indexes and exits with
+status 1 if anything from the spec is missing or conflicting. `apply`
+builds the missing ones and records the spec hash, so workers skip the
+check on their next boot.
+
+Usage:
+    python -m backend.migrations.indexes verify
+    python -m backend.migrations.indexes apply
+"""
+
+import argparse
+import asyncio
+from datetime import datetime
+import sys
+import os
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from backend import database
+from backend import indexes
+
+
+def _describe(spec: dict) -> str:
+    keys = ", ".join(f"{field}:{direction}" for field, direction in spec["keys"])
+    return keys + (" (unique)" if spec.get("unique") else "")
+
+
+def print_diff(changes: dict):
+    for collection, spec in changes["missing"]:
+        print(f"  MISSING      {collection}: {_describe(spec)}")
+    for collection, spec, info in changes["conflicting"]:
+        print(f"  CONFLICTING  {collection}: {_describe(spec)} (existing {info['name']})")
+    for collection, name in changes["extra"]:
+        print(f"  EXTRA        {collection}: {name}")
+
+
+async def run(command: str) -> bool:
+    await database.connect_db()
+
+    if not database.connected or database.db is None:
+        print("ERROR: Database not available. Check MONGODB_URL in .env")
+        return False
+
+    if command == "verify":
+        changes = await indexes.diff(database.db)
+    else:
+        changes = await indexes.apply(database.db)
+        if not changes["conflicting"]:
+            await database.counters.update_one(
+                {"_id": indexes.INDEX_MARKER_ID},
+                {"$set": {"hash": indexes.spec_hash(), "applied_at": datetime.utcnow()},
+                 "$unset": {"building_until": ""}},
+                upsert=True
+            )
+
+    print_diff(changes)
+    print(f"Spec hash: {indexes.spec_hash()}")
+    if command == "apply":
+        print(f"✓ Built {len(changes['missing'])} indexes")
+        return not changes["conflicting"]
+    return not changes["missing"] and not changes["conflicting"]
+
+
+async def main():
+    print("=" * 60)
+    print("MongoDB Index Spec")
+    print("=" * 60)
+
+    parser = argparse.ArgumentParser(description="Apply or verify MongoDB indexes")
+    parser.add_argument("command", choices=["apply", "verify"])
+    args = parser.parse_args()
+
+    success = await run(args.command)
+
+    await database.close_db()
+
+    if success:
+        print("\nDone!")
+    else:
+        print("\nFailed!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
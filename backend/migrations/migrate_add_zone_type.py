@@ -33,8 +33,7 @@ async def migrate_existing_zones():
         return False
 
     # Find zones without zone_type field
-    zones_without_type = database.delivery_zones.find({"zone_type": {"$exists": False}})
-    count = database.delivery_zones.count_documents({"zone_type": {"$exists": False}})
+    count = await database.delivery_zones.count_documents({"zone_type": {"$exists": False}})
 
     if count == 0:
         print("No zones need migration. All zones already have zone_type field.")
@@ -44,7 +43,7 @@ async def migrate_existing_zones():
     print("Setting zone_type='radius' for all existing zones...")
 
     # Update all zones without zone_type to "radius"
-    result = database.delivery_zones.update_many(
+    result = await database.delivery_zones.update_many(
         {"zone_type": {"$exists": False}},
         {
             "$set": {
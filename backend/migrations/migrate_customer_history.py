@@ -0,0 +1,94 @@
+"""
+Migration: Move customer order history to the orders collection.
+
+A customer's order history is now read from orders by customer_phone,
+which new orders store normalized. This migration:
+1. Normalizes customer_phone on existing orders (strips spaces, dashes
+   and parentheses), so their history matches the customer's phone
+2. Trims customers.order_history to the CUSTOMER_RECENT_ORDERS most
+   recent ids
+
+Safe to run more than once.
+
+Usage:
+    python -m backend.migrations.migrate_customer_history
+"""
+
+import asyncio
+import sys
+import os
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from pymongo import UpdateOne
+
+from backend import database
+from backend.jobs import CUSTOMER_RECENT_ORDERS
+from backend.utils.phone import normalize_phone
+
+BATCH_SIZE = 1000
+
+
+async def normalize_order_phones() -> int:
+    """Rewrite customer_phone on orders that still carry formatting"""
+    updated = 0
+    operations = []
+    cursor = database.orders.find({"customer_phone": {"$regex": r"[\s\-()]"}}, {"customer_phone": 1})
+    async for order in cursor:
+        operations.append(UpdateOne(
+            {"_id": order["_id"]},
+            {"$set": {"customer_phone": normalize_phone(order["customer_phone"])}}
+        ))
+        if len(operations) >= BATCH_SIZE:
+            updated += (await database.orders.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+    if operations:
+        updated += (await database.orders.bulk_write(operations, ordered=False)).modified_count
+    return updated
+
+
+async def trim_order_history() -> int:
+    """Keep only the most recent ids in customers.order_history"""
+    result = await database.customers.update_many(
+        {f"order_history.{CUSTOMER_RECENT_ORDERS}": {"$exists": True}},
+        {"$push": {"order_history": {"$each": [], "$slice": -CUSTOMER_RECENT_ORDERS}}}
+    )
+    return result.modified_count
+
+
+async def run_migration():
+    print("Starting migration: customer order history...")
+
+    await database.connect_db()
+
+    if not database.connected or database.orders is None or database.customers is None:
+        print("ERROR: Database not available. Check MONGODB_URL in .env")
+        return False
+
+    phones = await normalize_order_phones()
+    print(f"✓ Normalized customer_phone on {phones} orders")
+
+    trimmed = await trim_order_history()
+    print(f"✓ Trimmed order_history of {trimmed} customers to {CUSTOMER_RECENT_ORDERS} orders")
+    return True
+
+
+async def main():
+    print("=" * 60)
+    print("Customer Order History Migration")
+    print("=" * 60)
+
+    success = await run_migration()
+
+    await database.close_db()
+
+    if success:
+        print("\nDone!")
+    else:
+        print("\nFailed!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -9,6 +9,7 @@ Usage:
     python -m backend.migrations.migrate_storefront_v2
 """
 
+import asyncio
 import sys
 import os
 from uuid import uuid4
@@ -158,17 +159,17 @@ def migrate_v1_to_v2(old: dict) -> dict:
     }
 
 
-def run_migration():
+async def run_migration():
     """Migrate storefront config from v1 to v2 in the database."""
     print("Starting migration: Storefront v1 -> v2 (PageBuilder)...")
 
-    database.connect_db()
+    await database.connect_db()
 
     if not database.connected or database.settings is None:
         print("ERROR: Database not available. Check MONGODB_URL in .env")
         return False
 
-    doc = database.settings.find_one({"_id": "app_settings"})
+    doc = await database.settings.find_one({"_id": "app_settings"})
     if not doc:
         print("No app_settings document found. Nothing to migrate.")
         return True
@@ -194,7 +195,7 @@ def run_migration():
         print(f"    [{vis}] {section['label']} ({el['type']})")
 
     # Backup v1 config and write v2
-    database.settings.update_one(
+    await database.settings.update_one(
         {"_id": "app_settings"},
         {"$set": {
             "storefront": v2_config,
@@ -208,22 +209,22 @@ def run_migration():
     return True
 
 
-def rollback():
+async def rollback():
     """Rollback: restore v1 config from backup."""
     print("Rolling back storefront v2 migration...")
 
-    database.connect_db()
+    await database.connect_db()
 
     if not database.connected or database.settings is None:
         print("ERROR: Database not available.")
         return False
 
-    doc = database.settings.find_one({"_id": "app_settings"})
+    doc = await database.settings.find_one({"_id": "app_settings"})
     if not doc or not doc.get("storefront_v1_backup"):
         print("No v1 backup found. Cannot rollback.")
         return False
 
-    database.settings.update_one(
+    await database.settings.update_one(
         {"_id": "app_settings"},
         {
             "$set": {"storefront": doc["storefront_v1_backup"]},
@@ -235,17 +236,17 @@ def rollback():
     return True
 
 
-def main():
+async def main():
     print("=" * 60)
     print("Storefront V2 (PageBuilder) Migration")
     print("=" * 60)
 
     if len(sys.argv) > 1 and sys.argv[1] == "--rollback":
-        success = rollback()
+        success = await rollback()
     else:
-        success = run_migration()
+        success = await run_migration()
 
-    database.close_db()
+    await database.close_db()
 
     if success:
         print("\nDone!")
@@ -255,4 +256,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+"""
+Migration: Rebuild sales rollups from the orders collection.
+
+Recomputes the hourly/daily sales_rollups buckets for a date range (or the
+whole history). A whole-history rebuild also marks the rollups as
+backfilled, after which the reporting endpoints read them instead of
+unwinding raw orders; a --from/--to rebuild only repairs that range.
+
+Usage:
+    python -m backend.migrations.rebuild_rollups
+    python -m backend.migrations.rebuild_rollups --from 2026-01-01 --to 2026-02-01
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+import sys
+import os
+
+# Add parent directory to path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from backend import database
+from backend.utils import rollups
+
+
+async def run_rebuild(date_from: str = None, date_to: str = None):
+    """Rebuild the buckets for [date_from, date_to] (inclusive days)."""
+    start = datetime.strptime(date_from, "%Y-%m-%d") if date_from else None
+    end = datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1) if date_to else None
+
+    print(f"Rebuilding sales rollups ({date_from or 'beginning'} .. {date_to or 'now'})...")
+
+    await database.connect_db()
+
+    if not database.connected or database.orders is None or database.sales_rollups is None:
+        print("ERROR: Database not available. Check MONGODB_URL in .env")
+        return False
+
+    processed = await rollups.rebuild(start, end)
+
+    print(f"✓ Rebuilt rollups from {processed} orders")
+    if start or end:
+        if await rollups.is_ready():
+            print("✓ Rollups were already backfilled")
+        else:
+            print("NOTE: Partial rebuild; reports keep using raw orders until a full rebuild")
+    return True
+
+
+async def main():
+    print("=" * 60)
+    print("Sales Rollups Rebuild")
+    print("=" * 60)
+
+    parser = argparse.ArgumentParser(description="Rebuild sales rollups")
+    parser.add_argument("--from", dest="date_from", help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="Last day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    success = await run_rebuild(args.date_from, args.date_to)
+
+    await database.close_db()
+
+    if success:
+        print("\nDone!")
+    else:
+        print("\nFailed!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -193,6 +193,17 @@ class OrderCreate(BaseModel):
         return _round_price(v)
 
 
+class OrderBatchItem(OrderCreate):
+    # Generated by the POS terminal once per order and resent unchanged on retry
+    idempotency_key: str = Field(..., min_length=1, max_length=100)
+    # When the terminal took the order; clamped server-side to a sane window
+    created_at: Optional[datetime] = None
+
+
+class OrderBatch(BaseModel):
+    orders: List[OrderBatchItem]
+
+
 class Order(BaseModel):
     id: Optional[str] = Field(None, alias="_id")
     order_number: str
@@ -434,6 +445,15 @@ class GeocodeRequest(BaseModel):
     address: str = Field(..., min_length=3)
 
 
+class CoordinatePoint(BaseModel):
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
+
+
+class BulkZoneDetectionRequest(BaseModel):
+    points: List[CoordinatePoint] = Field(..., max_length=1000)
+
+
 class ZoneDetectionResult(BaseModel):
     zone_id: Optional[str] = None
     zone_name: Optional[str] = None
@@ -565,7 +585,7 @@ class CustomerCreate(BaseModel):
 
 class Customer(CustomerCreate):
     id: Optional[str] = Field(None, alias="_id")
-    order_history: List[str] = []
+    order_history: List[str] = []  # most recent order ids; full history is in orders
     order_count: int = 0
     total_spent: float = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
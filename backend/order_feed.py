@@ -0,0 +1,80 @@
+"""Sequenced change feed for order events.
+
+Every order mutation is appended to the STREAM_ORDERS event stream (see
+EventBus); the entry ID ("<ms>-<n>", strictly increasing) is the event's
+sequence number and travels with the event as "seq". The WebSocket hub in
+each process tails the stream, so events written while it reconnects are
+delivered late instead of lost. A board that lost its socket reconnects
+with /ws?since=<last seq> and is replayed just the entries it missed. When
+those have already been trimmed from the stream (or there are more than
+FEED_REPLAY_LIMIT of them) it is told to resync, i.e. reload /api/orders.
+"""
+import json
+import logging
+from typing import List, Optional, Tuple
+
+from .redis_manager import redis_manager, event_bus, STREAM_ORDERS, STREAM_MAXLEN
+
+logger = logging.getLogger(__name__)
+
+FEED_REPLAY_LIMIT = 500
+
+
+def parse_seq(seq: str) -> Optional[Tuple[int, int]]:
+    """Stream ID as a comparable tuple, None if malformed"""
+    try:
+        ms, _, n = str(seq).partition("-")
+        return int(ms), int(n or 0)
+    except ValueError:
+        return None
+
+
+def with_seq(event: dict, seq: str) -> str:
+    """Wire format of a feed event"""
+    return json.dumps({**event, "seq": seq}, default=str)
+
+
+async def publish(event: dict) -> Optional[str]:
+    """Append an order event to the feed; returns its seq"""
+    try:
+        return await event_bus.publish(STREAM_ORDERS, event)
+    except Exception as e:
+        logger.error("Failed to publish order event: %s", e)
+        return None
+
+
+async def latest_seq() -> Optional[str]:
+    """Seq of the newest feed entry ("0-0" for an empty feed)"""
+    if redis_manager.redis is None:
+        return None
+    try:
+        return await event_bus.latest_id(STREAM_ORDERS)
+    except Exception as e:
+        logger.error("Failed to read order feed: %s", e)
+        return None
+
+
+async def events_since(since: str) -> Optional[List[str]]:
+    """Wire messages for the events after `since`, oldest first.
+
+    None means the gap can't be replayed and the client needs a snapshot.
+    """
+    since_key = parse_seq(since)
+    if since_key is None or redis_manager.redis is None:
+        return None
+    try:
+        oldest = await event_bus.oldest_id(STREAM_ORDERS)
+        if oldest and parse_seq(oldest) > since_key:
+            # Everything up to the oldest entry must be in the stream; the
+            # entry right after `since` may have been trimmed
+            if since_key != (0, 0) or await redis_manager.redis.xlen(STREAM_ORDERS) >= STREAM_MAXLEN:
+                return None
+        events = await event_bus.replay(
+            STREAM_ORDERS, f"{since_key[0]}-{since_key[1]}", count=FEED_REPLAY_LIMIT + 1
+        )
+    except Exception as e:
+        logger.error("Failed to replay order feed: %s", e)
+        return None
+    if len(events) > FEED_REPLAY_LIMIT:
+        return None
+    return [with_seq(event, entry_id) for entry_id, event in events]
@@ -1,27 +1,57 @@
+import asyncio
 import json
 import logging
-from typing import Any, Optional
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Tuple
 import redis.asyncio as redis
-from .config import REDIS_URL, REDIS_CHANNELS
+from redis.exceptions import ResponseError
+from .cache_codec import CacheCodec, CacheDecodeError
+from .config import REDIS_URL, CHANNEL_CACHE
 
 logger = logging.getLogger(__name__)
 
 
+LOCAL_CACHE_SIZE = 256  # entries per worker
+REFRESH_AHEAD = 0.2     # refresh in the background during the last 20% of the TTL
+
+
 class RedisManager:
     def __init__(self):
         self.redis: redis.Redis = None
+        self.cache_redis: redis.Redis = None  # binary client for codec-encoded cache entries
         self.pubsub: redis.client.PubSub = None
+        self.codec = CacheCodec()
+        self._local: OrderedDict = OrderedDict()  # key -> (value, refresh_at, expires_at)
+        self._loading: dict = {}     # key -> Task, one read-through load per key
+        self._refreshing: dict = {}  # key -> Task, one background refresh per key
+        self._generation = 0         # bumped on invalidation; stale loads don't store
+        self._listener_task: Optional[asyncio.Task] = None
+        self._invalidation_handlers: dict = {}  # channel -> async handler(data or None)
+        self.on_invalidation(CHANNEL_CACHE, self._on_cache_invalidation)
 
     async def connect(self):
         """Connect to Redis Cloud"""
         self.redis = redis.from_url(REDIS_URL, decode_responses=True)
         await self.redis.ping()
+        self.cache_redis = redis.from_url(REDIS_URL)
+        if self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._listen_invalidations())
         logger.info("Connected to Redis")
 
     async def close(self):
         """Close Redis connection"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
         if self.pubsub:
             await self.pubsub.aclose()
+        if self.cache_redis:
+            await self.cache_redis.aclose()
         if self.redis:
             await self.redis.aclose()
         logger.info("Redis connection closed")
@@ -30,58 +60,358 @@ class RedisManager:
         """Publish message to channel"""
         await self.redis.publish(channel, json.dumps(message, default=str))
 
-    async def subscribe(self, channels: list = None) -> redis.client.PubSub:
+    async def subscribe(self, channels: list) -> redis.client.PubSub:
         """Subscribe to channels and return pubsub instance"""
         pubsub = self.redis.pubsub()
-        await pubsub.subscribe(*(channels or REDIS_CHANNELS))
+        await pubsub.subscribe(*channels)
         return pubsub
 
     # ============ Caching Methods ============
 
     async def get_cached(self, key: str) -> Optional[Any]:
         """Get cached data by key"""
-        if not self.redis:
+        if not self.cache_redis:
             return None
         try:
-            data = await self.redis.get(key)
+            data = await self.cache_redis.get(key)
             if data:
-                return json.loads(data)
-        except json.JSONDecodeError as e:
+                return self.codec.decode(data)
+        except CacheDecodeError as e:
             logger.warning("Failed to decode cached value for key %s: %s", key, e)
         except Exception as e:
             logger.error("Redis get error for key %s: %s", key, e)
         return None
 
-    async def set_cached(self, key: str, data: Any, ttl: int = 3600):
-        """Cache data with TTL in seconds (default 1 hour)"""
-        if not self.redis:
+    async def set_cached(self, key: str, data: Any, ttl: int = 3600, tags: Iterable[str] = None):
+        """Cache data with TTL in seconds (default 1 hour).
+
+        The entry is registered under `tags` (by default CACHE_TAGS[key])
+        for invalidate_tags().
+        """
+        if not self.cache_redis:
             return
+        if tags is None:
+            tags = CACHE_TAGS.get(key, ())
         try:
-            await self.redis.set(key, json.dumps(data, default=str), ex=ttl)
+            async with self.cache_redis.pipeline(transaction=True) as pipe:
+                pipe.set(key, self.codec.encode(data), ex=ttl)
+                for tag in tags:
+                    pipe.sadd(cache_tag_key(tag), key)
+                await pipe.execute()
         except Exception as e:
             logger.error("Redis set error for key %s: %s", key, e)
 
-    async def invalidate(self, pattern: str):
-        """Invalidate cache keys matching pattern"""
+    async def cached(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int = 3600) -> Any:
+        """Read-through cache: worker-local LRU, then Redis, then `loader()`.
+
+        Concurrent misses for a key share one load, entries are refreshed in
+        the background shortly before they expire, and invalidate_key()
+        drops the local copies in every worker. The returned value is shared
+        between requests and must not be mutated.
+        """
+        if not self.cache_redis:
+            return await loader()
+
+        entry = self._local.get(key)
+        if entry is not None:
+            value, refresh_at, expires_at = entry
+            now = time.monotonic()
+            if now < expires_at:
+                self._local.move_to_end(key)
+                if now >= refresh_at:
+                    self._refresh(key, loader, ttl)
+                return value
+            del self._local[key]
+
+        task = self._loading.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, loader, ttl))
+            self._loading[key] = task
+            task.add_done_callback(lambda _: self._loading.pop(key, None))
+        # Shielded so one cancelled request doesn't cancel the shared load
+        return await asyncio.shield(task)
+
+    def _remember(self, key: str, value: Any, remaining: float, ttl: int):
+        expires_at = time.monotonic() + remaining
+        self._local[key] = (value, expires_at - ttl * REFRESH_AHEAD, expires_at)
+        self._local.move_to_end(key)
+        while len(self._local) > LOCAL_CACHE_SIZE:
+            self._local.popitem(last=False)
+
+    async def _fetch(self, key: str, loader, ttl: int) -> Any:
+        generation = self._generation
+        try:
+            async with self.cache_redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.pttl(key)
+                raw, pttl = await pipe.execute()
+            if raw:
+                value = self.codec.decode(raw)
+                remaining = pttl / 1000 if pttl > 0 else ttl
+                if generation == self._generation:
+                    self._remember(key, value, remaining, ttl)
+                if remaining < ttl * REFRESH_AHEAD:
+                    self._refresh(key, loader, ttl)
+                return value
+        except CacheDecodeError as e:
+            logger.warning("Failed to decode cached value for key %s: %s", key, e)
+        except Exception as e:
+            logger.error("Redis get error for key %s: %s", key, e)
+        return await self._reload(key, loader, ttl)
+
+    async def _reload(self, key: str, loader, ttl: int) -> Any:
+        generation = self._generation
+        value = await loader()
+        # An invalidation during the load means the value may predate the write
+        if generation == self._generation:
+            await self.set_cached(key, value, ttl)
+            self._remember(key, value, ttl, ttl)
+        return value
+
+    def _refresh(self, key: str, loader, ttl: int):
+        """Stale-while-revalidate: reload in the background, keep serving"""
+        if key in self._refreshing:
+            return
+
+        async def run():
+            try:
+                await self._reload(key, loader, ttl)
+            except Exception as e:
+                logger.error("Background cache refresh failed for key %s: %s", key, e)
+
+        task = asyncio.create_task(run())
+        self._refreshing[key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(key, None))
+
+    def _forget(self, keys=None):
+        """Drop local entries (all of them when keys is None)"""
+        self._generation += 1
+        if keys is None:
+            self._local.clear()
+            return
+        for key in keys:
+            self._local.pop(key, None)
+
+    async def _broadcast_invalidation(self, message: dict):
+        try:
+            await self.publish(CHANNEL_CACHE, message)
+        except Exception as e:
+            logger.error("Failed to publish cache invalidation: %s", e)
+
+    async def _on_cache_invalidation(self, data: Optional[str]):
+        """Drop local entries other workers invalidated"""
+        if data is None:
+            self._forget()
+            return
+        try:
+            keys = json.loads(data).get("keys", [])
+        except (TypeError, ValueError, AttributeError):
+            return
+        self._forget(keys)
+
+    def on_invalidation(self, channel: str, handler: Callable[[Optional[str]], Awaitable[None]]):
+        """Call `handler` with the data of every message published on `channel`.
+
+        All channels share one pub/sub connection per worker. After every
+        (re)subscribe each handler is called with None, since messages sent
+        while disconnected were missed. Register before connect().
+        """
+        self._invalidation_handlers[channel] = handler
+
+    async def _listen_invalidations(self):
+        while True:
+            pubsub = None
+            try:
+                pubsub = await self.subscribe(list(self._invalidation_handlers))
+                for channel in list(self._invalidation_handlers):
+                    await self._dispatch_invalidation(channel, None)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        await self._dispatch_invalidation(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Invalidation listener error: %s", e)
+            finally:
+                if pubsub:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+            await asyncio.sleep(5)
+
+    async def _dispatch_invalidation(self, channel: str, data: Optional[str]):
+        handler = self._invalidation_handlers.get(channel)
+        if handler is None:
+            return
+        try:
+            await handler(data)
+        except Exception as e:
+            logger.error("Invalidation handler for %s failed: %s", channel, e)
+
+    async def invalidate_tags(self, *tags: str):
+        """Invalidate every cache entry registered under any of the tags.
+
+        Deletes exactly the tagged keys (no keyspace scan) and removes them
+        from their tag sets in one pipeline.
+        """
         if not self.redis:
+            self._forget()
             return
         try:
-            keys = []
-            async for key in self.redis.scan_iter(match=pattern):
-                keys.append(key)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.smembers(cache_tag_key(tag))
+                members = await pipe.execute()
+            keys = set().union(*members) if members else set()
+            # The statically tagged keys go too, even if their registration was lost
+            keys |= {key for key, key_tags in CACHE_TAGS.items() if set(key_tags) & set(tags)}
+            self._forget(keys)
             if keys:
-                await self.redis.delete(*keys)
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.delete(*keys)
+                    # SREM rather than DEL so keys tagged meanwhile stay tracked
+                    for tag, tagged in zip(tags, members):
+                        if tagged:
+                            pipe.srem(cache_tag_key(tag), *tagged)
+                    await pipe.execute()
+                await self._broadcast_invalidation({"keys": sorted(keys)})
         except Exception as e:
-            logger.error("Cache invalidation failed for pattern %s: %s", pattern, e)
+            logger.error("Cache invalidation failed for tags %s: %s", tags, e)
 
     async def invalidate_key(self, key: str):
         """Invalidate a specific cache key"""
+        self._forget(keys=[key])
         if not self.redis:
             return
         try:
             await self.redis.delete(key)
         except Exception as e:
             logger.error("Redis delete error for key %s: %s", key, e)
+        await self._broadcast_invalidation({"keys": [key]})
+
+
+class EventBus:
+    """Durable events on Redis Streams.
+
+    Unlike PUBLISH, an event stays in its stream (trimmed to roughly
+    `maxlen` entries) after it is written, so readers that were
+    disconnected pick up where they left off instead of losing it:
+
+    - read(): fan-out readers (e.g. the WebSocket hub in every process)
+      track the last entry ID they saw and resume from it
+    - consume(): worker-style consumers (printers, analytics, ...) share a
+      consumer group; each event goes to one consumer and is acked after
+      its handler succeeds, unacked events are reclaimed from consumers that
+      died and retried up to max_deliveries times
+    - replay(): entries after a given ID, e.g. for a reconnecting client
+
+    Entry IDs ("<ms>-<n>") increase strictly and double as event sequence
+    numbers.
+    """
+
+    def __init__(self, manager: RedisManager, maxlen: int = 5000):
+        self.manager = manager
+        self.maxlen = maxlen
+
+    @staticmethod
+    def _decode(entries) -> List[Tuple[str, dict]]:
+        events = []
+        for entry_id, fields in entries or []:
+            if not fields:
+                continue  # entries trimmed while still pending come back empty
+            try:
+                events.append((entry_id, json.loads(fields["event"])))
+            except (KeyError, ValueError):
+                logger.warning("Skipping malformed stream entry %s", entry_id)
+        return events
+
+    async def publish(self, stream: str, event: dict) -> Optional[str]:
+        """Append an event; returns its entry ID (None if Redis is unavailable)"""
+        if not self.manager.redis:
+            return None
+        return await self.manager.redis.xadd(
+            stream, {"event": json.dumps(event, default=str)},
+            maxlen=self.maxlen, approximate=True
+        )
+
+    async def latest_id(self, stream: str) -> str:
+        """ID of the newest entry, "0-0" for an empty stream"""
+        entries = await self.manager.redis.xrevrange(stream, count=1)
+        return entries[0][0] if entries else "0-0"
+
+    async def oldest_id(self, stream: str) -> Optional[str]:
+        entries = await self.manager.redis.xrange(stream, count=1)
+        return entries[0][0] if entries else None
+
+    async def replay(self, stream: str, after: str = "0-0", count: int = 100) -> List[Tuple[str, dict]]:
+        """Up to `count` events after entry `after`, oldest first"""
+        entries = await self.manager.redis.xrange(stream, min=f"({after}", count=count)
+        return self._decode(entries)
+
+    async def read(self, stream: str, last_id: str, count: int = 100, block: int = 5000) -> List[Tuple[str, dict]]:
+        """Events after last_id, waiting up to `block` ms for new ones"""
+        result = await self.manager.redis.xread({stream: last_id}, count=count, block=block)
+        return self._decode(result[0][1]) if result else []
+
+    async def ensure_group(self, stream: str, group: str, start_id: str = "$"):
+        try:
+            await self.manager.redis.xgroup_create(stream, group, id=start_id, mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def consume(
+        self,
+        stream: str,
+        group: str,
+        consumer: str,
+        handler: Callable[[dict], Awaitable[None]],
+        max_deliveries: int = 5,
+        claim_idle_ms: int = 60000,
+        block: int = 5000
+    ):
+        """Run `handler` for the group's events until cancelled"""
+        group_ready = False
+        while True:
+            redis_client = self.manager.redis
+            if redis_client is None:
+                await asyncio.sleep(5)
+                continue
+            try:
+                if not group_ready:
+                    await self.ensure_group(stream, group)
+                    group_ready = True
+                # Events a dead consumer never acked first, then new ones
+                _, claimed, *_ = await redis_client.xautoclaim(
+                    stream, group, consumer, claim_idle_ms, count=50
+                )
+                entries = claimed
+                if not entries:
+                    result = await redis_client.xreadgroup(group, consumer, {stream: ">"}, count=50, block=block)
+                    entries = result[0][1] if result else []
+                for entry_id, event in self._decode(entries):
+                    await self._handle(stream, group, entry_id, event, handler, max_deliveries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Event consumer %s/%s error: %s", stream, group, e)
+                await asyncio.sleep(5)
+
+    async def _handle(self, stream, group, entry_id, event, handler, max_deliveries):
+        redis_client = self.manager.redis
+        try:
+            await handler(event)
+        except Exception as e:
+            pending = await redis_client.xpending_range(stream, group, min=entry_id, max=entry_id, count=1)
+            deliveries = pending[0]["times_delivered"] if pending else max_deliveries
+            if deliveries < max_deliveries:
+                logger.warning("Event %s on %s failed (attempt %d), will retry: %s",
+                               entry_id, stream, deliveries, e)
+                return
+            logger.error("Dropping event %s on %s after %d attempts: %s",
+                         entry_id, stream, deliveries, e)
+        await redis_client.xack(stream, group, entry_id)
 
 
 # Cache key constants
@@ -92,6 +422,29 @@ CACHE_MODIFIERS = "cache:modifiers"
 CACHE_MENU_ITEMS = "cache:menu_items"
 CACHE_BRANCHES = "cache:branches"
 CACHE_SITE_PAGES = "cache:site_pages"
+CACHE_GEOCODE = "cache:geocode"  # prefix, one key per normalized address
+
+# Cache tags: invalidate_tags(TAG_MENU) drops every entry registered under it
+CACHE_TAG_PREFIX = "cache:tag:"
+TAG_MENU = "menu"
+TAG_ZONES = "zones"
+TAG_BRANCHES = "branches"
+TAG_SITE_PAGES = "site_pages"
+
+CACHE_TAGS = {
+    CACHE_CATEGORIES: (TAG_MENU,),
+    CACHE_PRODUCT_TAGS: (TAG_MENU,),
+    CACHE_MODIFIERS: (TAG_MENU,),
+    CACHE_MENU_ITEMS: (TAG_MENU,),
+    CACHE_DELIVERY_ZONES: (TAG_ZONES,),
+    CACHE_BRANCHES: (TAG_BRANCHES,),
+    CACHE_SITE_PAGES: (TAG_SITE_PAGES,),
+}
+
+
+def cache_tag_key(tag: str) -> str:
+    return f"{CACHE_TAG_PREFIX}{tag}"
+
 
 # TTL values in seconds
 TTL_CATEGORIES = 3600       # 1 hour
@@ -101,5 +454,12 @@ TTL_MODIFIERS = 7200        # 2 hours
 TTL_MENU_ITEMS = 900        # 15 minutes
 TTL_BRANCHES = 3600         # 1 hour
 TTL_SITE_PAGES = 1800       # 30 minutes
+TTL_GEOCODE = 2592000       # 30 days
+TTL_GEOCODE_MISS = 86400    # 1 day
+
+# Event streams
+STREAM_ORDERS = "orders:feed"
+STREAM_MAXLEN = 5000
 
 redis_manager = RedisManager()
+event_bus = EventBus(redis_manager, maxlen=STREAM_MAXLEN)
@@ -4,6 +4,7 @@ from fastapi.responses import HTMLResponse
 from bson import ObjectId
 
 from .. import database
+from ..config import WS_STAFF_TOKEN
 from ..dependencies import templates
 from ..utils.serializers import serialize_all
 from ..utils.data_fetchers import get_categories_list
@@ -14,25 +15,24 @@ router = APIRouter(prefix="/admin", tags=["admin"])
 
 async def _get_modifiers_cached():
     """Get modifiers with Redis caching."""
-    cached = await redis_manager.get_cached(CACHE_MODIFIERS)
-    if cached is not None:
-        return cached
     if not database.connected or database.modifiers is None:
         return []
-    mods = [serialize_all(doc) for doc in database.modifiers.find()]
-    await redis_manager.set_cached(CACHE_MODIFIERS, mods, TTL_MODIFIERS)
-    return mods
+
+    async def load():
+        return [serialize_all(doc) async for doc in database.modifiers.find()]
+
+    return await redis_manager.cached(CACHE_MODIFIERS, load, TTL_MODIFIERS)
 
 
 @router.get("/orders", response_class=HTMLResponse)
 async def admin_orders_page(request: Request):
-    return templates.TemplateResponse("admin/orders.html", {"request": request})
+    return templates.TemplateResponse("admin/orders.html", {"request": request, "ws_token": WS_STAFF_TOKEN})
 
 
 @router.get("/assortment", response_class=HTMLResponse)
 async def admin_assortment_page(request: Request):
     """Assortment management page (all products catalog)"""
-    cats = get_categories_list()
+    cats = await get_categories_list()
     return templates.TemplateResponse("admin/assortment.html", {
         "request": request,
         "categories": cats
@@ -42,7 +42,7 @@ async def admin_assortment_page(request: Request):
 @router.get("/menu", response_class=HTMLResponse)
 async def admin_menu_page(request: Request):
     """Menu management page (active menu items)"""
-    cats = get_categories_list()
+    cats = await get_categories_list()
     return templates.TemplateResponse("admin/menu.html", {
         "request": request,
         "categories": cats
@@ -52,7 +52,7 @@ async def admin_menu_page(request: Request):
 @router.get("/dishes", response_class=HTMLResponse)
 async def admin_dishes_page(request: Request):
     """Modern dashboard for managing active menu dishes and modifiers"""
-    cats = get_categories_list()
+    cats = await get_categories_list()
     return templates.TemplateResponse("admin/dishes.html", {
         "request": request,
         "categories": cats
@@ -62,11 +62,11 @@ async def admin_dishes_page(request: Request):
 @router.get("/dishes/create", response_class=HTMLResponse)
 async def admin_dish_create_page(request: Request, category_id: Optional[str] = None):
     """Page for creating a new dish"""
-    cats = get_categories_list()
+    cats = await get_categories_list()
     mods = await _get_modifiers_cached()
     tags = []
     if database.connected and database.product_tags is not None:
-        tags = [serialize_all(doc) for doc in database.product_tags.find()]
+        tags = [serialize_all(doc) async for doc in database.product_tags.find()]
     return templates.TemplateResponse("admin/dish_form.html", {
         "request": request,
         "categories": cats,
@@ -86,17 +86,17 @@ async def admin_dish_edit_page(request: Request, dish_id: str):
     if not database.connected or database.products is None:
         raise HTTPException(status_code=503, detail="Database not connected")
 
-    dish = database.products.find_one({"_id": ObjectId(dish_id)})
+    dish = await database.products.find_one({"_id": ObjectId(dish_id)})
     if not dish:
         raise HTTPException(status_code=404, detail="Dish not found")
 
-    cats = get_categories_list()
+    cats = await get_categories_list()
     mods = await _get_modifiers_cached()
     tags = []
     if database.product_tags is not None:
-        tags = [serialize_all(doc) for doc in database.product_tags.find()]
+        tags = [serialize_all(doc) async for doc in database.product_tags.find()]
 
-    all_dishes = list(database.products.find({}, {"_id": 1}).sort("_id", 1))
+    all_dishes = await database.products.find({}, {"_id": 1}).sort("_id", 1).to_list()
     all_dish_ids = [str(d["_id"]) for d in all_dishes]
 
     current_index = all_dish_ids.index(dish_id) if dish_id in all_dish_ids else -1
@@ -124,7 +124,7 @@ async def admin_stats_page(request: Request):
 
 @router.get("/production", response_class=HTMLResponse)
 async def admin_production_page(request: Request):
-    categories = get_categories_list()
+    categories = await get_categories_list()
     return templates.TemplateResponse("admin/production.html", {"request": request, "categories": categories})
 
 
@@ -11,7 +11,7 @@ from pymongo import ReturnDocument
 
 from .. import database
 from ..utils.serializers import serialize_all
-from ..redis_manager import redis_manager, CACHE_BRANCHES, TTL_BRANCHES
+from ..redis_manager import redis_manager, CACHE_BRANCHES, TTL_BRANCHES, TAG_BRANCHES
 
 router = APIRouter(prefix="/api/branches", tags=["branches"])
 
@@ -29,18 +29,14 @@ DEFAULT_SCHEDULE = [
 @router.get("/")
 async def list_branches():
     """List all branches."""
-    cached = await redis_manager.get_cached(CACHE_BRANCHES)
-    if cached is not None:
-        return cached
-
     if not database.connected or database.branches is None:
         return []
 
-    branches = list(database.branches.find().sort("name", 1))
-    result = [serialize_all(b) for b in branches]
+    async def load():
+        branches = await database.branches.find().sort("name", 1).to_list()
+        return [serialize_all(b) for b in branches]
 
-    await redis_manager.set_cached(CACHE_BRANCHES, result, TTL_BRANCHES)
-    return result
+    return await redis_manager.cached(CACHE_BRANCHES, load, TTL_BRANCHES)
 
 
 @router.get("/{branch_id}")
@@ -52,7 +48,7 @@ async def get_branch(branch_id: str):
     if not ObjectId.is_valid(branch_id):
         raise HTTPException(status_code=400, detail="Invalid branch ID")
 
-    branch = database.branches.find_one({"_id": ObjectId(branch_id)})
+    branch = await database.branches.find_one({"_id": ObjectId(branch_id)})
     if not branch:
         raise HTTPException(status_code=404, detail="Branch not found")
 
@@ -81,10 +77,10 @@ async def create_branch(data: dict):
     # Remove _id if present (for create)
     data.pop("_id", None)
 
-    result = database.branches.insert_one(data)
+    result = await database.branches.insert_one(data)
     data["_id"] = result.inserted_id
 
-    await redis_manager.invalidate_key(CACHE_BRANCHES)
+    await redis_manager.invalidate_tags(TAG_BRANCHES)
     return serialize_all(data)
 
 
@@ -97,7 +93,7 @@ async def update_branch(branch_id: str, data: dict):
     if not ObjectId.is_valid(branch_id):
         raise HTTPException(status_code=400, detail="Invalid branch ID")
 
-    existing = database.branches.find_one({"_id": ObjectId(branch_id)})
+    existing = await database.branches.find_one({"_id": ObjectId(branch_id)})
     if not existing:
         raise HTTPException(status_code=404, detail="Branch not found")
 
@@ -106,13 +102,13 @@ async def update_branch(branch_id: str, data: dict):
     data.pop("_id", None)
     data.pop("created_at", None)
 
-    updated = database.branches.find_one_and_update(
+    updated = await database.branches.find_one_and_update(
         {"_id": ObjectId(branch_id)},
         {"$set": data},
         return_document=ReturnDocument.AFTER
     )
 
-    await redis_manager.invalidate_key(CACHE_BRANCHES)
+    await redis_manager.invalidate_tags(TAG_BRANCHES)
     return serialize_all(updated)
 
 
@@ -125,9 +121,9 @@ async def delete_branch(branch_id: str):
     if not ObjectId.is_valid(branch_id):
         raise HTTPException(status_code=400, detail="Invalid branch ID")
 
-    result = database.branches.delete_one({"_id": ObjectId(branch_id)})
+    result = await database.branches.delete_one({"_id": ObjectId(branch_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Branch not found")
 
-    await redis_manager.invalidate_key(CACHE_BRANCHES)
+    await redis_manager.invalidate_tags(TAG_BRANCHES)
     return {"status": "deleted", "branch_id": branch_id}
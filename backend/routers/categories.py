@@ -6,34 +6,26 @@ from .. import database
 from ..models import CategoryCreate
 from ..utils.serializers import serialize_doc
 from ..utils.data_fetchers import get_categories_list
-from ..redis_manager import redis_manager, CACHE_CATEGORIES, TTL_CATEGORIES
+from ..redis_manager import redis_manager, CACHE_CATEGORIES, TTL_CATEGORIES, TAG_MENU
+from ..menu_cache import menu_cache
 
 router = APIRouter(prefix="/api/categories", tags=["categories"])
 
 
 @router.get("/")
 async def get_categories():
-    # Try cache first
-    cached = await redis_manager.get_cached(CACHE_CATEGORIES)
-    if cached is not None:
-        return cached
-
-    # Get from database
-    result = get_categories_list()
-
-    # Cache the result
-    await redis_manager.set_cached(CACHE_CATEGORIES, result, TTL_CATEGORIES)
-    return result
+    return await redis_manager.cached(CACHE_CATEGORIES, get_categories_list, TTL_CATEGORIES)
 
 
 @router.post("/")
 async def create_category(data: CategoryCreate):
     if not database.connected or database.categories is None:
         raise HTTPException(status_code=503, detail="Database not connected")
-    result = database.categories.insert_one(data.model_dump())
+    result = await database.categories.insert_one(data.model_dump())
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_CATEGORIES)
+    await redis_manager.invalidate_tags(TAG_MENU)
+    await menu_cache.invalidate()
 
     return {"_id": str(result.inserted_id), **data.model_dump()}
 
@@ -42,13 +34,14 @@ async def create_category(data: CategoryCreate):
 async def update_category(category_id: str, data: CategoryCreate):
     if not database.connected or database.categories is None:
         raise HTTPException(status_code=503, detail="Database not connected")
-    result = database.categories.update_one(
+    result = await database.categories.update_one(
         {"_id": ObjectId(category_id)},
         {"$set": data.model_dump()}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
-    await redis_manager.invalidate_key(CACHE_CATEGORIES)
+    await redis_manager.invalidate_tags(TAG_MENU)
+    await menu_cache.invalidate()
     return {"status": "updated"}
 
 
@@ -65,8 +58,9 @@ async def reorder_categories(req: Request):
         for item in items if ObjectId.is_valid(item.get("id", ""))
     ]
     if operations:
-        database.categories.bulk_write(operations, ordered=False)
-    await redis_manager.invalidate_key(CACHE_CATEGORIES)
+        await database.categories.bulk_write(operations, ordered=False)
+    await redis_manager.invalidate_tags(TAG_MENU)
+    await menu_cache.invalidate()
     return {"status": "reordered", "count": len(operations)}
 
 
@@ -74,11 +68,12 @@ async def reorder_categories(req: Request):
 async def delete_category(category_id: str):
     if not database.connected or database.categories is None:
         raise HTTPException(status_code=503, detail="Database not connected")
-    result = database.categories.delete_one({"_id": ObjectId(category_id)})
+    result = await database.categories.delete_one({"_id": ObjectId(category_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_CATEGORIES)
+    await redis_manager.invalidate_tags(TAG_MENU)
+    await menu_cache.invalidate()
 
     return {"status": "deleted"}
@@ -7,6 +7,7 @@ from .. import database
 from ..models import ComboCreate
 from ..utils.serializers import serialize_docs
 from ..utils.demo_data import DEMO_COMBOS, DEMO_MENU_ITEMS
+from ..menu_cache import menu_cache
 
 router = APIRouter(prefix="/api/combos", tags=["combos"])
 
@@ -24,8 +25,8 @@ async def get_combos(available: bool = None, skip: int = 0, limit: int = 100):
     if available is not None:
         query["available"] = available
 
-    total = database.combos.count_documents(query)
-    combos = list(database.combos.find(query).skip(skip).limit(limit))
+    total = await database.combos.count_documents(query)
+    combos = await database.combos.find(query).skip(skip).limit(limit).to_list()
 
     return {
         "items": serialize_docs(combos),
@@ -47,9 +48,10 @@ async def create_combo(data: ComboCreate):
 
     combo_doc = data.model_dump()
     combo_doc["created_at"] = datetime.utcnow()
-    result = database.combos.insert_one(combo_doc)
+    result = await database.combos.insert_one(combo_doc)
     combo_doc["_id"] = str(result.inserted_id)
     combo_doc["created_at"] = combo_doc["created_at"].isoformat()
+    await menu_cache.invalidate()
     return combo_doc
 
 
@@ -63,12 +65,13 @@ async def update_combo(combo_id: str, data: ComboCreate):
                 return combo
         raise HTTPException(status_code=404, detail="Combo not found")
 
-    result = database.combos.update_one(
+    result = await database.combos.update_one(
         {"_id": ObjectId(combo_id)},
         {"$set": data.model_dump()}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Combo not found")
+    await menu_cache.invalidate()
     return {"status": "updated"}
 
 
@@ -79,9 +82,10 @@ async def delete_combo(combo_id: str):
         DEMO_COMBOS[:] = [c for c in DEMO_COMBOS if c["_id"] != combo_id]
         return {"status": "deleted"}
 
-    result = database.combos.delete_one({"_id": ObjectId(combo_id)})
+    result = await database.combos.delete_one({"_id": ObjectId(combo_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Combo not found")
+    await menu_cache.invalidate()
     return {"status": "deleted"}
 
 
@@ -98,7 +102,7 @@ async def get_combos_available_for_menu():
 
     menu_combo_ids = [
         item["combo_id"]
-        for item in database.menu_items.find({"item_type": "combo"})
+        async for item in database.menu_items.find({"item_type": "combo"})
         if item.get("combo_id")
     ]
 
@@ -106,4 +110,4 @@ async def get_combos_available_for_menu():
     if menu_combo_ids:
         query["_id"] = {"$nin": [ObjectId(cid) for cid in menu_combo_ids]}
 
-    return serialize_docs(database.combos.find(query))
+    return serialize_docs(await database.combos.find(query).to_list())
@@ -16,7 +16,7 @@ async def get_customer_categories():
     if not database.connected or database.customer_categories is None:
         return {"items": [], "total": 0}
 
-    cats = list(database.customer_categories.find().sort("created_at", -1))
+    cats = await database.customer_categories.find().sort("created_at", -1).to_list()
     return {
         "items": serialize_docs(cats),
         "total": len(cats)
@@ -32,7 +32,7 @@ async def create_customer_category(data: CustomerCategoryCreate):
     doc = data.model_dump()
     doc["created_at"] = datetime.utcnow()
 
-    result = database.customer_categories.insert_one(doc)
+    result = await database.customer_categories.insert_one(doc)
     doc["_id"] = str(result.inserted_id)
     doc["created_at"] = doc["created_at"].isoformat()
     return doc
@@ -45,7 +45,7 @@ async def update_customer_category(category_id: str, data: CustomerCategoryCreat
         raise HTTPException(status_code=503, detail="Database unavailable")
 
     update_data = data.model_dump()
-    result = database.customer_categories.update_one(
+    result = await database.customer_categories.update_one(
         {"_id": ObjectId(category_id)},
         {"$set": update_data}
     )
@@ -62,12 +62,12 @@ async def delete_customer_category(category_id: str):
 
     # Remove category from all customers that have it
     if database.customers is not None:
-        database.customers.update_many(
+        await database.customers.update_many(
             {"category_ids": category_id},
             {"$pull": {"category_ids": category_id}}
         )
 
-    result = database.customer_categories.delete_one({"_id": ObjectId(category_id)})
+    result = await database.customer_categories.delete_one({"_id": ObjectId(category_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Категорію не знайдено")
     return {"status": "deleted"}
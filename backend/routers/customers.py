@@ -1,5 +1,6 @@
 import re
 from datetime import datetime
+from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query
 from bson import ObjectId
@@ -7,13 +8,12 @@ from bson import ObjectId
 from .. import database
 from ..models import CustomerCreate
 from ..utils.serializers import serialize_doc, serialize_docs
+from ..utils.phone import normalize_phone
 
 router = APIRouter(prefix="/api/customers", tags=["customers"])
 
-
-def normalize_phone(phone: str) -> str:
-    """Normalize phone number: strip spaces, dashes, parentheses"""
-    return re.sub(r'[\s\-\(\)]', '', phone.strip())
+CUSTOMER_ORDERS_PAGE = 20
+CUSTOMER_ORDERS_MAX = 100
 
 
 @router.get("/")
@@ -37,12 +37,13 @@ async def get_customers(
     if category_id:
         query["category_ids"] = category_id
 
-    total = database.customers.count_documents(query)
-    customers = list(
+    total = await database.customers.count_documents(query)
+    customers = await (
         database.customers.find(query)
         .sort("created_at", -1)
         .skip(skip)
         .limit(limit)
+        .to_list()
     )
 
     return {
@@ -63,7 +64,7 @@ async def lookup_customer(phone: str):
     if not phone_normalized:
         return {"found": False}
 
-    customer = database.customers.find_one({"phone": phone_normalized})
+    customer = await database.customers.find_one({"phone": phone_normalized})
     if not customer:
         return {"found": False, "phone": phone_normalized}
 
@@ -79,10 +80,10 @@ async def lookup_customer(phone: str):
                 cat_ids.append(ObjectId(cid))
 
         if cat_ids:
-            categories = list(database.customer_categories.find({
+            categories = await database.customer_categories.find({
                 "_id": {"$in": cat_ids},
                 "is_active": True
-            }))
+            }).to_list()
             if categories:
                 category_names = [cat["name"] for cat in categories]
                 best_cat = max(categories, key=lambda c: c.get("discount_percent", 0))
@@ -102,14 +103,46 @@ async def lookup_customer(phone: str):
     }
 
 
+async def _customer_orders(phone: str, limit: int, cursor: Optional[str] = None) -> dict:
+    """A keyset page of the customer's orders, newest first"""
+    query = {"customer_phone": phone}
+    if cursor:
+        try:
+            created_at, order_id = cursor.split("|", 1)
+            created_at, order_oid = datetime.fromisoformat(created_at), ObjectId(order_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Невірний курсор")
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": order_oid}}
+        ]
+
+    orders = await (
+        database.orders.find(query)
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+        .to_list()
+    )
+    has_more = len(orders) > limit
+    orders = serialize_docs(orders[:limit])
+    return {
+        "items": orders,
+        "next_cursor": f"{orders[-1]['created_at']}|{orders[-1]['_id']}" if has_more else None,
+        "limit": limit
+    }
+
+
 @router.get("/{customer_id}")
-async def get_customer(customer_id: str):
-    """Get a single customer with order history"""
+async def get_customer(
+    customer_id: str,
+    orders_limit: int = Query(CUSTOMER_ORDERS_PAGE, ge=1, le=CUSTOMER_ORDERS_MAX)
+):
+    """Get a single customer with the first page of their order history"""
     if not database.connected or database.customers is None:
         raise HTTPException(status_code=503, detail="Database unavailable")
 
     try:
-        customer = database.customers.find_one({"_id": ObjectId(customer_id)})
+        customer = await database.customers.find_one({"_id": ObjectId(customer_id)})
     except Exception:
         raise HTTPException(status_code=400, detail="Невірний ID")
 
@@ -118,24 +151,16 @@ async def get_customer(customer_id: str):
 
     result = serialize_doc(customer)
 
-    # Fetch recent orders
-    if customer.get("order_history"):
-        order_ids = [ObjectId(oid) for oid in customer["order_history"][-20:] if ObjectId.is_valid(oid)]
-        if order_ids:
-            orders = list(database.orders.find(
-                {"_id": {"$in": order_ids}}
-            ).sort("created_at", -1))
-            result["orders"] = serialize_docs(orders)
-        else:
-            result["orders"] = []
-    else:
-        result["orders"] = []
+    # First page of the order history; more via /{customer_id}/orders
+    page = await _customer_orders(customer["phone"], orders_limit)
+    result["orders"] = page["items"]
+    result["orders_next_cursor"] = page["next_cursor"]
 
     # Fetch category details
     if customer.get("category_ids"):
         cat_ids = [ObjectId(cid) for cid in customer["category_ids"] if ObjectId.is_valid(cid)]
         if cat_ids:
-            cats = list(database.customer_categories.find({"_id": {"$in": cat_ids}}))
+            cats = await database.customer_categories.find({"_id": {"$in": cat_ids}}).to_list()
             result["categories"] = serialize_docs(cats)
         else:
             result["categories"] = []
@@ -145,6 +170,27 @@ async def get_customer(customer_id: str):
     return result
 
 
+@router.get("/{customer_id}/orders")
+async def get_customer_orders(
+    customer_id: str,
+    cursor: Optional[str] = None,
+    limit: int = Query(CUSTOMER_ORDERS_PAGE, ge=1, le=CUSTOMER_ORDERS_MAX)
+):
+    """Customer's order history, one page at a time (pass next_cursor back as cursor)"""
+    if not database.connected or database.customers is None:
+        raise HTTPException(status_code=503, detail="Database unavailable")
+
+    try:
+        customer = await database.customers.find_one({"_id": ObjectId(customer_id)}, {"phone": 1})
+    except Exception:
+        raise HTTPException(status_code=400, detail="Невірний ID")
+
+    if not customer:
+        raise HTTPException(status_code=404, detail="Клієнта не знайдено")
+
+    return await _customer_orders(customer["phone"], limit, cursor)
+
+
 @router.post("/")
 async def create_customer(data: CustomerCreate):
     """Create a new customer (admin)"""
@@ -155,7 +201,7 @@ async def create_customer(data: CustomerCreate):
     if not phone:
         raise HTTPException(status_code=400, detail="Телефон обов'язковий")
 
-    existing = database.customers.find_one({"phone": phone})
+    existing = await database.customers.find_one({"phone": phone})
     if existing:
         raise HTTPException(status_code=400, detail="Клієнт з таким телефоном вже існує")
 
@@ -171,7 +217,7 @@ async def create_customer(data: CustomerCreate):
         "updated_at": datetime.utcnow()
     }
 
-    result = database.customers.insert_one(doc)
+    result = await database.customers.insert_one(doc)
     doc["_id"] = str(result.inserted_id)
     doc["created_at"] = doc["created_at"].isoformat()
     doc["updated_at"] = doc["updated_at"].isoformat()
@@ -187,7 +233,7 @@ async def update_customer(customer_id: str, data: CustomerCreate):
     phone = normalize_phone(data.phone)
 
     # Check if phone is taken by another customer
-    existing = database.customers.find_one({"phone": phone, "_id": {"$ne": ObjectId(customer_id)}})
+    existing = await database.customers.find_one({"phone": phone, "_id": {"$ne": ObjectId(customer_id)}})
     if existing:
         raise HTTPException(status_code=400, detail="Цей телефон вже належить іншому клієнту")
 
@@ -199,7 +245,7 @@ async def update_customer(customer_id: str, data: CustomerCreate):
         "updated_at": datetime.utcnow()
     }
 
-    result = database.customers.update_one(
+    result = await database.customers.update_one(
         {"_id": ObjectId(customer_id)},
         {"$set": update_data}
     )
@@ -214,7 +260,7 @@ async def delete_customer(customer_id: str):
     if not database.connected or database.customers is None:
         raise HTTPException(status_code=503, detail="Database unavailable")
 
-    result = database.customers.delete_one({"_id": ObjectId(customer_id)})
+    result = await database.customers.delete_one({"_id": ObjectId(customer_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Клієнта не знайдено")
     return {"status": "deleted"}
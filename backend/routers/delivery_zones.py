@@ -17,24 +17,25 @@ from ..models import (
     DeliveryZoneCreate,
     DeliveryCenterUpdate,
     GeocodeRequest,
+    BulkZoneDetectionRequest,
     ZoneDetectionResult,
     ZoneType
 )
 from ..utils.serializers import serialize_doc
 from ..utils.demo_data import DEMO_ZONES, DEMO_CENTER
 from ..utils.geocoding import geocode_address
-from ..utils.zones import circle_to_polygon, detect_zone, calculate_polygon_centroid
-from ..redis_manager import redis_manager, CACHE_DELIVERY_ZONES, TTL_DELIVERY_ZONES
+from ..utils.zones import circle_to_polygon, detect_zone, detect_many, calculate_polygon_centroid, zone_index
+from ..redis_manager import redis_manager, CACHE_DELIVERY_ZONES, TTL_DELIVERY_ZONES, TAG_ZONES
 
 router = APIRouter(prefix="/api/delivery-zones", tags=["delivery-zones"])
 
 
-def _get_center() -> dict:
+async def _get_center() -> dict:
     """Get delivery center from database or demo data."""
     if not database.connected or database.settings is None:
         return DEMO_CENTER
 
-    center = database.settings.find_one({"_id": "delivery_center"})
+    center = await database.settings.find_one({"_id": "delivery_center"})
     if center:
         return {
             "lat": center.get("lat", DEMO_CENTER["lat"]),
@@ -102,20 +103,14 @@ def _prepare_zone_data(zone: DeliveryZoneCreate, center: dict) -> dict:
 @router.get("/")
 async def list_zones() -> List[dict]:
     """List all delivery zones sorted by priority."""
-    # Try cache first
-    cached = await redis_manager.get_cached(CACHE_DELIVERY_ZONES)
-    if cached is not None:
-        return cached
-
     if not database.connected or database.delivery_zones is None:
         return DEMO_ZONES
 
-    zones = list(database.delivery_zones.find().sort("priority", 1))
-    result = [serialize_doc(z) for z in zones]
+    async def load():
+        zones = await database.delivery_zones.find().sort("priority", 1).to_list()
+        return [serialize_doc(z) for z in zones]
 
-    # Cache the result
-    await redis_manager.set_cached(CACHE_DELIVERY_ZONES, result, TTL_DELIVERY_ZONES)
-    return result
+    return await redis_manager.cached(CACHE_DELIVERY_ZONES, load, TTL_DELIVERY_ZONES)
 
 
 @router.get("/{zone_id}")
@@ -130,7 +125,7 @@ async def get_zone(zone_id: str) -> dict:
     if not ObjectId.is_valid(zone_id):
         raise HTTPException(status_code=400, detail="Invalid zone ID")
 
-    zone = database.delivery_zones.find_one({"_id": ObjectId(zone_id)})
+    zone = await database.delivery_zones.find_one({"_id": ObjectId(zone_id)})
     if not zone:
         raise HTTPException(status_code=404, detail="Zone not found")
 
@@ -143,16 +138,17 @@ async def create_zone(zone: DeliveryZoneCreate) -> dict:
     if not database.connected or database.delivery_zones is None:
         raise HTTPException(status_code=503, detail="Database not available")
 
-    center = _get_center()
+    center = await _get_center()
     zone_data = _prepare_zone_data(zone, center)
 
     zone_data["created_at"] = datetime.utcnow()
     zone_data["updated_at"] = datetime.utcnow()
 
-    result = database.delivery_zones.insert_one(zone_data)
+    result = await database.delivery_zones.insert_one(zone_data)
     zone_data["_id"] = result.inserted_id
 
-    await redis_manager.invalidate_key(CACHE_DELIVERY_ZONES)
+    await redis_manager.invalidate_tags(TAG_ZONES)
+    await zone_index.invalidate()
 
     return serialize_doc(zone_data)
 
@@ -166,21 +162,22 @@ async def update_zone(zone_id: str, zone: DeliveryZoneCreate) -> dict:
     if not ObjectId.is_valid(zone_id):
         raise HTTPException(status_code=400, detail="Invalid zone ID")
 
-    existing = database.delivery_zones.find_one({"_id": ObjectId(zone_id)})
+    existing = await database.delivery_zones.find_one({"_id": ObjectId(zone_id)})
     if not existing:
         raise HTTPException(status_code=404, detail="Zone not found")
 
-    center = _get_center()
+    center = await _get_center()
     zone_data = _prepare_zone_data(zone, center)
     zone_data["updated_at"] = datetime.utcnow()
 
-    updated = database.delivery_zones.find_one_and_update(
+    updated = await database.delivery_zones.find_one_and_update(
         {"_id": ObjectId(zone_id)},
         {"$set": zone_data},
         return_document=ReturnDocument.AFTER
     )
 
-    await redis_manager.invalidate_key(CACHE_DELIVERY_ZONES)
+    await redis_manager.invalidate_tags(TAG_ZONES)
+    await zone_index.invalidate()
 
     return serialize_doc(updated)
 
@@ -194,12 +191,13 @@ async def delete_zone(zone_id: str) -> dict:
     if not ObjectId.is_valid(zone_id):
         raise HTTPException(status_code=400, detail="Invalid zone ID")
 
-    result = database.delivery_zones.delete_one({"_id": ObjectId(zone_id)})
+    result = await database.delivery_zones.delete_one({"_id": ObjectId(zone_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Zone not found")
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_DELIVERY_ZONES)
+    await redis_manager.invalidate_tags(TAG_ZONES)
+    await zone_index.invalidate()
 
     return {"status": "deleted", "zone_id": zone_id}
 
@@ -209,7 +207,7 @@ async def delete_zone(zone_id: str) -> dict:
 @router.get("/center/info")
 async def get_center() -> dict:
     """Get the delivery center point."""
-    return _get_center()
+    return await _get_center()
 
 
 @router.put("/center/info")
@@ -231,14 +229,14 @@ async def update_center(center: DeliveryCenterUpdate) -> dict:
         "address": center.address
     }
 
-    database.settings.update_one(
+    await database.settings.update_one(
         {"_id": "delivery_center"},
         {"$set": center_data},
         upsert=True
     )
 
     # Invalidate zones cache since center changed
-    await redis_manager.invalidate_key(CACHE_DELIVERY_ZONES)
+    await redis_manager.invalidate_tags(TAG_ZONES)
 
     return {
         "lat": center.lat,
@@ -258,10 +256,10 @@ async def recalculate_all_zones() -> dict:
     if not database.connected or database.delivery_zones is None:
         raise HTTPException(status_code=503, detail="Database not available")
 
-    center = _get_center()
+    center = await _get_center()
 
     # Only get radius zones - polygon zones are not affected by center changes
-    zones = list(database.delivery_zones.find({"zone_type": "radius"}))
+    zones = await database.delivery_zones.find({"zone_type": "radius"}).to_list()
 
     if not zones:
         return {
@@ -280,10 +278,11 @@ async def recalculate_all_zones() -> dict:
         for zone in zones
     ]
 
-    result = database.delivery_zones.bulk_write(operations)
+    result = await database.delivery_zones.bulk_write(operations)
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_DELIVERY_ZONES)
+    await redis_manager.invalidate_tags(TAG_ZONES)
+    await zone_index.invalidate()
 
     return {
         "status": "recalculated",
@@ -321,7 +320,7 @@ async def detect_zone_from_address(request: GeocodeRequest) -> ZoneDetectionResu
     lat, lng = coords
 
     # Detect zone
-    zone = detect_zone(lat, lng)
+    zone = await detect_zone(lat, lng)
 
     if zone is None:
         return ZoneDetectionResult(
@@ -360,7 +359,7 @@ async def detect_zone_from_coordinates(
             message="Визначення зони недоступне у демо-режимі"
         )
 
-    zone = detect_zone(lat, lng)
+    zone = await detect_zone(lat, lng)
 
     if zone is None:
         return ZoneDetectionResult(
@@ -379,3 +378,35 @@ async def detect_zone_from_coordinates(
         available=True,
         message=f"Зона: {zone.get('name', '')}"
     )
+
+
+@router.post("/detect-many")
+async def detect_zones_bulk(request: BulkZoneDetectionRequest) -> List[ZoneDetectionResult]:
+    """
+    Detect delivery zones for many coordinates at once (courier route planning).
+
+    Results are returned in the same order as the input points.
+    """
+    points = [(p.lat, p.lng) for p in request.points]
+    zones = await detect_many(points)
+
+    results = []
+    for (lat, lng), zone in zip(points, zones):
+        if zone is None:
+            results.append(ZoneDetectionResult(
+                available=False,
+                coordinates={"lat": lat, "lng": lng},
+                message="Координати знаходяться поза зонами доставки"
+            ))
+            continue
+        results.append(ZoneDetectionResult(
+            zone_id=str(zone.get("_id", "")),
+            zone_name=zone.get("name", ""),
+            delivery_fee=zone.get("delivery_fee", 0),
+            min_order_amount=zone.get("min_order_amount", 0),
+            free_delivery_threshold=zone.get("free_delivery_threshold"),
+            coordinates={"lat": lat, "lng": lng},
+            available=True,
+            message=f"Зона: {zone.get('name', '')}"
+        ))
+    return results
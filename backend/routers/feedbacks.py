@@ -16,7 +16,7 @@ async def get_feedbacks(limit: int = 50):
     if not database.connected or database.feedbacks is None:
         return DEMO_FEEDBACKS[:limit]
     return serialize_docs(
-        database.feedbacks.find().sort("created_at", -1).limit(limit)
+        await database.feedbacks.find().sort("created_at", -1).limit(limit).to_list()
     )
 
 
@@ -38,7 +38,7 @@ async def create_feedback(data: FeedbackCreate):
         feedback_doc["created_at"] = feedback_doc["created_at"].isoformat()
         DEMO_FEEDBACKS.insert(0, feedback_doc)
     else:
-        result = database.feedbacks.insert_one(feedback_doc)
+        result = await database.feedbacks.insert_one(feedback_doc)
         feedback_doc["_id"] = str(result.inserted_id)
         feedback_doc["created_at"] = feedback_doc["created_at"].isoformat()
 
@@ -63,7 +63,7 @@ async def get_feedback_stats():
             "average_rating": {"$avg": "$rating"}
         }}
     ]
-    result = list(database.feedbacks.aggregate(pipeline))
+    result = await (await database.feedbacks.aggregate(pipeline)).to_list()
 
     if not result:
         return {"total": 0, "average_rating": 0, "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}}
@@ -71,7 +71,7 @@ async def get_feedback_stats():
     dist_pipeline = [
         {"$group": {"_id": "$rating", "count": {"$sum": 1}}}
     ]
-    dist_result = list(database.feedbacks.aggregate(dist_pipeline))
+    dist_result = await (await database.feedbacks.aggregate(dist_pipeline)).to_list()
     distribution = {i: 0 for i in range(1, 6)}
     for item in dist_result:
         distribution[item["_id"]] = item["count"]
@@ -9,6 +9,7 @@ from .. import database
 from ..models import MenuItemCreate
 from ..utils.data_fetchers import get_menu_items_list
 from ..utils.demo_data import DEMO_MENU_ITEMS
+from ..menu_cache import menu_cache
 
 router = APIRouter(prefix="/api/menu-items", tags=["menu"])
 
@@ -16,7 +17,7 @@ router = APIRouter(prefix="/api/menu-items", tags=["menu"])
 @router.get("/")
 async def get_menu_items(active_only: bool = True):
     """Get menu items with product data"""
-    return get_menu_items_list(active_only)
+    return await get_menu_items_list(active_only)
 
 
 @router.post("/")
@@ -34,29 +35,30 @@ async def add_to_menu(data: MenuItemCreate):
     if item_type == "combo":
         if not data.combo_id:
             raise HTTPException(status_code=400, detail="combo_id is required for combos")
-        combo = database.combos.find_one({"_id": ObjectId(data.combo_id)})
+        combo = await database.combos.find_one({"_id": ObjectId(data.combo_id)})
         if not combo:
             raise HTTPException(status_code=404, detail="Комбо не знайдено")
 
-        existing = database.menu_items.find_one({"combo_id": data.combo_id, "item_type": "combo"})
+        existing = await database.menu_items.find_one({"combo_id": data.combo_id, "item_type": "combo"})
         if existing:
             raise HTTPException(status_code=400, detail="Комбо вже є в меню")
     else:
         if not data.product_id:
             raise HTTPException(status_code=400, detail="product_id is required for products")
-        product = database.products.find_one({"_id": ObjectId(data.product_id)})
+        product = await database.products.find_one({"_id": ObjectId(data.product_id)})
         if not product:
             raise HTTPException(status_code=404, detail="Продукт не знайдено")
 
-        existing = database.menu_items.find_one({"product_id": data.product_id})
+        existing = await database.menu_items.find_one({"product_id": data.product_id})
         if existing:
             raise HTTPException(status_code=400, detail="Продукт вже є в меню")
 
     doc = data.model_dump()
     doc["created_at"] = datetime.utcnow()
-    result = database.menu_items.insert_one(doc)
+    result = await database.menu_items.insert_one(doc)
     doc["_id"] = str(result.inserted_id)
     doc["created_at"] = doc["created_at"].isoformat()
+    await menu_cache.invalidate()
     return doc
 
 
@@ -70,12 +72,13 @@ async def update_menu_item(menu_item_id: str, data: MenuItemCreate):
                 return item
         raise HTTPException(status_code=404, detail="Позицію меню не знайдено")
 
-    result = database.menu_items.update_one(
+    result = await database.menu_items.update_one(
         {"_id": ObjectId(menu_item_id)},
         {"$set": data.model_dump()}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Позицію меню не знайдено")
+    await menu_cache.invalidate()
     return {"status": "updated"}
 
 
@@ -86,9 +89,10 @@ async def remove_from_menu(menu_item_id: str):
         DEMO_MENU_ITEMS[:] = [m for m in DEMO_MENU_ITEMS if m["_id"] != menu_item_id]
         return {"status": "deleted"}
 
-    result = database.menu_items.delete_one({"_id": ObjectId(menu_item_id)})
+    result = await database.menu_items.delete_one({"_id": ObjectId(menu_item_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Позицію меню не знайдено")
+    await menu_cache.invalidate()
     return {"status": "deleted"}
 
 
@@ -106,7 +110,7 @@ async def batch_add_to_menu(product_ids: List[str]):
 
     added = []
     for product_id in product_ids:
-        existing = database.menu_items.find_one({"product_id": product_id})
+        existing = await database.menu_items.find_one({"product_id": product_id})
         if not existing:
             doc = {
                 "item_type": "product",
@@ -115,8 +119,9 @@ async def batch_add_to_menu(product_ids: List[str]):
                 "sort_order": 0,
                 "created_at": datetime.utcnow()
             }
-            result = database.menu_items.insert_one(doc)
+            result = await database.menu_items.insert_one(doc)
             added.append(str(result.inserted_id))
+    await menu_cache.invalidate()
     return {"added": added}
 
 
@@ -143,5 +148,6 @@ async def reorder_menu_items(req: Request):
         for update in items
     ]
     if operations:
-        database.menu_items.bulk_write(operations, ordered=False)
+        await database.menu_items.bulk_write(operations, ordered=False)
+    await menu_cache.invalidate()
     return {"status": "updated"}
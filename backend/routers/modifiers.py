@@ -5,7 +5,8 @@ from .. import database
 from ..models import ModifierGroupCreate
 from ..utils.serializers import serialize_doc, serialize_docs
 from ..utils.demo_data import DEMO_MODIFIERS
-from ..redis_manager import redis_manager, CACHE_MODIFIERS, TTL_MODIFIERS
+from ..redis_manager import redis_manager, CACHE_MODIFIERS, TTL_MODIFIERS, TAG_MENU
+from ..menu_cache import menu_cache
 
 router = APIRouter(prefix="/api/modifiers", tags=["modifiers"])
 
@@ -13,21 +14,13 @@ router = APIRouter(prefix="/api/modifiers", tags=["modifiers"])
 @router.get("/")
 async def get_modifiers():
     """Get all modifier groups"""
-    # Try cache first
-    cached = await redis_manager.get_cached(CACHE_MODIFIERS)
-    if cached is not None:
-        return cached
-
     if not database.connected or database.modifiers is None:
         return DEMO_MODIFIERS
 
-    modifiers = list(database.modifiers.find())
-    result = serialize_docs(modifiers)
-
-    # Cache the result
-    await redis_manager.set_cached(CACHE_MODIFIERS, result, TTL_MODIFIERS)
+    async def load():
+        return serialize_docs(await database.modifiers.find().to_list())
 
-    return result
+    return await redis_manager.cached(CACHE_MODIFIERS, load, TTL_MODIFIERS)
 
 
 @router.post("/")
@@ -40,11 +33,12 @@ async def create_modifier(data: ModifierGroupCreate):
         return modifier_doc
 
     modifier_doc = data.model_dump()
-    result = database.modifiers.insert_one(modifier_doc)
+    result = await database.modifiers.insert_one(modifier_doc)
     modifier_doc["_id"] = str(result.inserted_id)
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_MODIFIERS)
+    await redis_manager.invalidate_tags(TAG_MENU)
+    await menu_cache.invalidate()
 
     return modifier_doc
 
@@ -59,7 +53,7 @@ async def update_modifier(modifier_id: str, data: ModifierGroupCreate):
                 return mod
         raise HTTPException(status_code=404, detail="Modifier not found")
 
-    result = database.modifiers.update_one(
+    result = await database.modifiers.update_one(
         {"_id": ObjectId(modifier_id)},
         {"$set": data.model_dump()}
     )
@@ -67,7 +61,8 @@ async def update_modifier(modifier_id: str, data: ModifierGroupCreate):
         raise HTTPException(status_code=404, detail="Modifier not found")
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_MODIFIERS)
+    await redis_manager.invalidate_tags(TAG_MENU)
+    await menu_cache.invalidate()
 
     return {"status": "updated"}
 
@@ -79,12 +74,13 @@ async def delete_modifier(modifier_id: str):
         DEMO_MODIFIERS[:] = [m for m in DEMO_MODIFIERS if m["_id"] != modifier_id]
         return {"status": "deleted"}
 
-    result = database.modifiers.delete_one({"_id": ObjectId(modifier_id)})
+    result = await database.modifiers.delete_one({"_id": ObjectId(modifier_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Modifier not found")
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_MODIFIERS)
+    await redis_manager.invalidate_tags(TAG_MENU)
+    await menu_cache.invalidate()
 
     return {"status": "deleted"}
 
@@ -96,7 +92,7 @@ async def toggle_modifier(modifier_id: str, data: dict):
         raise HTTPException(status_code=503, detail="Database not connected")
 
     is_enabled = data.get("is_enabled", True)
-    result = database.modifiers.update_one(
+    result = await database.modifiers.update_one(
         {"_id": ObjectId(modifier_id)},
         {"$set": {"is_enabled": is_enabled}}
     )
@@ -104,7 +100,8 @@ async def toggle_modifier(modifier_id: str, data: dict):
         raise HTTPException(status_code=404, detail="Modifier not found")
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_MODIFIERS)
+    await redis_manager.invalidate_tags(TAG_MENU)
+    await menu_cache.invalidate()
 
     return {"status": "toggled", "is_enabled": is_enabled}
 
@@ -115,17 +112,18 @@ async def copy_modifier(modifier_id: str):
     if not database.connected or database.modifiers is None:
         raise HTTPException(status_code=503, detail="Database not connected")
 
-    modifier = database.modifiers.find_one({"_id": ObjectId(modifier_id)})
+    modifier = await database.modifiers.find_one({"_id": ObjectId(modifier_id)})
     if not modifier:
         raise HTTPException(status_code=404, detail="Modifier not found")
 
     del modifier["_id"]
     modifier["name"] = f"{modifier['name']} (копія)"
 
-    result = database.modifiers.insert_one(modifier)
+    result = await database.modifiers.insert_one(modifier)
     modifier["_id"] = str(result.inserted_id)
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_MODIFIERS)
+    await redis_manager.invalidate_tags(TAG_MENU)
+    await menu_cache.invalidate()
 
     return serialize_doc(modifier)
@@ -1,43 +1,185 @@
-import re
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException
 from bson import ObjectId
 from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 
 logger = logging.getLogger(__name__)
 
 from .. import database
-from ..dependencies import runtime_settings
-from ..models import OrderCreate
-from ..redis_manager import redis_manager
-from ..config import CHANNEL_ORDERS_NEW, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
-from ..telegram_bot import send_order_notification
-from ..dependencies import runtime_settings
-from ..utils.serializers import serialize_doc, serialize_docs
-from ..utils.order_helpers import generate_order_number
-from ..utils.promo import validate_promo_code, calculate_discount
+from ..models import OrderCreate, OrderBatch
+from .. import order_feed
+from ..config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+from ..job_queue import job_queue
+from ..telegram_bot import STATUS_LABELS
+from ..jobs import (
+    JOB_TELEGRAM_NEW_ORDER, JOB_TELEGRAM_STATUS_CHANGED,
+    JOB_CUSTOMER_ORDER_CREATED, JOB_CUSTOMER_ORDERS_CREATED, JOB_CUSTOMER_ORDER_COMPLETED
+)
+from ..settings_service import settings_service
+from ..menu_cache import menu_cache
+from ..idempotency import order_idempotency, IdempotencyConflict
+from ..utils.serializers import serialize_doc, serialize_all
+from ..utils.phone import normalize_phone
+from ..utils.order_helpers import generate_order_number, generate_order_numbers
+from ..utils.promo import validate_promo_code, calculate_discount, redeem_promo_code, release_promo_code
+from ..utils.pricing import PriceBook, PricingError
 from ..utils.demo_data import DEMO_ORDERS
+from ..utils import rollups
 
 router = APIRouter(prefix="/api", tags=["orders"])
 
 
+ORDERS_PAGE_LIMIT = 100
+ORDERS_MAX_LIMIT = 500
+ORDER_BATCH_MAX = 100
+ORDER_BATCH_MAX_AGE = timedelta(days=7)  # oldest client created_at accepted as is
+
+# Board/list view: everything but the item and modifier arrays
+ORDER_LIST_PROJECTION = {
+    "order_number": 1, "status": 1, "payment_status": 1, "payment_method": 1,
+    "order_type": 1, "table_number": 1, "customer_name": 1, "customer_phone": 1,
+    "delivery_address": 1, "delivery_zone_name": 1, "notes": 1, "total": 1,
+    "subtotal": 1, "discount_amount": 1, "promo_code": 1, "waiter_called": 1,
+    "created_at": 1, "updated_at": 1,
+    "items_count": {"$size": {"$ifNull": ["$items", []]}}
+}
+
+
+def _encode_cursor(order: dict) -> str:
+    """Opaque keyset cursor for the (created_at, _id) position of an order"""
+    return f"{order['created_at']}|{order['_id']}"
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, order_id = cursor.split("|", 1)
+        return datetime.fromisoformat(created_at), order_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Невірний курсор")
+
+
+def _parse_datetime(value: str, field: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Невірна дата: {field}")
+
+
+def _demo_orders_page(statuses, date_from, date_to, since, cursor, limit, view):
+    def ts(order, field="created_at"):
+        value = order.get(field) or order.get("created_at")
+        return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+    result = [o for o in DEMO_ORDERS if not statuses or o["status"] in statuses]
+    if date_from:
+        result = [o for o in result if ts(o) >= date_from]
+    if date_to:
+        result = [o for o in result if ts(o) < date_to]
+    if since:
+        result = [o for o in result if ts(o, "updated_at") >= since]
+    result.sort(key=lambda o: (ts(o), o["_id"]), reverse=True)
+    if cursor:
+        result = [o for o in result if (ts(o), o["_id"]) < cursor]
+
+    page = result[:limit]
+    if view == "list":
+        page = [
+            {**{k: v for k, v in o.items() if k != "items"}, "items_count": len(o.get("items", []))}
+            for o in page
+        ]
+    return page, len(result) > limit
+
+
 @router.get("/orders")
-async def get_orders(status: str = None):
+async def get_orders(
+    status: str = None,
+    date_from: str = None,
+    date_to: str = None,
+    since: str = None,
+    cursor: str = None,
+    limit: int = ORDERS_PAGE_LIMIT,
+    view: str = "full"
+):
+    """Orders, newest first, one keyset page at a time.
+
+    - status: one status or a comma-separated list
+    - date_from/date_to: created_at range (ISO dates, date_to exclusive)
+    - since: only orders created or changed at/after this time; pass the
+      previous response's synced_at to fetch just the delta
+    - cursor: next_cursor from the previous page
+    - view: "full" or "list" (no items/modifiers, adds items_count)
+
+    The response's seq is the order feed position to reconnect /ws from.
+    """
+    if view not in ("full", "list"):
+        raise HTTPException(status_code=400, detail="view має бути full або list")
+    limit = max(1, min(limit, ORDERS_MAX_LIMIT))
+    statuses = [s for s in status.split(",") if s] if status else []
+    start = _parse_datetime(date_from, "date_from") if date_from else None
+    end = _parse_datetime(date_to, "date_to") if date_to else None
+    changed_since = _parse_datetime(since, "since") if since else None
+    after = _decode_cursor(cursor) if cursor else None
+    synced_at = datetime.utcnow()
+    # Read before the query: replaying from here may repeat, never skip, events
+    seq = await order_feed.latest_seq()
+
     if not database.connected or database.orders is None:
-        result = DEMO_ORDERS
-        if status:
-            result = [o for o in result if o["status"] == status]
-        return result
+        page, has_more = _demo_orders_page(statuses, start, end, changed_since, after, limit, view)
+        return {
+            "items": page,
+            "next_cursor": _encode_cursor(page[-1]) if has_more else None,
+            "synced_at": synced_at.isoformat(),
+            "seq": seq,
+            "limit": limit
+        }
 
     query = {}
-    if status:
-        query["status"] = status
-
-    orders = list(database.orders.find(query).sort("created_at", -1))
-
-    return serialize_docs(orders)
+    if statuses:
+        query["status"] = statuses[0] if len(statuses) == 1 else {"$in": statuses}
+    if start or end:
+        query["created_at"] = {}
+        if start:
+            query["created_at"]["$gte"] = start
+        if end:
+            query["created_at"]["$lt"] = end
+    if changed_since:
+        # Orders written before updated_at existed only count by creation time
+        query["$and"] = [{"$or": [
+            {"updated_at": {"$gte": changed_since}},
+            {"updated_at": {"$exists": False}, "created_at": {"$gte": changed_since}}
+        ]}]
+    if after:
+        after_created, after_id = after
+        try:
+            after_oid = ObjectId(after_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Невірний курсор")
+        query.setdefault("$and", []).append({"$or": [
+            {"created_at": {"$lt": after_created}},
+            {"created_at": after_created, "_id": {"$lt": after_oid}}
+        ]})
+
+    projection = ORDER_LIST_PROJECTION if view == "list" else None
+    orders = await (
+        database.orders.find(query, projection)
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+        .to_list()
+    )
+
+    has_more = len(orders) > limit
+    orders = serialize_all(orders[:limit])
+    return {
+        "items": orders,
+        "next_cursor": _encode_cursor(orders[-1]) if has_more else None,
+        "synced_at": synced_at.isoformat(),
+        "seq": seq,
+        "limit": limit
+    }
 
 
 @router.get("/orders/{order_id}")
@@ -50,7 +192,7 @@ async def get_order(order_id: str):
         raise HTTPException(status_code=404, detail="Замовлення не знайдено")
 
     try:
-        order = database.orders.find_one({"_id": ObjectId(order_id)})
+        order = await database.orders.find_one({"_id": ObjectId(order_id)})
     except Exception:
         raise HTTPException(status_code=400, detail="Невірний ID замовлення")
 
@@ -60,8 +202,8 @@ async def get_order(order_id: str):
     return serialize_doc(order)
 
 
-@router.post("/orders")
-async def create_order(data: OrderCreate):
+async def _build_order(data: OrderCreate, book: PriceBook) -> dict:
+    """Validate and price an order; the number and timestamps are set by the caller"""
     # Validate items
     if not data.items:
         raise HTTPException(status_code=400, detail="Замовлення не містить товарів")
@@ -70,32 +212,12 @@ async def create_order(data: OrderCreate):
     if data.payment_method not in ("cash", "card", "online"):
         raise HTTPException(status_code=400, detail="Невірний спосіб оплати")
 
-    for item in data.items:
-        if item.qty <= 0:
-            raise HTTPException(status_code=400, detail=f"Невірна кількість для товару: {item.name}")
-        if item.price < 0:
-            raise HTTPException(status_code=400, detail=f"Невірна ціна для товару: {item.name}")
-
-    # Validate products exist and are available
-    if database.connected and database.products is not None:
-        product_ids = [
-            ObjectId(item.product_id)
-            for item in data.items
-            if item.product_id and ObjectId.is_valid(item.product_id)
-        ]
-
-        if product_ids:
-            products = {str(p["_id"]): p for p in database.products.find({"_id": {"$in": product_ids}})}
-
-            for item in data.items:
-                if item.product_id and ObjectId.is_valid(item.product_id):
-                    product = products.get(item.product_id)
-                    if not product:
-                        raise HTTPException(status_code=400, detail=f"Товар '{item.name}' не знайдено")
-                    if not product.get("available", True):
-                        raise HTTPException(status_code=400, detail=f"Товар '{product.get('name', item.name)}' недоступний")
+    # Reprice every item server-side; client prices are never trusted
+    try:
+        subtotal = book.price_items(data.items)
+    except PricingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    subtotal = round(sum(item.price * item.qty for item in data.items), 2)
     discount_amount = 0
     promo_code_used = None
 
@@ -115,7 +237,7 @@ async def create_order(data: OrderCreate):
         # Get zone info from database
         if database.connected and database.delivery_zones is not None:
             try:
-                zone = database.delivery_zones.find_one({"_id": ObjectId(data.delivery_zone_id)})
+                zone = await database.delivery_zones.find_one({"_id": ObjectId(data.delivery_zone_id)})
             except Exception:
                 zone = None
 
@@ -149,32 +271,26 @@ async def create_order(data: OrderCreate):
             delivery_address = data.delivery_address
 
     if data.promo_code:
-        promo_result = validate_promo_code(data.promo_code, subtotal)
+        promo_result = await validate_promo_code(data.promo_code, subtotal)
         if promo_result["valid"]:
             promo = promo_result["promo"]
             discount_amount = calculate_discount(promo, subtotal)
             promo_code_used = promo["code"]
 
-            if database.connected and database.promo_codes is not None:
-                database.promo_codes.update_one(
-                    {"code": promo["code"]},
-                    {"$inc": {"usage_count": 1}}
-                )
-
     # Customer category discount
     customer_discount_amount = 0
     customer_discount_label = None
 
     if data.customer_phone and data.customer_discount_percent and data.customer_discount_percent > 0:
-        phone_normalized = re.sub(r'[\s\-\(\)]', '', data.customer_phone.strip())
+        phone_normalized = normalize_phone(data.customer_phone)
         if database.connected and database.customers is not None:
-            customer = database.customers.find_one({"phone": phone_normalized})
+            customer = await database.customers.find_one({"phone": phone_normalized})
             if customer and customer.get("category_ids"):
                 cat_ids = [ObjectId(cid) for cid in customer["category_ids"] if ObjectId.is_valid(cid)]
                 if cat_ids:
-                    cats = list(database.customer_categories.find({
+                    cats = await database.customer_categories.find({
                         "_id": {"$in": cat_ids}, "is_active": True
-                    }))
+                    }).to_list()
                     if cats:
                         best_cat = max(cats, key=lambda c: c.get("discount_percent", 0))
                         max_disc = best_cat.get("discount_percent", 0)
@@ -199,19 +315,20 @@ async def create_order(data: OrderCreate):
     card_surcharge_percent = 0
     card_surcharge_amount = 0
     if data.payment_method in ("card", "online"):
-        surcharge_settings = runtime_settings.get("card_surcharge", {})
-        if database.connected and database.settings is not None:
-            db_settings_doc = database.settings.find_one({"_id": "app_settings"})
-            if db_settings_doc and db_settings_doc.get("card_surcharge"):
-                surcharge_settings = db_settings_doc["card_surcharge"]
+        surcharge_settings = settings_service.get("card_surcharge", {})
         card_surcharge_percent = surcharge_settings.get("percent", 0)
         if card_surcharge_percent > 0:
             card_surcharge_amount = round(subtotal * card_surcharge_percent / 100, 2)
 
     total = round(subtotal - total_discount + delivery_fee + card_surcharge_amount, 2)
 
-    order_doc = {
-        "order_number": generate_order_number(),
+    # Last step, once nothing else can reject the order: concurrent checkouts
+    # may have used up the code since it was validated
+    if promo_code_used and not await redeem_promo_code(promo_code_used):
+        raise HTTPException(status_code=400, detail="Промокод більше не діє")
+
+    return {
+        "order_number": None,
         "items": [item.model_dump() for item in data.items],
         "subtotal": subtotal,
         "discount_amount": discount_amount,
@@ -231,68 +348,220 @@ async def create_order(data: OrderCreate):
         "order_type": data.order_type,
         "table_number": data.table_number,
         "customer_name": data.customer_name,
-        "customer_phone": data.customer_phone,
+        # Stored normalized: a customer's history is queried by exact phone
+        "customer_phone": normalize_phone(data.customer_phone) if data.customer_phone else None,
         "notes": data.notes,
-        "created_at": None  # set below
+        "created_at": None
     }
 
+
+async def _orders_by_key(keys: list) -> dict:
+    """Stored orders by idempotency key"""
+    if not keys:
+        return {}
+    if not database.connected or database.orders is None:
+        return {o["idempotency_key"]: o for o in DEMO_ORDERS if o.get("idempotency_key") in keys}
+    orders = await database.orders.find({"idempotency_key": {"$in": keys}}).to_list()
+    return {o["idempotency_key"]: serialize_doc(o) for o in orders}
+
+
+@router.post("/orders")
+async def create_order(
+    data: OrderCreate,
+    idempotency_key: Optional[str] = Header(None, min_length=1, max_length=100)
+):
+    """Create an order; retries with the same Idempotency-Key get the first response"""
+    if not idempotency_key:
+        return await _create_order(data)
+
+    try:
+        replay = await order_idempotency.begin(idempotency_key)
+    except IdempotencyConflict:
+        raise HTTPException(status_code=409, detail="Замовлення вже обробляється, спробуйте ще раз")
+    if replay is not None:
+        return replay
+
+    try:
+        order_doc = await _create_order(data, idempotency_key)
+    except BaseException:
+        await order_idempotency.abort(idempotency_key)
+        raise
+    await order_idempotency.complete(idempotency_key, order_doc)
+    return order_doc
+
+
+async def _create_order(data: OrderCreate, idempotency_key: Optional[str] = None) -> dict:
+    if idempotency_key:
+        # The Redis entry may have expired or been unavailable; the order itself is the record
+        existing = (await _orders_by_key([idempotency_key])).get(idempotency_key)
+        if existing:
+            return existing
+
+    order_doc = await _build_order(data, await menu_cache.get_price_book())
+    order_doc["order_number"] = await generate_order_number()
+    if idempotency_key:
+        order_doc["idempotency_key"] = idempotency_key
+
     created_at = datetime.utcnow()
     order_doc["created_at"] = created_at.isoformat()
+    order_doc["updated_at"] = order_doc["created_at"]
 
     if not database.connected or database.orders is None:
         order_doc["_id"] = str(len(DEMO_ORDERS) + 1)
         DEMO_ORDERS.insert(0, order_doc)
     else:
-        db_doc = {**order_doc, "created_at": created_at}
-        result = database.orders.insert_one(db_doc)
+        db_doc = {**order_doc, "created_at": created_at, "updated_at": created_at}
+        try:
+            result = await database.orders.insert_one(db_doc)
+        except Exception as e:
+            # Not stored: give back the promo use taken by _build_order
+            if order_doc["promo_code"]:
+                await release_promo_code(order_doc["promo_code"])
+            if isinstance(e, DuplicateKeyError) and idempotency_key:
+                # Same key inserted concurrently by another worker (unique index)
+                existing = (await _orders_by_key([idempotency_key])).get(idempotency_key)
+                if existing is not None:
+                    return existing
+            raise
         order_doc["_id"] = str(result.inserted_id)
+        await rollups.apply_order(db_doc)
 
-    # Auto-create/update customer record
-    if data.customer_phone and database.connected and database.customers is not None:
-        phone_norm = re.sub(r'[\s\-\(\)]', '', data.customer_phone.strip())
-        if phone_norm:
-            order_id_str = str(order_doc.get("_id", ""))
-            try:
-                existing_customer = database.customers.find_one({"phone": phone_norm})
-                if existing_customer:
-                    update_fields = {
-                        "$push": {"order_history": order_id_str},
-                        "$set": {"updated_at": datetime.utcnow()}
-                    }
-                    if data.customer_name and data.customer_name.strip():
-                        update_fields["$set"]["name"] = data.customer_name.strip()
-                    database.customers.update_one({"phone": phone_norm}, update_fields)
-                else:
-                    new_customer = {
-                        "name": (data.customer_name or "").strip(),
-                        "phone": phone_norm,
-                        "order_history": [order_id_str],
-                        "order_count": 0,
-                        "total_spent": 0.0,
-                        "category_ids": [],
-                        "notes": "",
-                        "created_at": datetime.utcnow(),
-                        "updated_at": datetime.utcnow()
-                    }
-                    database.customers.insert_one(new_customer)
-            except Exception as e:
-                logger.error("Failed to auto-create/update customer: %s", e)
+    await order_feed.publish({"type": "new_order", "order": order_doc})
 
-    try:
-        await redis_manager.publish(CHANNEL_ORDERS_NEW, {
-            "type": "new_order",
-            "order": order_doc
+    # Side effects run in the background job workers, not on the checkout path
+    if data.customer_phone:
+        await job_queue.enqueue(JOB_CUSTOMER_ORDER_CREATED, {
+            "customer_phone": data.customer_phone,
+            "customer_name": data.customer_name,
+            "order_id": str(order_doc.get("_id", ""))
         })
-    except Exception as e:
-        logger.error("Failed to publish new order event: %s", e)
+    if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+        await job_queue.enqueue(JOB_TELEGRAM_NEW_ORDER, {"order": order_doc})
 
-    try:
+    return order_doc
+
+
+def _taken_at(value: Optional[datetime], now: datetime) -> datetime:
+    """When the terminal took the order (naive UTC), clamped to the last ORDER_BATCH_MAX_AGE"""
+    if value is None:
+        return now
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(max(value, now - ORDER_BATCH_MAX_AGE), now)
+
+
+@router.post("/orders/batch")
+async def create_orders_batch(data: OrderBatch):
+    """Ingest orders queued by POS terminals while they were offline.
+
+    Every order carries the idempotency_key its terminal generated, so the
+    whole outbox can be resent after a reconnect: orders stored earlier come
+    back as "duplicate" instead of being created twice. Results are returned
+    per order, in request order.
+    """
+    if not data.orders:
+        raise HTTPException(status_code=400, detail="Пакет не містить замовлень")
+    if len(data.orders) > ORDER_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Не більше {ORDER_BATCH_MAX} замовлень у пакеті")
+
+    now = datetime.utcnow()
+    keys = list({order.idempotency_key for order in data.orders})
+    existing = await _orders_by_key(keys)
+    book = await menu_cache.get_price_book()
+
+    results = [None] * len(data.orders)
+    pending = []   # (index, order_doc) to insert
+    repeated = []  # (index, index of the first order with the same key)
+    first_index = {}
+    for i, order in enumerate(data.orders):
+        key = order.idempotency_key
+        if key in existing:
+            results[i] = {"idempotency_key": key, "status": "duplicate", "order": existing[key]}
+            continue
+        if key in first_index:
+            repeated.append((i, first_index[key]))
+            continue
+        first_index[key] = i
+        try:
+            order_doc = await _build_order(order, book)
+        except HTTPException as e:
+            results[i] = {"idempotency_key": key, "status": "error", "detail": e.detail}
+            continue
+        order_doc["idempotency_key"] = key
+        order_doc["created_at"] = _taken_at(order.created_at, now)
+        pending.append((i, order_doc))
+
+    # Number each order in the day it was taken, one counter round-trip per day
+    by_day = {}
+    for _, order_doc in pending:
+        by_day.setdefault(order_doc["created_at"].date(), []).append(order_doc)
+    for day_orders in by_day.values():
+        numbers = await generate_order_numbers(len(day_orders), day_orders[0]["created_at"])
+        for order_doc, number in zip(day_orders, numbers):
+            order_doc["order_number"] = number
+
+    # created_at is when the order was taken (rollup buckets, numbering);
+    # updated_at is when it reached us, so delta syncs of the board pick it up
+    db_docs = [{**order_doc, "updated_at": now} for _, order_doc in pending]
+    for _, order_doc in pending:
+        order_doc["created_at"] = order_doc["created_at"].isoformat()
+        order_doc["updated_at"] = now.isoformat()
+
+    created = []
+    if not database.connected or database.orders is None:
+        for i, order_doc in pending:
+            order_doc["_id"] = str(len(DEMO_ORDERS) + 1)
+            DEMO_ORDERS.insert(0, order_doc)
+            created.append((i, order_doc))
+    elif pending:
+        write_errors = {}
+        try:
+            await database.orders.insert_many(db_docs, ordered=False)
+        except BulkWriteError as e:
+            write_errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+
+        # Keys taken by a concurrent request for the same orders
+        raced = await _orders_by_key([
+            pending[n][1]["idempotency_key"]
+            for n, err in write_errors.items() if err.get("code") == 11000
+        ])
+        for n, (i, order_doc) in enumerate(pending):
+            key = order_doc["idempotency_key"]
+            if n not in write_errors:
+                order_doc["_id"] = str(db_docs[n]["_id"])
+                created.append((i, order_doc))
+                continue
+            if order_doc["promo_code"]:
+                await release_promo_code(order_doc["promo_code"])
+            if key in raced:
+                results[i] = {"idempotency_key": key, "status": "duplicate", "order": raced[key]}
+            else:
+                logger.error("Failed to store order %s: %s", key, write_errors[n].get("errmsg"))
+                results[i] = {"idempotency_key": key, "status": "error", "detail": "Не вдалося зберегти замовлення"}
+
+        await rollups.apply_orders([db_docs[n] for n in range(len(pending)) if n not in write_errors])
+
+    for i, order_doc in created:
+        results[i] = {"idempotency_key": order_doc["idempotency_key"], "status": "created", "order": order_doc}
+    for i, first in repeated:
+        result = results[first]
+        results[i] = result if result["status"] == "error" else {**result, "status": "duplicate"}
+
+    if created:
+        orders = [order_doc for _, order_doc in created]
+        await order_feed.publish({"type": "new_orders", "orders": orders})
+
+        customer_orders = [
+            {"customer_phone": o["customer_phone"], "customer_name": o["customer_name"], "order_id": o["_id"]}
+            for o in orders if o.get("customer_phone")
+        ]
+        if customer_orders:
+            await job_queue.enqueue(JOB_CUSTOMER_ORDERS_CREATED, {"orders": customer_orders})
         if TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
-            await send_order_notification(order_doc)
-    except Exception as e:
-        logger.error("Telegram notification error: %s", e)
+            for order_doc in orders:
+                await job_queue.enqueue(JOB_TELEGRAM_NEW_ORDER, {"order": order_doc})
 
-    return order_doc
+    return {"results": results}
 
 
 @router.put("/orders/{order_id}/status")
@@ -302,49 +571,49 @@ async def update_order_status(order_id: str, status: str):
         raise HTTPException(status_code=400, detail="Invalid status")
 
     if not database.connected or database.orders is None:
+        order_doc = None
+        prev_status = None
         for order in DEMO_ORDERS:
             if order["_id"] == order_id:
+                prev_status = order["status"]
                 order["status"] = status
+                order["updated_at"] = datetime.utcnow().isoformat()
+                order_doc = order
                 break
     else:
-        order_doc = database.orders.find_one({"_id": ObjectId(order_id)})
+        # Read the previous status atomically with the update so concurrent
+        # transitions can't both apply the same side effects
+        order_doc = await database.orders.find_one_and_update(
+            {"_id": ObjectId(order_id)},
+            {"$set": {"status": status, "updated_at": datetime.utcnow()}},
+            return_document=ReturnDocument.BEFORE
+        )
         if not order_doc:
             raise HTTPException(status_code=404, detail="Order not found")
 
         prev_status = order_doc.get("status")
 
-        result = database.orders.update_one(
-            {"_id": ObjectId(order_id)},
-            {"$set": {"status": status}}
-        )
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Order not found")
+        # Cancelling removes the order from the sales rollups, restoring re-adds it
+        if status == "cancelled" and prev_status != "cancelled":
+            await rollups.apply_order(order_doc, sign=-1)
+        elif prev_status == "cancelled" and status != "cancelled":
+            await rollups.apply_order(order_doc)
 
         # Update customer stats only on first transition to "completed"
-        if status == "completed" and prev_status != "completed":
-            customer_phone = order_doc.get("customer_phone")
-            if customer_phone and database.customers is not None:
-                phone_normalized = re.sub(r'[\s\-\(\)]', '', customer_phone.strip())
-                order_total = order_doc.get("total", 0)
-                try:
-                    database.customers.update_one(
-                        {"phone": phone_normalized},
-                        {
-                            "$inc": {"order_count": 1, "total_spent": order_total},
-                            "$set": {"updated_at": datetime.utcnow()}
-                        }
-                    )
-                except Exception as e:
-                    logger.error("Failed to update customer stats on order completion: %s", e)
-
-    try:
-        await redis_manager.publish(CHANNEL_ORDERS_NEW, {
-            "type": "order_updated",
-            "order_id": order_id,
+        if status == "completed" and prev_status != "completed" and order_doc.get("customer_phone"):
+            await job_queue.enqueue(JOB_CUSTOMER_ORDER_COMPLETED, {
+                "customer_phone": order_doc["customer_phone"],
+                "order_id": order_id,
+                "total": order_doc.get("total", 0)
+            })
+
+    if order_doc and status != prev_status and status in STATUS_LABELS and TELEGRAM_BOT_TOKEN and TELEGRAM_CHAT_ID:
+        await job_queue.enqueue(JOB_TELEGRAM_STATUS_CHANGED, {
+            "order_number": order_doc.get("order_number", order_id),
             "status": status
         })
-    except Exception as e:
-        logger.error("Failed to publish order update event: %s", e)
+
+    await order_feed.publish({"type": "order_updated", "order_id": order_id, "status": status})
 
     return {"status": "updated"}
 
@@ -358,14 +627,17 @@ async def update_payment_status(order_id: str, payment_status: str):
         for order in DEMO_ORDERS:
             if order["_id"] == order_id:
                 order["payment_status"] = payment_status
+                order["updated_at"] = datetime.utcnow().isoformat()
                 break
     else:
-        result = database.orders.update_one(
+        result = await database.orders.update_one(
             {"_id": ObjectId(order_id)},
-            {"$set": {"payment_status": payment_status}}
+            {"$set": {"payment_status": payment_status, "updated_at": datetime.utcnow()}}
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Order not found")
+
+    await order_feed.publish({"type": "order_updated", "order_id": order_id, "payment_status": payment_status})
     return {"status": "updated"}
 
 
@@ -376,21 +648,22 @@ async def call_waiter(order_id: str, phone: str = ""):
         return {"status": "ok", "message": "Офіціант буде зараз"}
 
     try:
+        now = datetime.utcnow()
+        update = {"waiter_called": True, "waiter_called_at": now, "updated_at": now}
+        # A call without a phone must not wipe the one given at checkout
+        if phone.strip():
+            update["customer_phone"] = normalize_phone(phone)
         # Optimized: single query instead of update + find
-        order = database.orders.find_one_and_update(
+        order = await database.orders.find_one_and_update(
             {"_id": ObjectId(order_id)},
-            {"$set": {
-                "waiter_called": True,
-                "waiter_called_at": datetime.utcnow(),
-                "customer_phone": phone
-            }},
+            {"$set": update},
             return_document=ReturnDocument.AFTER
         )
 
         if not order:
             raise HTTPException(status_code=404, detail="Замовлення не знайдено")
 
-        await redis_manager.publish(CHANNEL_ORDERS_NEW, {
+        await order_feed.publish({
             "type": "waiter_called",
             "order_id": order_id,
             "phone": phone,
@@ -416,27 +689,32 @@ async def get_production_status(category_id: str = None):
     if category_id:
         query["category_id"] = category_id
 
-    products_with_norms = list(database.products.find(query))
+    products_with_norms = await database.products.find(query).to_list()
 
     if not products_with_norms:
         return {"products": []}
 
-    orders_query = {
-        "created_at": {"$gte": today_start},
-        "status": {"$ne": "cancelled"}
-    }
+    if await rollups.is_ready():
+        product_ids = [str(p["_id"]) for p in products_with_norms]
+        sold_today = await rollups.product_totals(today_start, datetime.utcnow(), product_ids)
+        sold_map = {item["_id"]: item["qty"] for item in sold_today}
+    else:
+        orders_query = {
+            "created_at": {"$gte": today_start},
+            "status": {"$ne": "cancelled"}
+        }
+
+        pipeline = [
+            {"$match": orders_query},
+            {"$unwind": "$items"},
+            {"$group": {
+                "_id": "$items.product_id",
+                "sold_qty": {"$sum": "$items.qty"}
+            }}
+        ]
 
-    pipeline = [
-        {"$match": orders_query},
-        {"$unwind": "$items"},
-        {"$group": {
-            "_id": "$items.product_id",
-            "sold_qty": {"$sum": "$items.qty"}
-        }}
-    ]
-
-    sold_aggregation = list(database.orders.aggregate(pipeline))
-    sold_map = {item["_id"]: item["sold_qty"] for item in sold_aggregation}
+        sold_aggregation = await (await database.orders.aggregate(pipeline)).to_list()
+        sold_map = {item["_id"]: item["sold_qty"] for item in sold_aggregation}
 
     result = []
     for product in products_with_norms:
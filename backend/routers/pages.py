@@ -4,8 +4,9 @@ from bson import ObjectId
 
 from .. import database
 from ..config import RESTAURANT_NAME, RESTAURANT_ADDRESS, RESTAURANT_PHONE, RESTAURANT_HOURS
-from ..dependencies import templates, runtime_settings
-from ..utils.data_fetchers import get_categories_list, get_products_list, get_menu_items_list
+from ..dependencies import templates
+from ..menu_cache import menu_cache, page_response
+from ..settings_service import settings_service
 from ..utils.serializers import serialize_all
 
 router = APIRouter(tags=["pages"])
@@ -19,31 +20,12 @@ async def index(request: Request):
     })
 
 
-@router.get("/menu", response_class=HTMLResponse)
-async def menu_page(request: Request):
-    cats = get_categories_list()
-    prods = get_menu_items_list(active_only=True)
-    if not prods:
-        prods = get_products_list(available_only=True)
-
-    # Load storefront config
-    storefront = runtime_settings.get("storefront", {})
-    if database.connected and database.settings is not None:
-        db_settings = database.settings.find_one({"_id": "app_settings"})
-        if db_settings and db_settings.get("storefront"):
-            storefront = db_settings["storefront"]
+def _render_menu(snapshot: dict, settings) -> str:
+    storefront = settings.get("storefront", {})
 
     # Load order types
-    order_types = []
-    if database.connected and database.settings is not None:
-        db_settings_ot = database.settings.find_one({"_id": "app_settings"})
-        if db_settings_ot and db_settings_ot.get("order_types"):
-            order_types = [ot for ot in db_settings_ot["order_types"] if ot.get("enabled", True)]
-            order_types = sorted(order_types, key=lambda x: x.get("sort_order", 0))
-    if not order_types:
-        order_types = runtime_settings.get("order_types", [])
-        order_types = [ot for ot in order_types if ot.get("enabled", True)]
-        order_types = sorted(order_types, key=lambda x: x.get("sort_order", 0))
+    order_types = [ot for ot in settings.get("order_types", []) if ot.get("enabled", True)]
+    order_types = sorted(order_types, key=lambda x: x.get("sort_order", 0))
 
     # Extract font family for server-side Google Fonts link
     font_family = storefront.get("branding", {}).get("fontFamily", "system")
@@ -58,10 +40,9 @@ async def menu_page(request: Request):
 
     # Load media slider
     media_slider = {"enabled": False, "items": []}
-    if db_settings and db_settings.get("media_slider"):
-        slider_cfg = db_settings["media_slider"]
-        if slider_cfg.get("enabled") and slider_cfg.get("items"):
-            media_slider = slider_cfg
+    slider_cfg = settings.get("media_slider")
+    if slider_cfg and slider_cfg.get("enabled") and slider_cfg.get("items"):
+        media_slider = slider_cfg
 
     # Auto-migrate v1 to v2 format
     if storefront and storefront.get("version") != 2:
@@ -69,18 +50,12 @@ async def menu_page(request: Request):
         storefront = migrate_v1_to_v2(storefront)
 
     # Load card surcharge percent
-    card_surcharge_percent = 0
-    surcharge_data = runtime_settings.get("card_surcharge", {})
-    if not surcharge_data and database.connected and database.settings is not None:
-        db_cs = database.settings.find_one({"_id": "app_settings"})
-        if db_cs and db_cs.get("card_surcharge"):
-            surcharge_data = db_cs["card_surcharge"]
+    surcharge_data = settings.get("card_surcharge", {})
     card_surcharge_percent = surcharge_data.get("percent", 0) if surcharge_data else 0
 
-    return templates.TemplateResponse("menu.html", {
-        "request": request,
-        "categories": cats,
-        "products": prods,
+    return templates.get_template("menu.html").render({
+        "categories": snapshot["categories"],
+        "products": snapshot["products"],
         "restaurant_name": RESTAURANT_NAME,
         "restaurant_address": RESTAURANT_ADDRESS,
         "restaurant_phone": RESTAURANT_PHONE,
@@ -93,6 +68,17 @@ async def menu_page(request: Request):
     })
 
 
+@router.get("/menu", response_class=HTMLResponse)
+async def menu_page(request: Request):
+    # Menu data and settings are both served from memory; the rendered page
+    # is cached per settings version and dropped on any menu write
+    settings = settings_service.snapshot
+    page = await menu_cache.get_page(
+        "menu", lambda snapshot: _render_menu(snapshot, settings), key=settings.version
+    )
+    return page_response(request, page)
+
+
 @router.get("/track/{order_id}", response_class=HTMLResponse)
 async def track_order_page(request: Request, order_id: str):
     """Order tracking page for customers"""
@@ -113,7 +99,7 @@ async def site_page_view(request: Request, page_id: str):
     if not ObjectId.is_valid(page_id):
         raise HTTPException(status_code=404, detail="Page not found")
 
-    page = database.site_pages.find_one({"_id": ObjectId(page_id), "is_published": True})
+    page = await database.site_pages.find_one({"_id": ObjectId(page_id), "is_published": True})
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
@@ -126,12 +112,8 @@ async def site_page_view(request: Request, page_id: str):
 
 @router.get("/pos", response_class=HTMLResponse)
 async def pos_page(request: Request):
-    cats = get_categories_list()
-    prods = get_menu_items_list(active_only=True)
-    if not prods:
-        prods = get_products_list(available_only=True)
-    return templates.TemplateResponse("pos.html", {
-        "request": request,
-        "categories": cats,
-        "products": prods
-    })
+    page = await menu_cache.get_page("pos", lambda snapshot: templates.get_template("pos.html").render({
+        "categories": snapshot["categories"],
+        "products": snapshot["products"]
+    }))
+    return page_response(request, page)
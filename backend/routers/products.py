@@ -8,7 +8,8 @@ from ..models import ProductCreate, ProductTagCreate, ProjectCreate
 from ..utils.serializers import serialize_doc, serialize_docs, serialize_all
 from ..utils.audit import log_action
 from ..utils.demo_data import DEMO_PRODUCTS
-from ..redis_manager import redis_manager, CACHE_PRODUCT_TAGS, TTL_PRODUCT_TAGS
+from ..redis_manager import redis_manager, CACHE_PRODUCT_TAGS, TTL_PRODUCT_TAGS, TAG_MENU
+from ..menu_cache import menu_cache
 
 router = APIRouter(prefix="/api", tags=["products"])
 
@@ -34,7 +35,7 @@ async def get_products(
     if available is not None:
         query["available"] = available
 
-    products = list(database.products.find(query))
+    products = await database.products.find(query).to_list()
 
     return serialize_docs(products)
 
@@ -45,10 +46,11 @@ async def create_product(data: ProductCreate):
         raise HTTPException(status_code=503, detail="Database not connected")
     doc = data.model_dump()
     doc["created_at"] = datetime.utcnow()
-    result = database.products.insert_one(doc)
+    result = await database.products.insert_one(doc)
 
-    log_action("create", "product", str(result.inserted_id), data.name)
+    await log_action("create", "product", str(result.inserted_id), data.name)
     response_data = {"_id": str(result.inserted_id), **doc}
+    await menu_cache.invalidate()
     return serialize_all(response_data)
 
 
@@ -57,9 +59,9 @@ async def update_product(product_id: str, data: ProductCreate):
     if not database.connected or database.products is None:
         raise HTTPException(status_code=503, detail="Database not connected")
 
-    old_product = database.products.find_one({"_id": ObjectId(product_id)})
+    old_product = await database.products.find_one({"_id": ObjectId(product_id)})
 
-    result = database.products.update_one(
+    result = await database.products.update_one(
         {"_id": ObjectId(product_id)},
         {"$set": data.model_dump()}
     )
@@ -74,8 +76,9 @@ async def update_product(product_id: str, data: ProductCreate):
             if old_val != new_val:
                 changes[key] = {"old": old_val, "new": new_val}
         if changes:
-            log_action("update", "product", product_id, data.name, changes)
+            await log_action("update", "product", product_id, data.name, changes)
 
+    await menu_cache.invalidate()
     return {"status": "updated"}
 
 
@@ -84,14 +87,15 @@ async def delete_product(product_id: str):
     if not database.connected or database.products is None:
         raise HTTPException(status_code=503, detail="Database not connected")
 
-    product = database.products.find_one({"_id": ObjectId(product_id)})
-    result = database.products.delete_one({"_id": ObjectId(product_id)})
+    product = await database.products.find_one({"_id": ObjectId(product_id)})
+    result = await database.products.delete_one({"_id": ObjectId(product_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
 
     if product:
-        log_action("delete", "product", product_id, product.get("name", ""))
+        await log_action("delete", "product", product_id, product.get("name", ""))
 
+    await menu_cache.invalidate()
     return {"status": "deleted"}
 
 
@@ -101,7 +105,7 @@ async def copy_product(product_id: str):
     if not database.connected or database.products is None:
         raise HTTPException(status_code=503, detail="Database not connected")
 
-    product = database.products.find_one({"_id": ObjectId(product_id)})
+    product = await database.products.find_one({"_id": ObjectId(product_id)})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
@@ -111,12 +115,13 @@ async def copy_product(product_id: str):
     product["name"] = f"{original_name} (копія)"
     product["created_at"] = datetime.utcnow()
 
-    result = database.products.insert_one(product)
+    result = await database.products.insert_one(product)
     product["_id"] = str(result.inserted_id)
 
-    log_action("copy", "product", str(result.inserted_id), product["name"],
+    await log_action("copy", "product", str(result.inserted_id), product["name"],
                {"copied_from": {"id": product_id, "name": original_name}})
 
+    await menu_cache.invalidate()
     return serialize_doc(product)
 
 
@@ -125,19 +130,13 @@ async def copy_product(product_id: str):
 @router.get("/product-tags")
 async def get_product_tags():
     """Get all product tags"""
-    # Try cache first
-    cached = await redis_manager.get_cached(CACHE_PRODUCT_TAGS)
-    if cached is not None:
-        return cached
-
     if not database.connected or database.product_tags is None:
         return []
 
-    result = serialize_docs(database.product_tags.find().sort("name", 1))
+    async def load():
+        return serialize_docs(await database.product_tags.find().sort("name", 1).to_list())
 
-    # Cache the result
-    await redis_manager.set_cached(CACHE_PRODUCT_TAGS, result, TTL_PRODUCT_TAGS)
-    return result
+    return await redis_manager.cached(CACHE_PRODUCT_TAGS, load, TTL_PRODUCT_TAGS)
 
 
 @router.post("/product-tags")
@@ -146,16 +145,16 @@ async def create_product_tag(data: ProductTagCreate):
     if not database.connected or database.product_tags is None:
         raise HTTPException(status_code=503, detail="Database not available")
 
-    existing = database.product_tags.find_one({"name": data.name})
+    existing = await database.product_tags.find_one({"name": data.name})
     if existing:
         raise HTTPException(status_code=400, detail="Тег з такою назвою вже існує")
 
     tag_doc = data.model_dump()
-    result = database.product_tags.insert_one(tag_doc)
+    result = await database.product_tags.insert_one(tag_doc)
     tag_doc["_id"] = str(result.inserted_id)
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_PRODUCT_TAGS)
+    await redis_manager.invalidate_tags(TAG_MENU)
 
     return tag_doc
 
@@ -166,11 +165,11 @@ async def update_product_tag(tag_id: str, data: ProductTagCreate):
     if not database.connected or database.product_tags is None:
         raise HTTPException(status_code=503, detail="Database not available")
 
-    existing = database.product_tags.find_one({"name": data.name, "_id": {"$ne": ObjectId(tag_id)}})
+    existing = await database.product_tags.find_one({"name": data.name, "_id": {"$ne": ObjectId(tag_id)}})
     if existing:
         raise HTTPException(status_code=400, detail="Тег з такою назвою вже існує")
 
-    result = database.product_tags.update_one(
+    result = await database.product_tags.update_one(
         {"_id": ObjectId(tag_id)},
         {"$set": data.model_dump()}
     )
@@ -178,9 +177,9 @@ async def update_product_tag(tag_id: str, data: ProductTagCreate):
         raise HTTPException(status_code=404, detail="Tag not found")
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_PRODUCT_TAGS)
+    await redis_manager.invalidate_tags(TAG_MENU)
 
-    updated = database.product_tags.find_one({"_id": ObjectId(tag_id)})
+    updated = await database.product_tags.find_one({"_id": ObjectId(tag_id)})
     return serialize_doc(updated)
 
 
@@ -190,17 +189,18 @@ async def delete_product_tag(tag_id: str):
     if not database.connected or database.product_tags is None:
         raise HTTPException(status_code=503, detail="Database not available")
 
-    database.products.update_many(
+    await database.products.update_many(
         {"tags": tag_id},
         {"$pull": {"tags": tag_id}}
     )
 
-    result = database.product_tags.delete_one({"_id": ObjectId(tag_id)})
+    result = await database.product_tags.delete_one({"_id": ObjectId(tag_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Tag not found")
 
     # Invalidate cache
-    await redis_manager.invalidate_key(CACHE_PRODUCT_TAGS)
+    await redis_manager.invalidate_tags(TAG_MENU)
+    await menu_cache.invalidate()
 
     return {"status": "deleted"}
 
@@ -217,7 +217,7 @@ async def get_audit_logs(entity_type: str = None, limit: int = 100):
     if entity_type:
         query["entity_type"] = entity_type
 
-    logs = list(database.audit_logs.find(query).sort("created_at", -1).limit(limit))
+    logs = await database.audit_logs.find(query).sort("created_at", -1).limit(limit).to_list()
     return serialize_docs(logs)
 
 
@@ -227,10 +227,10 @@ async def get_entity_audit_logs(entity_type: str, entity_id: str):
     if not database.connected or database.audit_logs is None:
         return []
 
-    logs = list(database.audit_logs.find({
+    logs = await database.audit_logs.find({
         "entity_type": entity_type,
         "entity_id": entity_id
-    }).sort("created_at", -1))
+    }).sort("created_at", -1).to_list()
     return serialize_docs(logs)
 
 
@@ -242,7 +242,7 @@ async def get_projects():
     if not database.connected or database.projects is None:
         return []
 
-    projects = list(database.projects.find().sort("name", 1))
+    projects = await database.projects.find().sort("name", 1).to_list()
     return serialize_docs(projects)
 
 
@@ -254,10 +254,10 @@ async def create_project(data: ProjectCreate):
 
     doc = data.model_dump()
     doc["created_at"] = datetime.utcnow()
-    result = database.projects.insert_one(doc)
+    result = await database.projects.insert_one(doc)
     doc["_id"] = str(result.inserted_id)
 
-    log_action("create", "project", str(result.inserted_id), data.name)
+    await log_action("create", "project", str(result.inserted_id), data.name)
     return doc
 
 
@@ -267,14 +267,14 @@ async def update_project(project_id: str, data: ProjectCreate):
     if not database.connected or database.projects is None:
         raise HTTPException(status_code=503, detail="Database not connected")
 
-    result = database.projects.update_one(
+    result = await database.projects.update_one(
         {"_id": ObjectId(project_id)},
         {"$set": data.model_dump()}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    log_action("update", "project", project_id, data.name)
+    await log_action("update", "project", project_id, data.name)
     return {"status": "updated"}
 
 
@@ -284,15 +284,16 @@ async def delete_project(project_id: str):
     if not database.connected or database.projects is None:
         raise HTTPException(status_code=503, detail="Database not connected")
 
-    project = database.projects.find_one({"_id": ObjectId(project_id)})
+    project = await database.projects.find_one({"_id": ObjectId(project_id)})
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    database.products.update_many(
+    await database.products.update_many(
         {"project_id": project_id},
         {"$unset": {"project_id": ""}}
     )
 
-    database.projects.delete_one({"_id": ObjectId(project_id)})
-    log_action("delete", "project", project_id, project.get("name", ""))
+    await database.projects.delete_one({"_id": ObjectId(project_id)})
+    await log_action("delete", "project", project_id, project.get("name", ""))
+    await menu_cache.invalidate()
     return {"status": "deleted"}
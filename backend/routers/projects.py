@@ -13,14 +13,14 @@ router = APIRouter(prefix="/api/projects", tags=["projects"])
 async def get_projects():
     if not database.connected or database.projects is None:
         return []
-    return [serialize_doc(doc) for doc in database.projects.find().sort("sort_order", 1)]
+    return [serialize_doc(doc) async for doc in database.projects.find().sort("sort_order", 1)]
 
 
 @router.post("/")
 async def create_project(data: ProjectCreate):
     if not database.connected or database.projects is None:
         raise HTTPException(status_code=503, detail="Database not connected")
-    result = database.projects.insert_one(data.model_dump())
+    result = await database.projects.insert_one(data.model_dump())
     return {"_id": str(result.inserted_id), **data.model_dump()}
 
 
@@ -28,7 +28,7 @@ async def create_project(data: ProjectCreate):
 async def update_project(project_id: str, data: ProjectCreate):
     if not database.connected or database.projects is None:
         raise HTTPException(status_code=503, detail="Database not connected")
-    result = database.projects.update_one(
+    result = await database.projects.update_one(
         {"_id": ObjectId(project_id)},
         {"$set": data.model_dump()}
     )
@@ -50,7 +50,7 @@ async def reorder_projects(req: Request):
         for item in items if ObjectId.is_valid(item.get("id", ""))
     ]
     if operations:
-        database.projects.bulk_write(operations, ordered=False)
+        await database.projects.bulk_write(operations, ordered=False)
     return {"status": "reordered", "count": len(operations)}
 
 
@@ -60,14 +60,14 @@ async def delete_project(project_id: str):
         raise HTTPException(status_code=503, detail="Database not connected")
 
     # Block deletion if any categories reference this project
-    cat_count = database.categories.count_documents({"project_id": project_id})
+    cat_count = await database.categories.count_documents({"project_id": project_id})
     if cat_count > 0:
         raise HTTPException(
             status_code=400,
             detail=f"Неможливо видалити проєкт: він містить {cat_count} категорі(й). Спочатку видаліть або перенесіть категорії."
         )
 
-    result = database.projects.delete_one({"_id": ObjectId(project_id)})
+    result = await database.projects.delete_one({"_id": ObjectId(project_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -6,7 +6,7 @@ from bson import ObjectId
 from .. import database
 from ..models import PromoCodeCreate
 from ..utils.serializers import serialize_docs
-from ..utils.promo import validate_promo_code, calculate_discount
+from ..utils.promo import validate_promo_code, calculate_discount, promo_table
 from ..utils.demo_data import DEMO_PROMO_CODES
 
 router = APIRouter(prefix="/api/promo-codes", tags=["promo-codes"])
@@ -23,8 +23,8 @@ async def get_promo_codes(skip: int = 0, limit: int = 100):
             "limit": limit
         }
 
-    total = database.promo_codes.count_documents({})
-    promo_codes = list(database.promo_codes.find().sort("created_at", -1).skip(skip).limit(limit))
+    total = await database.promo_codes.count_documents({})
+    promo_codes = await database.promo_codes.find().sort("created_at", -1).skip(skip).limit(limit).to_list()
 
     return {
         "items": serialize_docs(promo_codes),
@@ -46,7 +46,7 @@ async def create_promo_code(data: PromoCodeCreate):
         DEMO_PROMO_CODES.append(promo_doc)
         return promo_doc
 
-    existing = database.promo_codes.find_one({"code": data.code.upper()})
+    existing = await database.promo_codes.find_one({"code": data.code.upper()})
     if existing:
         raise HTTPException(status_code=400, detail="Промокод вже існує")
 
@@ -55,7 +55,8 @@ async def create_promo_code(data: PromoCodeCreate):
     promo_doc["usage_count"] = 0
     promo_doc["created_at"] = datetime.utcnow()
 
-    result = database.promo_codes.insert_one(promo_doc)
+    result = await database.promo_codes.insert_one(promo_doc)
+    await promo_table.invalidate()
     promo_doc["_id"] = str(result.inserted_id)
     promo_doc["created_at"] = promo_doc["created_at"].isoformat()
     return promo_doc
@@ -75,12 +76,13 @@ async def update_promo_code(promo_id: str, data: PromoCodeCreate):
     update_data = data.model_dump()
     update_data["code"] = update_data["code"].upper()
 
-    result = database.promo_codes.update_one(
+    result = await database.promo_codes.update_one(
         {"_id": ObjectId(promo_id)},
         {"$set": update_data}
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Промокод не знайдено")
+    await promo_table.invalidate()
     return {"status": "updated"}
 
 
@@ -91,16 +93,17 @@ async def delete_promo_code(promo_id: str):
         DEMO_PROMO_CODES[:] = [p for p in DEMO_PROMO_CODES if p["_id"] != promo_id]
         return {"status": "deleted"}
 
-    result = database.promo_codes.delete_one({"_id": ObjectId(promo_id)})
+    result = await database.promo_codes.delete_one({"_id": ObjectId(promo_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Промокод не знайдено")
+    await promo_table.invalidate()
     return {"status": "deleted"}
 
 
 @router.post("/validate")
 async def validate_promo(code: str, order_total: float = 0):
     """Validate a promo code for an order"""
-    result = validate_promo_code(code, order_total)
+    result = await validate_promo_code(code, order_total)
     if result["valid"]:
         promo = result["promo"]
         discount = calculate_discount(promo, order_total)
@@ -1,3 +1,4 @@
+import copy
 import os
 import uuid as _uuid
 from typing import List
@@ -6,8 +7,7 @@ from uuid import uuid4
 
 from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile
 
-from .. import database
-from ..dependencies import runtime_settings
+from ..settings_service import settings_service
 from ..models import StorefrontConfig, PageBuilderConfig
 
 _BASE_DIR = Path(__file__).parent.parent.parent
@@ -22,40 +22,16 @@ router = APIRouter(prefix="/api/settings", tags=["settings"])
 @router.get("/")
 async def get_settings():
     """Get all settings"""
-    if database.connected and database.settings is not None:
-        db_settings = database.settings.find_one({"_id": "app_settings"})
-        if db_settings:
-            if db_settings.get("telegram"):
-                runtime_settings["telegram"] = db_settings["telegram"]
-            if db_settings.get("restaurant"):
-                runtime_settings["restaurant"] = db_settings["restaurant"]
-            if db_settings.get("delivery"):
-                runtime_settings["delivery"] = db_settings["delivery"]
-            if db_settings.get("order_types"):
-                runtime_settings["order_types"] = db_settings["order_types"]
-            if db_settings.get("storefront"):
-                runtime_settings["storefront"] = db_settings["storefront"]
-            if db_settings.get("card_surcharge"):
-                runtime_settings["card_surcharge"] = db_settings["card_surcharge"]
-
-    return runtime_settings
+    return settings_service.as_dict()
 
 
 @router.post("/telegram")
 async def save_telegram_settings(bot_token: str = "", chat_id: str = ""):
     """Save Telegram bot settings"""
-    runtime_settings["telegram"] = {
+    await settings_service.update("telegram", {
         "bot_token": bot_token,
         "chat_id": chat_id
-    }
-
-    if database.connected and database.settings is not None:
-        database.settings.update_one(
-            {"_id": "app_settings"},
-            {"$set": {"telegram": runtime_settings["telegram"]}},
-            upsert=True
-        )
-
+    })
     return {"status": "saved"}
 
 
@@ -64,7 +40,7 @@ async def test_telegram():
     """Send a test Telegram message"""
     from ..telegram_bot import send_telegram_message
 
-    settings = runtime_settings.get("telegram", {})
+    settings = settings_service.get("telegram", {})
     if not settings.get("bot_token") or not settings.get("chat_id"):
         return {"success": False, "error": "Telegram не налаштовано"}
 
@@ -76,34 +52,30 @@ async def test_telegram():
     return {"success": success, "error": None if success else "Не вдалося надіслати"}
 
 
+@router.get("/telegram/metrics")
+async def get_telegram_metrics():
+    """Telegram notifier counters for this worker"""
+    from ..telegram_bot import notifier
+
+    return notifier.metrics
+
+
 @router.post("/restaurant")
 async def save_restaurant_settings(name: str = "", address: str = "", phone: str = "", hours: str = ""):
     """Save restaurant settings"""
-    runtime_settings["restaurant"] = {
+    await settings_service.update("restaurant", {
         "name": name,
         "address": address,
         "phone": phone,
         "hours": hours
-    }
-
-    if database.connected and database.settings is not None:
-        database.settings.update_one(
-            {"_id": "app_settings"},
-            {"$set": {"restaurant": runtime_settings["restaurant"]}},
-            upsert=True
-        )
-
+    })
     return {"status": "saved"}
 
 
 @router.get("/delivery")
 async def get_delivery_settings():
     """Get delivery settings"""
-    if database.connected and database.settings is not None:
-        db_settings = database.settings.find_one({"_id": "app_settings"})
-        if db_settings and db_settings.get("delivery"):
-            runtime_settings["delivery"] = db_settings["delivery"]
-    return runtime_settings.get("delivery", {})
+    return settings_service.get("delivery", {})
 
 
 @router.post("/delivery")
@@ -114,57 +86,32 @@ async def save_delivery_settings(
     enabled: bool = False
 ):
     """Save delivery settings"""
-    runtime_settings["delivery"] = {
+    await settings_service.update("delivery", {
         "min_order_amount": min_order_amount,
         "min_order_amount_out_of_city": min_order_amount_out_of_city,
         "min_order_message": min_order_message,
         "enabled": enabled
-    }
-
-    if database.connected and database.settings is not None:
-        database.settings.update_one(
-            {"_id": "app_settings"},
-            {"$set": {"delivery": runtime_settings["delivery"]}},
-            upsert=True
-        )
-
+    })
     return {"status": "saved"}
 
 
 @router.get("/card-surcharge")
 async def get_card_surcharge_settings():
     """Get card surcharge percentage"""
-    if database.connected and database.settings is not None:
-        db_settings = database.settings.find_one({"_id": "app_settings"})
-        if db_settings and db_settings.get("card_surcharge"):
-            runtime_settings["card_surcharge"] = db_settings["card_surcharge"]
-    return runtime_settings.get("card_surcharge", {"percent": 0})
+    return settings_service.get("card_surcharge", {"percent": 0})
 
 
 @router.post("/card-surcharge")
 async def save_card_surcharge_settings(percent: float = 0):
     """Save card surcharge percentage"""
-    runtime_settings["card_surcharge"] = {"percent": percent}
-
-    if database.connected and database.settings is not None:
-        database.settings.update_one(
-            {"_id": "app_settings"},
-            {"$set": {"card_surcharge": runtime_settings["card_surcharge"]}},
-            upsert=True
-        )
-
+    await settings_service.update("card_surcharge", {"percent": percent})
     return {"status": "saved"}
 
 
 @router.get("/order-types")
 async def get_order_types(enabled_only: bool = False):
     """Get order types configuration"""
-    if database.connected and database.settings is not None:
-        db_settings = database.settings.find_one({"_id": "app_settings"})
-        if db_settings and db_settings.get("order_types"):
-            runtime_settings["order_types"] = db_settings["order_types"]
-
-    order_types = runtime_settings.get("order_types", [])
+    order_types = settings_service.get("order_types", [])
     order_types = sorted(order_types, key=lambda x: x.get("sort_order", 0))
 
     if enabled_only:
@@ -176,40 +123,24 @@ async def get_order_types(enabled_only: bool = False):
 @router.post("/order-types")
 async def save_order_types(order_types: List[dict]):
     """Save order types configuration"""
-    runtime_settings["order_types"] = order_types
-
-    if database.connected and database.settings is not None:
-        database.settings.update_one(
-            {"_id": "app_settings"},
-            {"$set": {"order_types": runtime_settings["order_types"]}},
-            upsert=True
-        )
-
+    await settings_service.update("order_types", order_types)
     return {"status": "saved"}
 
 
 @router.put("/order-types/reorder")
 async def reorder_order_types(items: List[dict]):
     """Reorder order types by sort_order"""
+    order_types = copy.deepcopy(settings_service.get("order_types", []))
     for item in items:
-        for ot in runtime_settings["order_types"]:
+        for ot in order_types:
             if ot["type"] == item["type"]:
                 ot["sort_order"] = item["sort_order"]
                 break
 
-    runtime_settings["order_types"] = sorted(
-        runtime_settings["order_types"],
-        key=lambda x: x.get("sort_order", 0)
-    )
-
-    if database.connected and database.settings is not None:
-        database.settings.update_one(
-            {"_id": "app_settings"},
-            {"$set": {"order_types": runtime_settings["order_types"]}},
-            upsert=True
-        )
+    order_types = sorted(order_types, key=lambda x: x.get("sort_order", 0))
+    await settings_service.update("order_types", order_types)
 
-    return {"status": "saved", "order_types": runtime_settings["order_types"]}
+    return {"status": "saved", "order_types": order_types}
 
 
 def _uid():
@@ -351,16 +282,12 @@ def migrate_v1_to_v2(old: dict) -> dict:
 @router.get("/storefront")
 async def get_storefront_settings():
     """Get storefront layout configuration (auto-migrates v1 to v2)"""
-    if database.connected and database.settings is not None:
-        db_settings = database.settings.find_one({"_id": "app_settings"})
-        if db_settings and db_settings.get("storefront"):
-            runtime_settings["storefront"] = db_settings["storefront"]
-
-    storefront = runtime_settings.get("storefront", {})
+    storefront = settings_service.get("storefront", {})
 
     # Auto-migrate v1 to v2
     if storefront and storefront.get("version") != 2:
         # Old format detected - backward compat
+        storefront = copy.deepcopy(storefront)
         if storefront.get("layout") == "sidebar":
             storefront["layout"] = "sidebar-right"
         storefront = migrate_v1_to_v2(storefront)
@@ -381,14 +308,7 @@ async def save_storefront_settings(request: Request):
         config = StorefrontConfig(**data)
         storefront_data = config.model_dump()
 
-    runtime_settings["storefront"] = storefront_data
-
-    if database.connected and database.settings is not None:
-        database.settings.update_one(
-            {"_id": "app_settings"},
-            {"$set": {"storefront": storefront_data}},
-            upsert=True
-        )
+    await settings_service.update("storefront", storefront_data)
 
     return {"status": "saved"}
 
@@ -427,11 +347,7 @@ async def delete_slider_image(path: str = Query(...)):
 @router.get("/media-slider")
 async def get_media_slider():
     """Get media slider configuration."""
-    if database.connected and database.settings is not None:
-        doc = database.settings.find_one({"_id": "app_settings"})
-        if doc and doc.get("media_slider"):
-            runtime_settings["media_slider"] = doc["media_slider"]
-    return runtime_settings.get("media_slider", {"enabled": False, "items": []})
+    return settings_service.get("media_slider", {"enabled": False, "items": []})
 
 
 @router.post("/media-slider")
@@ -442,11 +358,5 @@ async def save_media_slider(request: Request):
         "enabled": bool(data.get("enabled", False)),
         "items": data.get("items", [])
     }
-    runtime_settings["media_slider"] = slider
-    if database.connected and database.settings is not None:
-        database.settings.update_one(
-            {"_id": "app_settings"},
-            {"$set": {"media_slider": slider}},
-            upsert=True
-        )
+    await settings_service.update("media_slider", slider)
     return {"status": "saved"}
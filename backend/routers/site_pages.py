@@ -17,7 +17,7 @@ from pymongo import ReturnDocument, UpdateOne
 from .. import database
 from ..models import SitePageCreate, SitePageUpdate
 from ..utils.serializers import serialize_all
-from ..redis_manager import redis_manager, CACHE_SITE_PAGES, TTL_SITE_PAGES
+from ..redis_manager import redis_manager, CACHE_SITE_PAGES, TTL_SITE_PAGES, TAG_SITE_PAGES
 
 router = APIRouter(prefix="/api/site-pages", tags=["site-pages"])
 
@@ -71,20 +71,14 @@ def _collect_page_images(page_doc: dict) -> list:
 @router.get("/")
 async def list_site_pages(published_only: bool = False):
     """Return all site pages sorted by sort_order."""
-    cached = await redis_manager.get_cached(CACHE_SITE_PAGES)
-    if cached is not None:
-        if published_only:
-            return [p for p in cached if p.get("is_published")]
-        return cached
-
     if not database.connected or database.site_pages is None:
         return []
 
-    pages = list(database.site_pages.find().sort("sort_order", 1))
-    result = [serialize_all(p) for p in pages]
-
-    await redis_manager.set_cached(CACHE_SITE_PAGES, result, TTL_SITE_PAGES)
+    async def load():
+        pages = await database.site_pages.find().sort("sort_order", 1).to_list()
+        return [serialize_all(p) for p in pages]
 
+    result = await redis_manager.cached(CACHE_SITE_PAGES, load, TTL_SITE_PAGES)
     if published_only:
         return [p for p in result if p.get("is_published")]
     return result
@@ -99,7 +93,7 @@ async def get_site_page(page_id: str):
     if not ObjectId.is_valid(page_id):
         raise HTTPException(status_code=400, detail="Invalid page ID")
 
-    page = database.site_pages.find_one({"_id": ObjectId(page_id)})
+    page = await database.site_pages.find_one({"_id": ObjectId(page_id)})
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
@@ -130,10 +124,10 @@ async def create_site_page(data: SitePageCreate):
     doc["created_at"] = datetime.utcnow()
     doc["updated_at"] = datetime.utcnow()
 
-    result = database.site_pages.insert_one(doc)
+    result = await database.site_pages.insert_one(doc)
     doc["_id"] = result.inserted_id
 
-    await redis_manager.invalidate_key(CACHE_SITE_PAGES)
+    await redis_manager.invalidate_tags(TAG_SITE_PAGES)
     return serialize_all(doc)
 
 
@@ -152,7 +146,7 @@ async def update_site_page(page_id: str, data: SitePageUpdate):
 
     update_data["updated_at"] = datetime.utcnow()
 
-    updated = database.site_pages.find_one_and_update(
+    updated = await database.site_pages.find_one_and_update(
         {"_id": ObjectId(page_id)},
         {"$set": update_data},
         return_document=ReturnDocument.AFTER
@@ -160,7 +154,7 @@ async def update_site_page(page_id: str, data: SitePageUpdate):
     if not updated:
         raise HTTPException(status_code=404, detail="Page not found")
 
-    await redis_manager.invalidate_key(CACHE_SITE_PAGES)
+    await redis_manager.invalidate_tags(TAG_SITE_PAGES)
     return serialize_all(updated)
 
 
@@ -173,7 +167,7 @@ async def delete_site_page(page_id: str):
     if not ObjectId.is_valid(page_id):
         raise HTTPException(status_code=400, detail="Invalid page ID")
 
-    page = database.site_pages.find_one({"_id": ObjectId(page_id)})
+    page = await database.site_pages.find_one({"_id": ObjectId(page_id)})
     if not page:
         raise HTTPException(status_code=404, detail="Page not found")
 
@@ -181,9 +175,9 @@ async def delete_site_page(page_id: str):
     for img_url in _collect_page_images(page):
         _delete_file_safe(img_url)
 
-    database.site_pages.delete_one({"_id": ObjectId(page_id)})
+    await database.site_pages.delete_one({"_id": ObjectId(page_id)})
 
-    await redis_manager.invalidate_key(CACHE_SITE_PAGES)
+    await redis_manager.invalidate_tags(TAG_SITE_PAGES)
     return {"status": "deleted", "page_id": page_id}
 
 
@@ -209,9 +203,9 @@ async def reorder_site_pages(items: list):
         )
 
     if operations:
-        database.site_pages.bulk_write(operations)
+        await database.site_pages.bulk_write(operations)
 
-    await redis_manager.invalidate_key(CACHE_SITE_PAGES)
+    await redis_manager.invalidate_tags(TAG_SITE_PAGES)
     return {"status": "reordered", "count": len(operations)}
 
 
@@ -1,5 +1,7 @@
 import io
 import csv
+import json
+import zlib
 from datetime import datetime, timedelta
 
 from fastapi import APIRouter, HTTPException
@@ -9,6 +11,8 @@ from bson import ObjectId
 from .. import database
 from ..utils.serializers import serialize_doc
 from ..utils.demo_data import DEMO_ORDERS
+from ..utils.stats_engine import compute_stats
+from ..utils import rollups
 
 router = APIRouter(prefix="/api", tags=["stats"])
 
@@ -73,12 +77,6 @@ async def get_stats(
             "hourly_distribution": []
         }
 
-    today_orders = list(database.orders.find({"created_at": {"$gte": today_start}}))
-    today_revenue = sum(o.get("total", 0) for o in today_orders if o.get("status") != "cancelled")
-
-    pending = database.orders.count_documents({"status": {"$in": ["new", "preparing"]}})
-    completed = database.orders.count_documents({"status": "completed", "created_at": {"$gte": today_start}})
-
     filtered_product_ids = None
     if tags or alcohol != "all":
         product_filter = {}
@@ -92,67 +90,12 @@ async def get_stats(
             product_filter["is_alcohol"] = {"$ne": True}
 
         if product_filter and database.products is not None:
-            filtered_products = list(database.products.find(product_filter, {"_id": 1}))
+            filtered_products = await database.products.find(product_filter, {"_id": 1}).to_list()
             filtered_product_ids = [str(p["_id"]) for p in filtered_products]
 
-    pipeline_match = {"created_at": {"$gte": start_date, "$lte": end_date}, "status": {"$ne": "cancelled"}}
-    pipeline = [
-        {"$match": pipeline_match},
-        {"$unwind": "$items"},
-    ]
-
-    if filtered_product_ids is not None:
-        pipeline.append({"$match": {"items.product_id": {"$in": filtered_product_ids}}})
-
-    pipeline.extend([
-        {"$group": {
-            "_id": "$items.name",
-            "product_id": {"$first": "$items.product_id"},
-            "count": {"$sum": "$items.qty"},
-            "revenue": {"$sum": {"$multiply": ["$items.qty", "$items.price"]}}
-        }},
-        {"$sort": {"revenue": -1}},
-        {"$limit": 50}
-    ])
-    top_products = list(database.orders.aggregate(pipeline))
-
-    type_pipeline = [
-        {"$match": {"created_at": {"$gte": start_date, "$lte": end_date}, "status": {"$ne": "cancelled"}}},
-        {"$group": {"_id": "$order_type", "revenue": {"$sum": "$total"}, "count": {"$sum": 1}}}
-    ]
-    type_results = list(database.orders.aggregate(type_pipeline))
-    revenue_by_type = {
-        "dine_in": {"revenue": 0, "count": 0},
-        "takeaway": {"revenue": 0, "count": 0},
-        "delivery": {"revenue": 0, "count": 0}
-    }
-    for r in type_results:
-        if r["_id"] in revenue_by_type:
-            revenue_by_type[r["_id"]] = {"revenue": r["revenue"], "count": r["count"]}
-
-    hourly_pipeline = [
-        {"$match": {"created_at": {"$gte": start_date, "$lte": end_date}, "status": {"$ne": "cancelled"}}},
-        {"$project": {"hour": {"$hour": "$created_at"}, "total": 1}},
-        {"$group": {"_id": "$hour", "orders": {"$sum": 1}, "revenue": {"$sum": "$total"}}},
-        {"$sort": {"_id": 1}}
-    ]
-    hourly_results = list(database.orders.aggregate(hourly_pipeline))
-    hourly_distribution = [{"hour": r["_id"], "orders": r["orders"], "revenue": r["revenue"]} for r in hourly_results]
-
-    # Optimized: single aggregation instead of N queries
-    daily_pipeline = [
-        {"$match": {
-            "created_at": {"$gte": start_date, "$lte": end_date},
-            "status": {"$ne": "cancelled"}
-        }},
-        {"$group": {
-            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-            "orders_count": {"$sum": 1},
-            "revenue": {"$sum": "$total"}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
-    daily_results = {r["_id"]: r for r in database.orders.aggregate(daily_pipeline)}
+    # Every panel comes from a single $facet aggregation
+    stats = await compute_stats(today_start, start_date, end_date, filtered_product_ids)
+    daily_results = stats.pop("daily")
 
     daily_stats = []
     for i in range(min(days_in_range, 30)):
@@ -164,25 +107,9 @@ async def get_stats(
             "orders_count": day_data["orders_count"],
             "revenue": day_data["revenue"]
         })
+    stats["daily_stats"] = daily_stats
 
-    period_orders = list(database.orders.find({
-        "created_at": {"$gte": start_date, "$lte": end_date},
-        "status": {"$ne": "cancelled"}
-    }))
-    period_revenue = sum(o.get("total", 0) for o in period_orders)
-
-    return {
-        "today_orders": len(today_orders),
-        "today_revenue": today_revenue,
-        "pending_orders": pending,
-        "completed_orders": completed,
-        "period_orders": len(period_orders),
-        "period_revenue": period_revenue,
-        "top_products": top_products,
-        "daily_stats": daily_stats,
-        "revenue_by_type": revenue_by_type,
-        "hourly_distribution": hourly_distribution
-    }
+    return stats
 
 
 @router.get("/stats/by-tag")
@@ -193,22 +120,28 @@ async def get_stats_by_tag(date_from: str = None, date_to: str = None):
     if not database.connected or database.orders is None or database.products is None:
         return {"tags": []}
 
-    all_tags = list(database.product_tags.find()) if database.product_tags else []
+    all_tags = await database.product_tags.find().to_list() if database.product_tags is not None else []
     tag_map = {str(t["_id"]): t["name"] for t in all_tags}
 
-    products = list(database.products.find({"tags": {"$exists": True, "$ne": []}}))
+    products = await database.products.find({"tags": {"$exists": True, "$ne": []}}).to_list()
     product_tags_map = {str(p["_id"]): p.get("tags", []) for p in products}
 
-    pipeline = [
-        {"$match": {"created_at": {"$gte": start_date, "$lte": end_date}, "status": {"$ne": "cancelled"}}},
-        {"$unwind": "$items"},
-        {"$group": {
-            "_id": "$items.product_id",
-            "count": {"$sum": "$items.qty"},
-            "revenue": {"$sum": {"$multiply": ["$items.qty", "$items.price"]}}
-        }}
-    ]
-    product_stats = list(database.orders.aggregate(pipeline))
+    if await rollups.is_ready():
+        product_stats = [
+            {"_id": p["_id"], "count": p["qty"], "revenue": p["revenue"]}
+            for p in await rollups.product_totals(start_date, end_date, list(product_tags_map))
+        ]
+    else:
+        pipeline = [
+            {"$match": {"created_at": {"$gte": start_date, "$lte": end_date}, "status": {"$ne": "cancelled"}}},
+            {"$unwind": "$items"},
+            {"$group": {
+                "_id": "$items.product_id",
+                "count": {"$sum": "$items.qty"},
+                "revenue": {"$sum": {"$multiply": ["$items.qty", "$items.price"]}}
+            }}
+        ]
+        product_stats = await (await database.orders.aggregate(pipeline)).to_list()
 
     tag_stats = {}
     for stat in product_stats:
@@ -242,39 +175,48 @@ async def get_stats_by_product(product_id: str, date_from: str = None, date_to:
     if not database.connected or database.orders is None or database.products is None:
         return {"product": None, "stats": {}}
 
-    product = database.products.find_one({"_id": ObjectId(product_id)})
+    product = await database.products.find_one({"_id": ObjectId(product_id)})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    pipeline = [
-        {"$match": {"created_at": {"$gte": start_date, "$lte": end_date}, "status": {"$ne": "cancelled"}}},
-        {"$unwind": "$items"},
-        {"$match": {"items.product_id": product_id}},
-        {"$group": {
-            "_id": None,
-            "total_qty": {"$sum": "$items.qty"},
-            "total_revenue": {"$sum": {"$multiply": ["$items.qty", "$items.price"]}},
-            "order_count": {"$sum": 1}
-        }}
-    ]
-    stats_result = list(database.orders.aggregate(pipeline))
-    stats = stats_result[0] if stats_result else {"total_qty": 0, "total_revenue": 0, "order_count": 0}
-
     days_in_range = (end_date - start_date).days + 1
 
-    # Optimized: single aggregation instead of N queries
-    daily_product_pipeline = [
-        {"$match": {"created_at": {"$gte": start_date, "$lte": end_date}, "status": {"$ne": "cancelled"}}},
-        {"$unwind": "$items"},
-        {"$match": {"items.product_id": product_id}},
-        {"$group": {
-            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
-            "qty": {"$sum": "$items.qty"},
-            "revenue": {"$sum": {"$multiply": ["$items.qty", "$items.price"]}}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
-    daily_results = {r["_id"]: r for r in database.orders.aggregate(daily_product_pipeline)}
+    if await rollups.is_ready():
+        daily_rows = await rollups.daily_totals(start_date, end_date, dim=rollups.DIM_PRODUCT, key=product_id)
+        stats = {
+            "total_qty": sum(r["qty"] for r in daily_rows),
+            "total_revenue": sum(r["revenue"] for r in daily_rows),
+            "order_count": sum(r["orders"] for r in daily_rows)
+        }
+        daily_results = {r["date"]: r for r in daily_rows}
+    else:
+        pipeline = [
+            {"$match": {"created_at": {"$gte": start_date, "$lte": end_date}, "status": {"$ne": "cancelled"}}},
+            {"$unwind": "$items"},
+            {"$match": {"items.product_id": product_id}},
+            {"$group": {
+                "_id": None,
+                "total_qty": {"$sum": "$items.qty"},
+                "total_revenue": {"$sum": {"$multiply": ["$items.qty", "$items.price"]}},
+                "order_count": {"$sum": 1}
+            }}
+        ]
+        stats_result = await (await database.orders.aggregate(pipeline)).to_list()
+        stats = stats_result[0] if stats_result else {"total_qty": 0, "total_revenue": 0, "order_count": 0}
+
+        # Optimized: single aggregation instead of N queries
+        daily_product_pipeline = [
+            {"$match": {"created_at": {"$gte": start_date, "$lte": end_date}, "status": {"$ne": "cancelled"}}},
+            {"$unwind": "$items"},
+            {"$match": {"items.product_id": product_id}},
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                "qty": {"$sum": "$items.qty"},
+                "revenue": {"$sum": {"$multiply": ["$items.qty", "$items.price"]}}
+            }},
+            {"$sort": {"_id": 1}}
+        ]
+        daily_results = {r["_id"]: r async for r in await database.orders.aggregate(daily_product_pipeline)}
 
     daily_stats = []
     for i in range(min(days_in_range, 30)):
@@ -300,63 +242,144 @@ async def get_stats_by_product(product_id: str, date_from: str = None, date_to:
 
 # ============ Export ============
 
-@router.get("/export/orders")
-async def export_orders(date_from: str = None, date_to: str = None):
-    """Export orders to CSV format"""
-    _, start_date, end_date = _parse_date_range(date_from, date_to)
+EXPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 64 * 1024
 
+EXPORT_ORDER_FIELDS = [
+    "order_number", "created_at", "order_type", "table_number", "customer_name",
+    "customer_phone", "items", "subtotal", "discount_amount", "promo_code",
+    "delivery_fee", "total", "status", "payment_status", "payment_method"
+]
+EXPORT_ITEM_FIELDS = ["product_id", "name", "qty", "price"]
+
+EXPORT_CSV_HEADER = ['№ Замовлення', 'Дата', 'Тип', 'Столик', 'Клієнт', 'Телефон', 'Товари', 'Сума', 'Статус', 'Оплата']
+EXPORT_ORDER_TYPES = {'dine_in': 'В залі', 'takeaway': 'З собою', 'delivery': 'Доставка'}
+EXPORT_STATUSES = {'new': 'Нове', 'preparing': 'Готується', 'ready': 'Готове', 'completed': 'Виконано', 'cancelled': 'Скасовано'}
+EXPORT_PAYMENT_STATUSES = {'pending': 'Очікує', 'paid': 'Оплачено'}
+
+
+async def _iter_export_orders(start_date: datetime, end_date: datetime):
+    """Orders in the range, newest first, fetched in batches of EXPORT_BATCH_SIZE"""
     if not database.connected or database.orders is None:
-        orders = DEMO_ORDERS
+        for order in DEMO_ORDERS:
+            yield order
+        return
+
+    projection = {"_id": 0}
+    projection.update({field: 1 for field in EXPORT_ORDER_FIELDS if field != "items"})
+    projection.update({f"items.{field}": 1 for field in EXPORT_ITEM_FIELDS})
+    cursor = database.orders.find(
+        {"created_at": {"$gte": start_date, "$lte": end_date}},
+        projection
+    ).sort("created_at", -1).batch_size(EXPORT_BATCH_SIZE)
+    async for order in cursor:
+        yield order
+
+
+def _export_csv_row(order: dict) -> list:
+    created = order.get('created_at')
+    if isinstance(created, datetime):
+        date_str = created.strftime('%d.%m.%Y %H:%M')
+    elif isinstance(created, str):
+        try:
+            dt = datetime.fromisoformat(created.replace('Z', '+00:00'))
+            date_str = dt.strftime('%d.%m.%Y %H:%M')
+        except:
+            date_str = created
     else:
-        orders = list(database.orders.find({
-            "created_at": {"$gte": start_date, "$lte": end_date}
-        }).sort("created_at", -1))
+        date_str = ''
+
+    items_str = ', '.join([f"{item.get('name', '')} x{item.get('qty', 1)}" for item in order.get('items', [])])
+
+    return [
+        order.get('order_number', ''),
+        date_str,
+        EXPORT_ORDER_TYPES.get(order.get('order_type', ''), order.get('order_type', '')),
+        order.get('table_number', '') or '',
+        order.get('customer_name', '') or '',
+        order.get('customer_phone', '') or '',
+        items_str,
+        order.get('total', 0),
+        EXPORT_STATUSES.get(order.get('status', ''), order.get('status', '')),
+        EXPORT_PAYMENT_STATUSES.get(order.get('payment_status', ''), order.get('payment_status', ''))
+    ]
+
 
+async def _csv_chunks(orders):
+    """Encode orders as semicolon-separated CSV in ~EXPORT_CHUNK_SIZE pieces"""
     output = io.StringIO()
     writer = csv.writer(output, delimiter=';')
+    output.write('\ufeff')
+    writer.writerow(EXPORT_CSV_HEADER)
+
+    async for order in orders:
+        writer.writerow(_export_csv_row(order))
+        if output.tell() >= EXPORT_CHUNK_SIZE:
+            yield output.getvalue().encode('utf-8')
+            output.seek(0)
+            output.truncate(0)
+    yield output.getvalue().encode('utf-8')
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+async def _ndjson_chunks(orders):
+    """One JSON object per line with raw (untranslated) field values"""
+    lines = []
+    size = 0
+    async for order in orders:
+        record = {field: order.get(field) for field in EXPORT_ORDER_FIELDS if field != "items"}
+        record["items"] = [
+            {field: item.get(field) for field in EXPORT_ITEM_FIELDS}
+            for item in order.get("items", [])
+        ]
+        line = json.dumps(record, ensure_ascii=False, default=_json_default) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield "".join(lines).encode('utf-8')
+            lines = []
+            size = 0
+    if lines:
+        yield "".join(lines).encode('utf-8')
+
+
+async def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
 
-    writer.writerow(['№ Замовлення', 'Дата', 'Тип', 'Столик', 'Клієнт', 'Телефон', 'Товари', 'Сума', 'Статус', 'Оплата'])
-
-    order_types = {'dine_in': 'В залі', 'takeaway': 'З собою', 'delivery': 'Доставка'}
-    statuses = {'new': 'Нове', 'preparing': 'Готується', 'ready': 'Готове', 'completed': 'Виконано', 'cancelled': 'Скасовано'}
-    payment_statuses = {'pending': 'Очікує', 'paid': 'Оплачено'}
-
-    for order in orders:
-        created = order.get('created_at')
-        if isinstance(created, datetime):
-            date_str = created.strftime('%d.%m.%Y %H:%M')
-        elif isinstance(created, str):
-            try:
-                dt = datetime.fromisoformat(created.replace('Z', '+00:00'))
-                date_str = dt.strftime('%d.%m.%Y %H:%M')
-            except:
-                date_str = created
-        else:
-            date_str = ''
-
-        items_str = ', '.join([f"{item.get('name', '')} x{item.get('qty', 1)}" for item in order.get('items', [])])
-
-        writer.writerow([
-            order.get('order_number', ''),
-            date_str,
-            order_types.get(order.get('order_type', ''), order.get('order_type', '')),
-            order.get('table_number', '') or '',
-            order.get('customer_name', '') or '',
-            order.get('customer_phone', '') or '',
-            items_str,
-            order.get('total', 0),
-            statuses.get(order.get('status', ''), order.get('status', '')),
-            payment_statuses.get(order.get('payment_status', ''), order.get('payment_status', ''))
-        ])
 
-    csv_content = '\ufeff' + output.getvalue()
-    output.close()
+@router.get("/export/orders")
+async def export_orders(date_from: str = None, date_to: str = None, format: str = "csv", gzip: bool = False):
+    """Stream orders as CSV (default) or NDJSON, optionally gzip-compressed"""
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Невірний формат експорту")
 
-    filename = f"orders_{date_from or 'all'}_{date_to or 'now'}.csv"
+    _, start_date, end_date = _parse_date_range(date_from, date_to)
+    orders = _iter_export_orders(start_date, end_date)
+
+    if format == "ndjson":
+        chunks = _ndjson_chunks(orders)
+        media_type = "application/x-ndjson; charset=utf-8"
+    else:
+        chunks = _csv_chunks(orders)
+        media_type = "text/csv; charset=utf-8"
+
+    filename = f"orders_{date_from or 'all'}_{date_to or 'now'}.{format}"
+    if gzip:
+        chunks = _gzip_chunks(chunks)
+        media_type = "application/gzip"
+        filename += ".gz"
 
     return StreamingResponse(
-        iter([csv_content]),
-        media_type="text/csv; charset=utf-8",
+        chunks,
+        media_type=media_type,
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
@@ -393,7 +416,13 @@ async def export_stats(date_from: str = None, date_to: str = None):
                 "revenue": {"$sum": "$total"}
             }}
         ]
-        agg_results = list(database.orders.aggregate(export_pipeline))
+        if await rollups.is_ready():
+            agg_results = [
+                {"_id": {"date": r["date"], "order_type": r["key"]}, "count": r["orders"], "revenue": r["revenue"]}
+                for r in await rollups.daily_totals(start_date, end_date, dim="order_type")
+            ]
+        else:
+            agg_results = await (await database.orders.aggregate(export_pipeline)).to_list()
 
         # Build lookup dict: {date: {order_type: {count, revenue}}}
         daily_data = {}
@@ -437,7 +466,13 @@ async def export_stats(date_from: str = None, date_to: str = None):
             {"$sort": {"revenue": -1}},
             {"$limit": 20}
         ]
-        top_products = list(database.orders.aggregate(pipeline))
+        if await rollups.is_ready():
+            top_products = [
+                {"_id": p["name"], "count": p["qty"], "revenue": p["revenue"]}
+                for p in await rollups.product_totals(start_date, end_date, limit=20)
+            ]
+        else:
+            top_products = await (await database.orders.aggregate(pipeline)).to_list()
         for product in top_products:
             writer.writerow([product['_id'], product['count'], product['revenue']])
 
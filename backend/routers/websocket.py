@@ -1,46 +1,82 @@
 import asyncio
+import hmac
+import json
+import logging
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
-from ..redis_manager import redis_manager
-from ..config import REDIS_CHANNELS
+from ..config import WS_STAFF_TOKEN
+from ..websocket_hub import websocket_hub, TOPIC_KITCHEN, order_topic
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["websocket"])
 
 
-@router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await websocket.accept()
-    pubsub = None
-    listener_task = None
+def _is_staff(token: str = None) -> bool:
+    return bool(token) and hmac.compare_digest(token, WS_STAFF_TOKEN)
+
 
+def _initial_topics(order_id: str = None, staff: bool = False) -> list:
+    """Topics from the query string; only staff sockets default to the kitchen firehose"""
+    if order_id:
+        return [order_topic(order_id)]
+    return [TOPIC_KITCHEN] if staff else []
+
+
+def _handle_control_message(client, data: str, staff: bool = False):
+    """Apply {"action": "subscribe"|"unsubscribe", "topics": [...]} messages.
+
+    The kitchen topic carries every customer's order, so only staff
+    sockets may subscribe to it.
+    """
     try:
-        try:
-            pubsub = await redis_manager.subscribe(REDIS_CHANNELS)
+        message = json.loads(data)
+    except ValueError:
+        return
+    if not isinstance(message, dict):
+        return
 
-            async def listener(ps):
-                async for message in ps.listen():
-                    if message["type"] == "message":
-                        await websocket.send_text(message["data"])
+    topics = [t for t in message.get("topics", []) if isinstance(t, str)]
+    action = message.get("action")
+    if action == "subscribe" and not staff and TOPIC_KITCHEN in topics:
+        client.send(json.dumps({"type": "error", "detail": "Тема kitchen доступна лише персоналу"}))
+        topics = [t for t in topics if t != TOPIC_KITCHEN]
+    if action == "subscribe":
+        websocket_hub.subscribe(client, topics)
+    elif action == "unsubscribe":
+        websocket_hub.unsubscribe(client, topics)
+    else:
+        return
+    client.send(json.dumps({"type": "subscriptions", "topics": sorted(client.topics)}))
 
-            listener_task = asyncio.create_task(listener(pubsub))
-        except Exception:
-            pubsub = None
 
-        while True:
+@router.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket, order_id: str = None, since: str = None, token: str = None):
+    await websocket.accept()
+    staff = _is_staff(token)
+    client = websocket_hub.register(websocket, _initial_topics(order_id, staff), hold=since is not None)
+
+    try:
+        if since is not None:
+            await websocket_hub.replay(client, since)
+        while not client.closed:
             try:
                 data = await asyncio.wait_for(websocket.receive_text(), timeout=30)
                 if data == "ping":
-                    await websocket.send_text("pong")
+                    client.send("pong")
+                else:
+                    _handle_control_message(client, data, staff)
             except asyncio.TimeoutError:
-                await websocket.send_text("ping")
+                client.send("ping")
             except WebSocketDisconnect:
                 break
 
-    except Exception as e:
-        print(f"WebSocket error: {e}")
+    except Exception:
+        logger.exception("WebSocket error")
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
     finally:
-        if listener_task:
-            listener_task.cancel()
-        if pubsub:
-            await pubsub.aclose()
+        await websocket_hub.unregister(client)
@@ -0,0 +1,120 @@
+"""In-memory settings snapshot shared by all readers.
+
+The app_settings document is loaded once into an immutable, versioned
+snapshot and every reader (menu page, checkout, settings API) is served
+from memory. Writers bump the document's version atomically and publish
+it on CHANNEL_SETTINGS so every worker reloads its snapshot.
+"""
+import copy
+import json
+import logging
+from types import MappingProxyType
+from typing import Any, Optional
+
+from pymongo import ReturnDocument
+
+from . import database
+from .config import CHANNEL_SETTINGS
+from .dependencies import runtime_settings
+from .redis_manager import redis_manager
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_DOC_ID = "app_settings"
+SETTINGS_KEYS = (
+    "telegram", "restaurant", "delivery", "order_types",
+    "storefront", "card_surcharge", "media_slider",
+)
+
+
+class SettingsSnapshot:
+    """Immutable view of the settings at a given version.
+
+    Values are shared between readers and must be treated as read-only;
+    deep-copy a value before changing it.
+    """
+
+    __slots__ = ("version", "data")
+
+    def __init__(self, version: int, data: dict):
+        self.version = version
+        self.data = MappingProxyType(data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.data.get(key, default)
+
+
+def _build_snapshot(doc: dict = None) -> SettingsSnapshot:
+    """Overlay the stored settings on top of the defaults"""
+    data = copy.deepcopy(runtime_settings)
+    version = 0
+    if doc:
+        version = doc.get("version", 0)
+        for key in SETTINGS_KEYS:
+            if doc.get(key):
+                data[key] = doc[key]
+    return SettingsSnapshot(version, data)
+
+
+class SettingsService:
+    def __init__(self):
+        self.snapshot = _build_snapshot()
+        redis_manager.on_invalidation(CHANNEL_SETTINGS, self._on_invalidation)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Read a settings section from the current snapshot (read-only)"""
+        return self.snapshot.get(key, default)
+
+    def as_dict(self) -> dict:
+        return dict(self.snapshot.data)
+
+    async def load(self):
+        """Reload the snapshot from MongoDB"""
+        if not database.connected or database.settings is None:
+            return
+        try:
+            doc = await database.settings.find_one({"_id": SETTINGS_DOC_ID})
+        except Exception as e:
+            logger.error("Failed to load settings: %s", e)
+            return
+        self.snapshot = _build_snapshot(doc)
+
+    async def update(self, key: str, value: Any):
+        """Persist one settings section, bump the version and notify all workers"""
+        if not database.connected or database.settings is None:
+            data = dict(self.snapshot.data)
+            data[key] = value
+            self.snapshot = SettingsSnapshot(self.snapshot.version + 1, data)
+            return
+
+        doc = await database.settings.find_one_and_update(
+            {"_id": SETTINGS_DOC_ID},
+            {"$set": {key: value}, "$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self.snapshot = _build_snapshot(doc)
+
+        try:
+            await redis_manager.publish(CHANNEL_SETTINGS, {"version": self.snapshot.version})
+        except Exception as e:
+            logger.error("Failed to publish settings invalidation: %s", e)
+
+    async def start(self):
+        """Load the snapshot; invalidations arrive through redis_manager"""
+        await self.load()
+
+    async def _on_invalidation(self, data: Optional[str]):
+        if data is None:
+            # (Re)subscribed: pick up changes made while disconnected
+            await self.load()
+            return
+        try:
+            version = int(json.loads(data).get("version", 0))
+        except (TypeError, ValueError, AttributeError):
+            version = None
+        if version is None or version > self.snapshot.version:
+            await self.load()
+
+
+settings_service = SettingsService()
@@ -1,10 +1,284 @@
-"""Telegram bot integration for order notifications"""
+"""Telegram bot integration for order notifications.
+
+All messages go through one TelegramNotifier per process:
+- a persistent keep-alive httpx client instead of a connection per message
+- a token bucket per chat (Telegram allows about one message per second
+  per chat)
+- notifications are buffered in a Redis list shared by all processes and
+  flushed every TELEGRAM_DIGEST_WINDOW by the notifier's own task, one
+  digest message per chat; a digest that fails is retried on later
+  flushes and its entries go to TELEGRAM_DEAD after MAX_DIGEST_ATTEMPTS
+- 429 responses are retried after Telegram's retry_after, network and 5xx
+  errors with exponential backoff
+- counters in `notifier.metrics`
+"""
+import asyncio
+import json
 import logging
+import time
+from typing import Optional
+from uuid import uuid4
+
 import httpx
-from .config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
+
+from .config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TELEGRAM_API_URL, TELEGRAM_DIGEST_WINDOW
+from .redis_manager import redis_manager
 
 logger = logging.getLogger(__name__)
 
+CHAT_RATE = 1.0        # messages per second per chat
+CHAT_BURST = 3         # messages a chat may send back-to-back
+MAX_SEND_ATTEMPTS = 5
+MAX_BACKOFF = 30       # seconds
+DIGEST_MAX_LINES = 30
+DIGEST_BATCH = 500         # buffered notifications taken per flush
+MAX_DIGEST_ATTEMPTS = 5    # flushes a notification may fail before it is dropped
+FLUSH_LOCK_TTL = 300       # seconds; covers send_message's retries
+
+TELEGRAM_PENDING = "telegram:pending"
+TELEGRAM_DEAD = "telegram:dead"
+TELEGRAM_DEAD_LIMIT = 1000
+TELEGRAM_FLUSH_LOCK = "telegram:flush"
+
+STATUS_LABELS = {
+    'preparing': '👨‍🍳 Готується',
+    'ready': '✅ Готове',
+    'completed': '🎉 Виконано',
+    'cancelled': '❌ Скасовано'
+}
+
+ORDER_TYPE_LABELS = {
+    'dine_in': 'В залі',
+    'takeaway': 'З собою',
+    'delivery': 'Доставка'
+}
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float = CHAT_RATE, capacity: int = CHAT_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class TelegramNotifier:
+    def __init__(
+        self,
+        token: str = TELEGRAM_BOT_TOKEN,
+        chat_id: str = TELEGRAM_CHAT_ID,
+        api_url: str = TELEGRAM_API_URL,
+        digest_window: float = TELEGRAM_DIGEST_WINDOW
+    ):
+        self.token = token
+        self.chat_id = chat_id
+        self.api_url = api_url.rstrip("/")
+        self.digest_window = digest_window
+        self.metrics = {
+            "queued": 0,
+            "sent": 0,
+            "failed": 0,
+            "coalesced": 0,
+            "retried": 0,
+            "rate_limited": 0,
+            "dead": 0,
+        }
+        self._client: Optional[httpx.AsyncClient] = None
+        self._buckets: dict = {}   # (token, chat_id) -> TokenBucket
+        self._pending: list = []   # buffered entries while Redis is unavailable
+        self._flusher: Optional[asyncio.Task] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.api_url, timeout=10)
+        return self._client
+
+    async def send_message(self, text: str, chat_id: str = None, token: str = None) -> bool:
+        """Send one message now (rate limited, retried). Returns True on success."""
+        token = token or self.token
+        target_chat = chat_id or self.chat_id
+        if not token or not target_chat:
+            return False
+
+        bucket = self._buckets.setdefault((token, target_chat), TokenBucket())
+        payload = {"chat_id": target_chat, "text": text, "parse_mode": "HTML"}
+
+        for attempt in range(MAX_SEND_ATTEMPTS):
+            if attempt:
+                self.metrics["retried"] += 1
+            await bucket.acquire()
+            try:
+                response = await self._get_client().post(f"/bot{token}/sendMessage", json=payload)
+            except httpx.HTTPError as e:
+                logger.warning("Telegram send error: %s", e)
+                await asyncio.sleep(min(MAX_BACKOFF, 2 ** attempt))
+                continue
+
+            if response.status_code == 200:
+                self.metrics["sent"] += 1
+                return True
+            if response.status_code == 429:
+                self.metrics["rate_limited"] += 1
+                try:
+                    retry_after = response.json().get("parameters", {}).get("retry_after", 1)
+                except ValueError:
+                    retry_after = 1
+                logger.warning("Telegram rate limit hit, retrying in %ss", retry_after)
+                await asyncio.sleep(min(MAX_BACKOFF, retry_after))
+                continue
+            if response.status_code >= 500:
+                await asyncio.sleep(min(MAX_BACKOFF, 2 ** attempt))
+                continue
+
+            logger.error("Telegram rejected message: %s %s", response.status_code, response.text[:200])
+            break
+
+        self.metrics["failed"] += 1
+        return False
+
+    async def start(self):
+        """Start the digest flusher (also started by the first enqueue())"""
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def enqueue(self, text: str, digest_line: str, chat_id: str = None) -> bool:
+        """Buffer a notification for the next digest of its chat.
+
+        The buffer is a Redis list shared by every process, so it survives
+        restarts and a burst from all workers goes out as one message; it
+        falls back to memory while Redis is unavailable. Returns False if
+        Telegram is not configured.
+        """
+        chat_id = chat_id or self.chat_id
+        if not self.token or not chat_id:
+            return False
+        self.metrics["queued"] += 1
+        entry = {"chat_id": chat_id, "text": text, "line": digest_line, "attempts": 0}
+        await self.start()
+        if redis_manager.redis is not None:
+            try:
+                await redis_manager.redis.rpush(TELEGRAM_PENDING, json.dumps(entry))
+                return True
+            except Exception as e:
+                logger.error("Failed to buffer Telegram notification, keeping it in memory: %s", e)
+        self._pending.append(entry)
+        return True
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.digest_window)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Telegram digest flush error: %s", e)
+
+    async def flush(self):
+        """Send every buffered notification, one digest per chat"""
+        entries, self._pending = self._pending, []
+        if entries:
+            self._pending.extend(self._retry_or_drop(await self._send_digests(entries), []))
+
+        redis = redis_manager.redis
+        if redis is None:
+            return
+        # One process flushes the shared buffer at a time; the lease expires
+        # if it dies mid-send, and those entries are sent again
+        lease = uuid4().hex
+        if not await redis.set(TELEGRAM_FLUSH_LOCK, lease, nx=True, ex=FLUSH_LOCK_TTL):
+            return
+        try:
+            raw = await redis.lrange(TELEGRAM_PENDING, 0, DIGEST_BATCH - 1)
+            if not raw:
+                return
+            entries = []
+            for item in raw:
+                try:
+                    entries.append(json.loads(item))
+                except ValueError:
+                    logger.error("Dropping malformed Telegram notification: %.200s", item)
+            dead = []
+            retry = self._retry_or_drop(await self._send_digests(entries), dead)
+            async with redis.pipeline(transaction=True) as pipe:
+                # Entries buffered meanwhile were appended after the ones taken
+                pipe.ltrim(TELEGRAM_PENDING, len(raw), -1)
+                if retry:
+                    pipe.rpush(TELEGRAM_PENDING, *(json.dumps(e) for e in retry))
+                if dead:
+                    pipe.lpush(TELEGRAM_DEAD, *(json.dumps(e) for e in dead))
+                    pipe.ltrim(TELEGRAM_DEAD, 0, TELEGRAM_DEAD_LIMIT - 1)
+                await pipe.execute()
+        finally:
+            if await redis.get(TELEGRAM_FLUSH_LOCK) == lease:
+                await redis.delete(TELEGRAM_FLUSH_LOCK)
+
+    def _retry_or_drop(self, failed: list, dead: list) -> list:
+        """Entries of failed digests to try again; the rest go to `dead`"""
+        retry = []
+        for entry in failed:
+            entry["attempts"] = entry.get("attempts", 0) + 1
+            if entry["attempts"] < MAX_DIGEST_ATTEMPTS:
+                retry.append(entry)
+            else:
+                self.metrics["dead"] += 1
+                logger.error("Dropping Telegram notification after %d attempts: %.100s",
+                             entry["attempts"], entry.get("line"))
+                dead.append(entry)
+        return retry
+
+    async def _send_digests(self, entries: list) -> list:
+        """Send one message per chat; returns the entries whose message failed"""
+        by_chat = {}
+        for entry in entries:
+            by_chat.setdefault(entry["chat_id"], []).append(entry)
+        failed = []
+        for chat_id, chat_entries in by_chat.items():
+            if len(chat_entries) == 1:
+                text = chat_entries[0]["text"]
+            else:
+                self.metrics["coalesced"] += len(chat_entries) - 1
+                lines = [entry["line"] for entry in chat_entries]
+                text = f"📬 <b>{len(lines)} нових сповіщень</b>\n\n" + "\n".join(lines[:DIGEST_MAX_LINES])
+                if len(lines) > DIGEST_MAX_LINES:
+                    text += f"\n… та ще {len(lines) - DIGEST_MAX_LINES}"
+            if not await self.send_message(text, chat_id=chat_id):
+                failed.extend(chat_entries)
+        return failed
+
+    async def close(self):
+        """Stop the flusher, send what is buffered in memory and close the HTTP client"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        if self._pending:
+            entries, self._pending = self._pending, []
+            await self._send_digests(entries)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+notifier = TelegramNotifier()
+
 
 async def send_telegram_message(text: str, chat_id: str = None, token: str = None) -> bool:
     """Send a message via Telegram bot.
@@ -17,26 +291,7 @@ async def send_telegram_message(text: str, chat_id: str = None, token: str = Non
     Returns:
         True if message was sent successfully, False otherwise
     """
-    token = token or TELEGRAM_BOT_TOKEN
-    target_chat = chat_id or TELEGRAM_CHAT_ID
-
-    if not token or not target_chat:
-        return False
-
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-    payload = {
-        "chat_id": target_chat,
-        "text": text,
-        "parse_mode": "HTML"
-    }
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=payload, timeout=10)
-            return response.status_code == 200
-    except Exception as e:
-        logger.error("Telegram send error: %s", e)
-        return False
+    return await notifier.send_message(text, chat_id, token)
 
 
 def format_order_message(order: dict) -> str:
@@ -48,12 +303,6 @@ def format_order_message(order: dict) -> str:
     Returns:
         Formatted message string with HTML tags
     """
-    order_types = {
-        'dine_in': 'В залі',
-        'takeaway': 'З собою',
-        'delivery': 'Доставка'
-    }
-
     items_text = ""
     for item in order.get("items", []):
         items_text += f"  • {item['name']} x{item['qty']} — {item['price'] * item['qty']} грн\n"
@@ -81,7 +330,7 @@ def format_order_message(order: dict) -> str:
     message = f"""🆕 <b>Нове замовлення!</b>
 
 📋 <b>№ {order.get('order_number', 'N/A')}</b>
-🏷️ <b>Тип:</b> {order_types.get(order.get('order_type', ''), order.get('order_type', ''))}{table_info}{customer_info}
+🏷️ <b>Тип:</b> {ORDER_TYPE_LABELS.get(order.get('order_type', ''), order.get('order_type', ''))}{table_info}{customer_info}
 
 <b>Замовлення:</b>
 {items_text}{discount_info}
@@ -92,20 +341,21 @@ def format_order_message(order: dict) -> str:
 
 
 async def send_order_notification(order: dict) -> bool:
-    """Send notification about new order.
+    """Queue notification about new order (sent with the next digest).
 
     Args:
         order: Order dictionary
 
     Returns:
-        True if notification was sent, False otherwise
+        True if the notification was queued, False if Telegram is not configured
     """
-    message = format_order_message(order)
-    return await send_telegram_message(message)
+    order_type = ORDER_TYPE_LABELS.get(order.get('order_type', ''), order.get('order_type', ''))
+    digest_line = f"🆕 <b>№ {order.get('order_number', 'N/A')}</b> — {order.get('total', 0)} грн ({order_type})"
+    return await notifier.enqueue(format_order_message(order), digest_line)
 
 
 async def send_status_notification(order_number: str, status: str, chat_id: str = None) -> bool:
-    """Send notification about order status change.
+    """Queue notification about order status change (sent with the next digest).
 
     Args:
         order_number: Order number
@@ -113,16 +363,10 @@ async def send_status_notification(order_number: str, status: str, chat_id: str
         chat_id: Optional specific chat to notify
 
     Returns:
-        True if notification was sent, False otherwise
+        True if the notification was queued, False if Telegram is not configured
     """
-    statuses = {
-        'preparing': '👨‍🍳 Готується',
-        'ready': '✅ Готове',
-        'completed': '🎉 Виконано',
-        'cancelled': '❌ Скасовано'
-    }
-
-    status_text = statuses.get(status, status)
+    status_text = STATUS_LABELS.get(status, status)
     message = f"📦 Замовлення <b>{order_number}</b>\n\nСтатус: {status_text}"
+    digest_line = f"📦 <b>{order_number}</b> → {status_text}"
 
-    return await send_telegram_message(message, chat_id)
+    return await notifier.enqueue(message, digest_line, chat_id)
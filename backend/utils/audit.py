@@ -3,13 +3,13 @@ from datetime import datetime
 from .. import database
 
 
-def log_action(action: str, entity_type: str, entity_id: str, entity_name: str, changes: dict = None):
+async def log_action(action: str, entity_type: str, entity_id: str, entity_name: str, changes: dict = None):
     """Log an action to the audit log"""
     if not database.connected or database.audit_logs is None:
         return
 
     try:
-        database.audit_logs.insert_one({
+        await database.audit_logs.insert_one({
             "action": action,
             "entity_type": entity_type,
             "entity_id": str(entity_id),
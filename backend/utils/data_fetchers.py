@@ -7,16 +7,16 @@ from ..utils.serializers import serialize_doc, serialize_docs
 from ..utils.demo_data import DEMO_CATEGORIES, DEMO_PRODUCTS, DEMO_MENU_ITEMS
 
 
-def init_default_data():
+async def init_default_data():
     """Initialize default data if empty"""
-    _init_default_customer_categories()
+    await _init_default_customer_categories()
 
 
-def _init_default_customer_categories():
+async def _init_default_customer_categories():
     """Initialize default customer categories if empty"""
     if not database.connected or database.customer_categories is None:
         return
-    if database.customer_categories.count_documents({}) == 0:
+    if await database.customer_categories.count_documents({}) == 0:
         defaults = [
             {
                 "name": "Друзі",
@@ -35,33 +35,33 @@ def _init_default_customer_categories():
                 "created_at": datetime.utcnow()
             }
         ]
-        database.customer_categories.insert_many(defaults)
+        await database.customer_categories.insert_many(defaults)
         print("Default customer categories created")
 
 
-def get_categories_list():
+async def get_categories_list():
     """Get categories from DB or demo data"""
     if database.connected and database.categories is not None:
-        return serialize_docs(database.categories.find().sort("sort_order", 1))
+        return serialize_docs(await database.categories.find().sort("sort_order", 1).to_list())
     return DEMO_CATEGORIES
 
 
-def get_products_list(available_only=False):
+async def get_products_list(available_only=False):
     """Get products from DB or demo data"""
     if database.connected and database.products is not None:
         query = {"available": True} if available_only else {}
-        return serialize_docs(database.products.find(query))
+        return serialize_docs(await database.products.find(query).to_list())
     if available_only:
         return [p for p in DEMO_PRODUCTS if p.get("available", True)]
     return DEMO_PRODUCTS
 
 
-def get_menu_items_list(active_only=True):
+async def get_menu_items_list(active_only=True):
     """Get menu items with product/combo data (for POS/customer menu)"""
     if not database.connected or database.menu_items is None:
         if DEMO_MENU_ITEMS:
             return DEMO_MENU_ITEMS
-        return get_products_list(available_only=active_only)
+        return await get_products_list(available_only=active_only)
 
     match_query = {"is_active": True} if active_only else {}
 
@@ -120,7 +120,7 @@ def get_menu_items_list(active_only=True):
         }}
     ]
 
-    menu_items = list(database.menu_items.aggregate(pipeline))
+    menu_items = await (await database.menu_items.aggregate(pipeline)).to_list()
 
     result = []
     for item in menu_items:
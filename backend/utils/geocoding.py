@@ -5,21 +5,226 @@ This module provides backend-proxied geocoding to:
 1. Keep Google API key secure (never exposed in frontend)
 2. Apply Ukrainian address formatting (locality, language, region biasing)
 3. Handle errors gracefully
+4. Avoid repeat lookups: addresses are normalized and cached in-process
+   (LRU) and in Redis, "not found" results are cached too, and identical
+   concurrent lookups share one provider request
+
+The provider is pluggable (see GeocodingProvider), so tests and local
+development can swap Google for a stub with `geocoder.provider = ...`.
 """
 
-import aiohttp
+import asyncio
+import logging
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
 from typing import Optional, Tuple
+
+import aiohttp
+
 from ..config import GOOGLE_MAPS_API_KEY
+from ..redis_manager import redis_manager, CACHE_GEOCODE, TTL_GEOCODE, TTL_GEOCODE_MISS
+
+logger = logging.getLogger(__name__)
 
 GEOCODING_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+DEFAULT_LOCALITY = "Івано-Франківськ"
+
+LRU_SIZE = 2048
+TTL_TRANSIENT_MISS = 60  # seconds a provider error is remembered locally
+
+Coordinates = Tuple[float, float]
+
+# Common Ukrainian street-type abbreviations, expanded before caching
+_ABBREVIATIONS = {
+    "вул": "вулиця",
+    "просп": "проспект",
+    "пр-т": "проспект",
+    "бул": "бульвар",
+    "б-р": "бульвар",
+    "пл": "площа",
+    "пров": "провулок",
+    "пров-к": "провулок",
+    "наб": "набережна",
+}
+# "буд. 5" / "б. 5" mean "building 5"; a letter after a number ("36 б") is part of it
+_BUILDING = {"буд", "б"}
+_APOSTROPHES = re.compile(r"[’ʼ`´]")
+_TOKENS = re.compile(r"[\w'\-]+", re.UNICODE)
+
+
+def normalize_address(address: str) -> str:
+    """Canonical form of an address for cache keys.
+
+    Lowercases, unifies apostrophes, drops punctuation and expands street
+    abbreviations, so "вул. Незалежності, 36" and "вулиця незалежності 36"
+    share one cache entry. A building marker is dropped only before a house
+    number ("буд. 36" -> "36"), so "36 б" keeps its letter.
+    """
+    text = _APOSTROPHES.sub("'", address.lower())
+    tokens = _TOKENS.findall(text)
+    words = []
+    for i, token in enumerate(tokens):
+        if token in _BUILDING:
+            follows_number = i > 0 and tokens[i - 1][0].isdigit()
+            before_number = i + 1 < len(tokens) and tokens[i + 1][0].isdigit()
+            if before_number and not follows_number:
+                continue
+        words.append(_ABBREVIATIONS.get(token, token))
+    return " ".join(words)
+
+
+class GeocodingError(Exception):
+    """Transient provider failure (network, quota, missing key); not cached"""
+
+
+class GeocodingProvider(ABC):
+    """Resolves an address to coordinates.
+
+    geocode() returns None when the address does not exist and raises
+    GeocodingError when the lookup could not be performed.
+    """
+
+    @abstractmethod
+    async def geocode(self, address: str, locality: str) -> Optional[Coordinates]:
+        ...
+
+    async def close(self):
+        pass
+
+
+class GoogleGeocodingProvider(GeocodingProvider):
+    """Google Maps Geocoding API over one long-lived aiohttp session."""
+
+    def __init__(self, api_key: str = GOOGLE_MAPS_API_KEY, timeout: float = 10):
+        self.api_key = api_key
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        return self._session
+
+    async def geocode(self, address: str, locality: str) -> Optional[Coordinates]:
+        if not self.api_key:
+            raise GeocodingError("GOOGLE_MAPS_API_KEY is not configured")
+
+        params = {
+            "address": f"{address}, {locality}, Україна",
+            "key": self.api_key,
+            "language": "uk",
+            "region": "ua",
+            "components": f"country:UA|locality:{locality}"
+        }
+
+        try:
+            async with self._get_session().get(GEOCODING_URL, params=params) as resp:
+                if resp.status != 200:
+                    raise GeocodingError(f"HTTP {resp.status}")
+                data = await resp.json()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise GeocodingError(str(e)) from e
+
+        status = data.get("status")
+        if status == "ZERO_RESULTS" or (status == "OK" and not data.get("results")):
+            return None
+        if status != "OK":
+            raise GeocodingError(status or "unknown status")
+
+        location = data["results"][0]["geometry"]["location"]
+        return (location["lat"], location["lng"])
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class Geocoder:
+    """Caching, coalescing front-end for a GeocodingProvider."""
+
+    def __init__(self, provider: GeocodingProvider = None, lru_size: int = LRU_SIZE):
+        self.provider = provider or GoogleGeocodingProvider()
+        self.lru_size = lru_size
+        self._lru: OrderedDict = OrderedDict()  # key -> (expires_at, coords or None)
+        self._inflight: dict = {}  # key -> asyncio.Task
+
+    def _lru_get(self, key: str):
+        entry = self._lru.get(key)
+        if entry is None:
+            return False, None
+        expires_at, coords = entry
+        if expires_at < time.monotonic():
+            del self._lru[key]
+            return False, None
+        self._lru.move_to_end(key)
+        return True, coords
+
+    def _lru_set(self, key: str, coords: Optional[Coordinates], ttl: int):
+        self._lru[key] = (time.monotonic() + ttl, coords)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    async def geocode(self, address: str, locality: str = DEFAULT_LOCALITY) -> Optional[Coordinates]:
+        normalized = normalize_address(address)
+        if not normalized:
+            return None
+        key = f"{CACHE_GEOCODE}:{normalize_address(locality)}:{normalized}"
+
+        found, coords = self._lru_get(key)
+        if found:
+            return coords
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._resolve(key, address, locality))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one cancelled caller doesn't cancel the shared lookup
+        return await asyncio.shield(task)
+
+    async def _resolve(self, key: str, address: str, locality: str) -> Optional[Coordinates]:
+        cached = await redis_manager.get_cached(key)
+        if cached is not None:
+            coords = (cached["lat"], cached["lng"]) if cached.get("found") else None
+            self._lru_set(key, coords, TTL_GEOCODE_MISS if coords is None else TTL_GEOCODE)
+            return coords
+
+        try:
+            coords = await self.provider.geocode(address, locality)
+        except GeocodingError as e:
+            logger.warning("Geocoding failed for %r: %s", address, e)
+            self._lru_set(key, None, TTL_TRANSIENT_MISS)
+            return None
+        except Exception as e:
+            logger.error("Geocoding error for %r: %s", address, e)
+            self._lru_set(key, None, TTL_TRANSIENT_MISS)
+            return None
+
+        if coords is None:
+            self._lru_set(key, None, TTL_GEOCODE_MISS)
+            await redis_manager.set_cached(key, {"found": False}, TTL_GEOCODE_MISS)
+        else:
+            self._lru_set(key, coords, TTL_GEOCODE)
+            await redis_manager.set_cached(key, {"found": True, "lat": coords[0], "lng": coords[1]}, TTL_GEOCODE)
+        return coords
+
+    async def close(self):
+        await self.provider.close()
+
+
+geocoder = Geocoder()
 
 
 async def geocode_address(
     address: str,
-    locality: str = "Івано-Франківськ"
+    locality: str = DEFAULT_LOCALITY
 ) -> Optional[Tuple[float, float]]:
     """
-    Geocode a Ukrainian address using Google Maps API.
+    Geocode a Ukrainian address using the configured provider (Google Maps).
 
     Args:
         address: Street address (e.g., "Незалежності 36")
@@ -31,30 +236,6 @@ async def geocode_address(
     Note:
         Always includes locality and country to ensure accurate results
         for Ukrainian addresses. Uses Ukrainian language for response.
+        Results are cached by normalized address (see Geocoder).
     """
-    if not GOOGLE_MAPS_API_KEY:
-        return None
-
-    params = {
-        "address": f"{address}, {locality}, Україна",
-        "key": GOOGLE_MAPS_API_KEY,
-        "language": "uk",
-        "region": "ua",
-        "components": f"country:UA|locality:{locality}"
-    }
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(GEOCODING_URL, params=params) as resp:
-                if resp.status != 200:
-                    return None
-
-                data = await resp.json()
-
-                if data.get("status") != "OK" or not data.get("results"):
-                    return None
-
-                location = data["results"][0]["geometry"]["location"]
-                return (location["lat"], location["lng"])
-    except Exception:
-        return None
+    return await geocoder.geocode(address, locality)
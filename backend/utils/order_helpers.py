@@ -1,20 +1,109 @@
+import asyncio
 from datetime import datetime, timedelta
+from typing import List
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
 from .. import database
+from ..config import ORDER_NUMBER_BLOCK_SIZE
 from ..utils.demo_data import demo_state
 
 
-def generate_order_number():
+class OrderNumberAllocator:
+    """Per-day order sequence backed by an atomic counter document.
+
+    Each day has a document {"_id": "orders:YYYYMMDD", "seq": N} in the
+    counters collection. Numbers are reserved with a single $inc, so
+    allocation is O(1) and collision-free across workers. With
+    block_size > 1 a worker reserves a block of numbers per round-trip
+    and hands them out from memory.
+    """
+
+    def __init__(self, block_size: int = ORDER_NUMBER_BLOCK_SIZE):
+        self.block_size = block_size
+        self._lock = asyncio.Lock()
+        self._day = None
+        self._next = 0
+        self._end = 0
+        self._seeded_days = set()
+
+    async def _seed(self, day: str, day_start: datetime):
+        """Create today's counter starting after any orders numbered before it existed"""
+        if day in self._seeded_days:
+            return
+        key = f"orders:{day}"
+        if await database.counters.find_one({"_id": key}, {"_id": 1}) is None:
+            existing = await database.orders.count_documents({
+                "created_at": {"$gte": day_start, "$lt": day_start + timedelta(days=1)}
+            })
+            try:
+                await database.counters.update_one(
+                    {"_id": key},
+                    {"$setOnInsert": {"seq": existing}},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                pass  # another worker created it first
+        self._seeded_days.add(day)
+
+    async def _reserve(self, day: str, count: int) -> int:
+        """Atomically reserve `count` numbers and return the first one"""
+        counter = await database.counters.find_one_and_update(
+            {"_id": f"orders:{day}"},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"] - count + 1
+
+    async def next_many(self, now: datetime, count: int) -> List[int]:
+        """Reserve `count` consecutive numbers for now's day with one $inc"""
+        day = now.strftime("%Y%m%d")
+        await self._seed(day, now.replace(hour=0, minute=0, second=0, microsecond=0))
+        first = await self._reserve(day, count)
+        return list(range(first, first + count))
+
+    async def next(self, now: datetime) -> int:
+        if self.block_size == 1:
+            # Every number is its own $inc: nothing in memory to guard
+            return (await self.next_many(now, 1))[0]
+        day = now.strftime("%Y%m%d")
+        # The lock only serializes refilling the reserved block
+        async with self._lock:
+            if self._day != day or self._next >= self._end:
+                day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+                await self._seed(day, day_start)
+                self._next = await self._reserve(day, self.block_size)
+                self._end = self._next + self.block_size
+                self._day = day
+            number = self._next
+            self._next += 1
+            return number
+
+
+order_number_allocator = OrderNumberAllocator()
+
+
+async def generate_order_number():
     """Generate unique order number"""
     now = datetime.utcnow()
     today = now.strftime("%Y%m%d")
-    if database.connected and database.orders is not None:
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        tomorrow_start = today_start + timedelta(days=1)
-        count = database.orders.count_documents({
-            "created_at": {"$gte": today_start, "$lt": tomorrow_start}
-        })
+    if database.connected and database.counters is not None:
+        number = await order_number_allocator.next(now)
     else:
         demo_state.order_counter += 1
-        count = demo_state.order_counter
-    return f"ORD-{today}-{count + 1:03d}"
+        number = demo_state.order_counter
+    return f"ORD-{today}-{number:03d}"
+
+
+async def generate_order_numbers(count: int, now: datetime = None) -> List[str]:
+    """`count` unique order numbers in the day of `now` (default: today)"""
+    now = now or datetime.utcnow()
+    day = now.strftime("%Y%m%d")
+    if database.connected and database.counters is not None:
+        numbers = await order_number_allocator.next_many(now, count)
+    else:
+        numbers = range(demo_state.order_counter + 1, demo_state.order_counter + count + 1)
+        demo_state.order_counter += count
+    return [f"ORD-{day}-{number:03d}" for number in numbers]
@@ -0,0 +1,6 @@
+import re
+
+
+def normalize_phone(phone: str) -> str:
+    """Normalize phone number: strip spaces, dashes, parentheses"""
+    return re.sub(r'[\s\-\(\)]', '', phone.strip())
@@ -0,0 +1,192 @@
+"""Server-side order pricing.
+
+A PriceBook is compiled from products, combos and modifier groups and kept
+in memory next to the menu snapshot (see MenuCache.get_price_book), so it
+is rebuilt whenever the menu is invalidated. create_order reprices every
+OrderItem from it: client-supplied prices and modifier surcharges are
+overwritten, unknown or unavailable products and invalid modifier
+selections are rejected with PricingError. Required groups are enforced
+only on lines that select modifiers, as the carts don't send them yet.
+
+Benchmark with `python -m backend.utils.pricing`.
+"""
+from typing import Dict, Iterable, List
+
+from ..models import OrderItem
+
+COMBO_PREFIX = "combo_"  # cart product_id of a combo is "combo_<combo id>"
+
+
+class PricingError(ValueError):
+    """The cart can't be priced; the message is shown to the customer"""
+
+
+class _Group:
+    __slots__ = ("name", "single", "required", "options")
+
+    def __init__(self, doc: dict):
+        self.name = doc.get("name", "")
+        self.single = doc.get("type", "single") == "single"
+        self.required = bool(doc.get("required"))
+        self.options: Dict[str, float] = {
+            o["name"]: round(float(o.get("price_add", 0)), 2) for o in doc.get("options", [])
+        }
+
+
+class _Product:
+    __slots__ = ("name", "price", "available", "groups")
+
+    def __init__(self, doc: dict, groups: Dict[str, _Group]):
+        self.name = doc.get("name", "")
+        self.price = round(float(doc.get("price", 0)), 2)
+        self.available = doc.get("available", True)
+        # Group name -> group, as SelectedModifier refers to groups by name
+        self.groups: Dict[str, _Group] = {}
+        for group_id in doc.get("modifier_groups", []):
+            group = groups.get(str(group_id))
+            if group is not None:
+                self.groups[group.name] = group
+
+
+class _Combo:
+    __slots__ = ("name", "price", "available", "items")
+
+    def __init__(self, doc: dict):
+        self.name = doc.get("name", "")
+        self.price = round(float(doc.get("combo_price", 0)), 2)
+        self.available = doc.get("available", True)
+        self.items = [
+            {"product_id": str(i.get("product_id", "")), "product_name": i.get("product_name", ""),
+             "qty": i.get("qty", 1)}
+            for i in doc.get("items", [])
+        ]
+
+
+class PriceBook:
+    def __init__(self, products: Iterable[dict], combos: Iterable[dict], modifier_groups: Iterable[dict]):
+        groups = {
+            str(g["_id"]): _Group(g)
+            for g in modifier_groups if g.get("is_enabled", True)
+        }
+        self.products = {str(p["_id"]): _Product(p, groups) for p in products}
+        self.combos = {str(c["_id"]): _Combo(c) for c in combos}
+
+    def price_item(self, item: OrderItem):
+        """Overwrite the item's name, unit price and modifier surcharges"""
+        if item.qty <= 0:
+            raise PricingError(f"Невірна кількість для товару: {item.name}")
+
+        if item.product_id.startswith(COMBO_PREFIX):
+            combo = self.combos.get(item.product_id[len(COMBO_PREFIX):])
+            if combo is None:
+                raise PricingError(f"Комбо '{item.name}' не знайдено")
+            if not combo.available:
+                raise PricingError(f"Комбо '{combo.name}' недоступне")
+            if item.modifiers:
+                raise PricingError(f"Комбо '{combo.name}' не підтримує модифікатори")
+            item.name = combo.name
+            item.price = combo.price
+            item.is_combo = True
+            item.combo_items = combo.items
+            return
+
+        product = self.products.get(item.product_id)
+        if product is None:
+            raise PricingError(f"Товар '{item.name}' не знайдено")
+        if not product.available:
+            raise PricingError(f"Товар '{product.name}' недоступний")
+
+        chosen: Dict[str, set] = {}
+        surcharge = 0.0
+        for modifier in item.modifiers:
+            group = product.groups.get(modifier.group_name)
+            if group is None:
+                raise PricingError(f"Модифікатор '{modifier.group_name}' недоступний для '{product.name}'")
+            price_add = group.options.get(modifier.option_name)
+            if price_add is None:
+                raise PricingError(f"Опція '{modifier.option_name}' недоступна в '{group.name}'")
+            selected = chosen.setdefault(group.name, set())
+            if modifier.option_name in selected:
+                raise PricingError(f"Опцію '{modifier.option_name}' обрано двічі")
+            if group.single and selected:
+                raise PricingError(f"У '{group.name}' можна обрати лише одну опцію")
+            selected.add(modifier.option_name)
+            # Assign only on change: pydantic __setattr__ dominates pricing time
+            if modifier.price_add != price_add:
+                modifier.price_add = price_add
+            surcharge += price_add
+
+        # The menu and POS carts don't offer modifier selection yet and send
+        # lines without modifiers; only a line that selects modifiers must
+        # cover every required group
+        if chosen:
+            for group in product.groups.values():
+                if group.required and group.name not in chosen:
+                    raise PricingError(f"Оберіть '{group.name}' для '{product.name}'")
+
+        price = round(product.price + surcharge, 2)
+        if item.price != price:
+            item.price = price
+        if item.name != product.name:
+            item.name = product.name
+        if item.is_combo or item.combo_items is not None:
+            item.is_combo = False
+            item.combo_items = None
+
+    def price_items(self, items: List[OrderItem]) -> float:
+        """Reprice a cart in place and return its subtotal"""
+        for item in items:
+            self.price_item(item)
+        return round(sum(item.price * item.qty for item in items), 2)
+
+
+def _benchmark(carts: int = 10000):
+    """Price synthetic carts against a menu-sized price book"""
+    import random
+    import time
+
+    groups = [
+        {"_id": "g1", "name": "Розмір", "type": "single", "required": True,
+         "options": [{"name": "S", "price_add": 0}, {"name": "M", "price_add": 10}, {"name": "L", "price_add": 20}]},
+        {"_id": "g2", "name": "Добавки", "type": "multiple",
+         "options": [{"name": f"Добавка {i}", "price_add": 5 + i} for i in range(6)]},
+    ]
+    products = [
+        {"_id": f"p{i}", "name": f"Страва {i}", "price": 50 + i % 90, "available": True,
+         "modifier_groups": ["g1", "g2"] if i % 3 == 0 else []}
+        for i in range(400)
+    ]
+    combos = [{"_id": f"c{i}", "name": f"Комбо {i}", "combo_price": 199, "available": True,
+               "items": [{"product_id": "p1", "product_name": "Страва 1", "qty": 1}]} for i in range(20)]
+
+    def cart():
+        items = []
+        for _ in range(random.randint(1, 8)):
+            if random.random() < 0.1:
+                items.append({"product_id": f"combo_c{random.randrange(20)}", "name": "?", "price": 1})
+                continue
+            n = random.randrange(400)
+            mods = []
+            if n % 3 == 0:
+                mods.append({"group_name": "Розмір", "option_name": random.choice("SML"), "price_add": 0})
+                mods += [{"group_name": "Добавки", "option_name": f"Добавка {j}", "price_add": 0}
+                         for j in random.sample(range(6), random.randint(0, 3))]
+            items.append({"product_id": f"p{n}", "name": "?", "price": 1,
+                          "qty": random.randint(1, 3), "modifiers": mods})
+        return [OrderItem(**i) for i in items]
+
+    start = time.perf_counter()
+    book = PriceBook(products, combos, groups)
+    compile_ms = (time.perf_counter() - start) * 1000
+
+    samples = [cart() for _ in range(carts)]
+    start = time.perf_counter()
+    for items in samples:
+        book.price_items(items)
+    elapsed = time.perf_counter() - start
+    print(f"compiled {len(products)} products/{len(combos)} combos in {compile_ms:.2f} ms; "
+          f"priced {carts} carts in {elapsed * 1000:.1f} ms ({elapsed / carts * 1e6:.1f} us/cart)")
+
+
+if __name__ == "__main__":
+    _benchmark()
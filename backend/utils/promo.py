@@ -1,11 +1,109 @@
+"""Promo code validation and redemption.
+
+Codes are validated against an in-memory table (PromoTable) instead of a
+find_one per checkout or keystroke; the table is dropped whenever a code
+changes, on every worker via CHANNEL_PROMO. Its usage counts may lag, so
+validation only pre-checks the limit: the authoritative check is the
+redemption itself, a conditional find_one_and_update that takes a use
+only while usage_count < usage_limit.
+"""
+import asyncio
+import logging
 from datetime import datetime
+from typing import Dict, Optional
+
+from pymongo import ReturnDocument
 
 from .. import database
+from ..config import CHANNEL_PROMO
+from ..redis_manager import redis_manager
 from ..utils.serializers import serialize_doc
 from ..utils.demo_data import DEMO_PROMO_CODES
 
+logger = logging.getLogger(__name__)
+
+
+def _has_uses_left(promo: dict) -> bool:
+    # usage_limit of None or 0 means unlimited
+    return not promo.get("usage_limit") or promo.get("usage_count", 0) < promo["usage_limit"]
+
+
+class PromoTable:
+    """In-memory table of promo codes by code, loaded on first use"""
+
+    def __init__(self):
+        self._codes: Optional[Dict[str, dict]] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        redis_manager.on_invalidation(CHANNEL_PROMO, self._on_invalidation)
+
+    async def _get_codes(self) -> Dict[str, dict]:
+        codes = self._codes
+        if codes is not None:
+            return codes
+        async with self._lock:
+            if self._codes is not None:
+                return self._codes
+            generation = self._generation
+            codes = {doc["code"]: doc async for doc in database.promo_codes.find()}
+            # A code changed while loading; use this result once but don't keep it
+            if generation == self._generation:
+                self._codes = codes
+            return codes
+
+    async def get(self, code: str) -> Optional[dict]:
+        return (await self._get_codes()).get(code.upper())
+
+    async def redeem(self, code: str) -> bool:
+        """Atomically take one use of an active code; False when none are left"""
+        generation = self._generation
+        promo = await database.promo_codes.find_one_and_update(
+            {
+                "code": code,
+                "is_active": True,
+                "$or": [
+                    {"usage_limit": {"$in": [None, 0]}},
+                    {"$expr": {"$lt": [{"$ifNull": ["$usage_count", 0]}, "$usage_limit"]}}
+                ]
+            },
+            {"$inc": {"usage_count": 1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if promo is None or not _has_uses_left(promo):
+            # Used up or deactivated: make every worker reject it at validation
+            await self.invalidate()
+        elif self._codes is not None and generation == self._generation:
+            self._codes[promo["code"]] = promo
+        return promo is not None
+
+    async def release(self, code: str):
+        """Give back a use taken by redeem() for an order that was not stored"""
+        await database.promo_codes.update_one(
+            {"code": code, "usage_count": {"$gt": 0}},
+            {"$inc": {"usage_count": -1}}
+        )
+        await self.invalidate()
+
+    def _drop(self):
+        self._generation += 1
+        self._codes = None
 
-def validate_promo_code(code: str, order_total: float):
+    async def invalidate(self):
+        """Drop the table here and on every other worker"""
+        self._drop()
+        try:
+            await redis_manager.publish(CHANNEL_PROMO, {"type": "promo_invalidated"})
+        except Exception as e:
+            logger.error("Failed to publish promo invalidation: %s", e)
+
+    async def _on_invalidation(self, data):
+        self._drop()
+
+
+promo_table = PromoTable()
+
+
+async def validate_promo_code(code: str, order_total: float):
     """Validate promo code and return discount info or error"""
     if not database.connected or database.promo_codes is None:
         for promo in DEMO_PROMO_CODES:
@@ -13,7 +111,7 @@ def validate_promo_code(code: str, order_total: float):
                 return {"valid": True, "promo": promo}
         return {"valid": False, "error": "Промокод не знайдено"}
 
-    promo = database.promo_codes.find_one({"code": code.upper()})
+    promo = await promo_table.get(code)
     if not promo:
         return {"valid": False, "error": "Промокод не знайдено"}
 
@@ -27,13 +125,31 @@ def validate_promo_code(code: str, order_total: float):
     if promo.get("valid_to") and now > promo["valid_to"]:
         return {"valid": False, "error": "Термін дії промокоду закінчився"}
 
-    if promo.get("usage_limit") and promo.get("usage_count", 0) >= promo["usage_limit"]:
+    if not _has_uses_left(promo):
         return {"valid": False, "error": "Ліміт використання вичерпано"}
 
     if order_total < promo.get("min_order_amount", 0):
         return {"valid": False, "error": f"Мінімальна сума замовлення: {promo['min_order_amount']} грн"}
 
-    return {"valid": True, "promo": serialize_doc(promo)}
+    # The table's documents are shared; hand out a copy
+    return {"valid": True, "promo": serialize_doc(dict(promo))}
+
+
+async def redeem_promo_code(code: str) -> bool:
+    """Take one use of a validated code; False if its usage limit was hit meanwhile"""
+    if not database.connected or database.promo_codes is None:
+        return True
+    return await promo_table.redeem(code)
+
+
+async def release_promo_code(code: str):
+    """Undo redeem_promo_code for an order that ended up not being created"""
+    if not database.connected or database.promo_codes is None:
+        return
+    try:
+        await promo_table.release(code)
+    except Exception as e:
+        logger.error("Failed to release promo code %s: %s", code, e)
 
 
 def calculate_discount(promo: dict, order_total: float) -> float:
@@ -0,0 +1,287 @@
+"""Incremental sales rollups.
+
+Every non-cancelled order contributes to hourly and daily buckets in the
+sales_rollups collection, one document per (granularity, bucket, dim, key):
+
+- "total": all orders (key "all")
+- "order_type", "payment_method", "branch": per order attribute
+- "product": per items.product_id (qty, revenue and order lines)
+
+create_order applies an order once; update_order_status reverses it when
+the order is cancelled and re-applies it if it is restored. Reports read
+O(days x products) bucket documents instead of unwinding orders.items.
+
+Buckets are (re)built from the orders collection with
+`python -m backend.migrations.rebuild_rollups`. Reports only switch to
+rollups after a full-history rebuild has completed once, so a fresh
+deployment keeps using the raw orders until history has been backfilled;
+rebuilding a date range later repairs those buckets but never marks the
+rollups ready on its own.
+"""
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from pymongo import ReplaceOne, UpdateOne
+
+from .. import database
+
+logger = logging.getLogger(__name__)
+
+GRANULARITY_HOUR = "hour"
+GRANULARITY_DAY = "day"
+_BUCKET_FORMATS = {GRANULARITY_HOUR: "%Y%m%d%H", GRANULARITY_DAY: "%Y%m%d"}
+
+DIM_TOTAL = "total"
+DIM_PRODUCT = "product"
+_ORDER_DIMS = (
+    ("order_type", "order_type"),
+    ("payment_method", "payment_method"),
+    ("branch", "branch_id"),
+)
+
+# Fields an order needs to compute its contributions
+ORDER_PROJECTION = {
+    "created_at": 1, "total": 1, "status": 1,
+    "order_type": 1, "payment_method": 1, "branch_id": 1,
+    "items.product_id": 1, "items.name": 1, "items.qty": 1, "items.price": 1,
+}
+
+READY_MARKER_ID = "rollups:backfill"
+READY_RECHECK_SECONDS = 60
+
+_ready = False
+_ready_checked_at = 0.0
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == GRANULARITY_HOUR:
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _created_at(order: dict) -> Optional[datetime]:
+    created = order.get("created_at")
+    if isinstance(created, str):
+        try:
+            created = datetime.fromisoformat(created.replace("Z", "+00:00")).replace(tzinfo=None)
+        except ValueError:
+            return None
+    return created if isinstance(created, datetime) else None
+
+
+def order_contributions(order: dict) -> dict:
+    """Bucket increments for one order: {rollup _id: bucket doc with "inc"}"""
+    created = _created_at(order)
+    if created is None:
+        return {}
+
+    total = order.get("total", 0) or 0
+    keys = [(DIM_TOTAL, "all")]
+    keys += [(dim, order.get(field)) for dim, field in _ORDER_DIMS if order.get(field)]
+
+    contributions = {}
+
+    def add(granularity, bucket, dim, key, inc, name=None):
+        rollup_id = f"{granularity}:{bucket.strftime(_BUCKET_FORMATS[granularity])}:{dim}:{key}"
+        doc = contributions.get(rollup_id)
+        if doc is None:
+            doc = contributions[rollup_id] = {
+                "granularity": granularity, "bucket": bucket, "dim": dim, "key": key, "inc": {}
+            }
+        if name:
+            doc["name"] = name
+        for field, value in inc.items():
+            doc["inc"][field] = doc["inc"].get(field, 0) + value
+
+    for granularity in _BUCKET_FORMATS:
+        bucket = bucket_start(created, granularity)
+        for dim, key in keys:
+            add(granularity, bucket, dim, str(key), {"orders": 1, "revenue": total})
+        for item in order.get("items", []):
+            qty = item.get("qty", 1) or 0
+            key = item.get("product_id") or f"name:{item.get('name', '')}"
+            add(granularity, bucket, DIM_PRODUCT, str(key), {
+                "orders": 1,
+                "qty": qty,
+                "revenue": qty * (item.get("price", 0) or 0),
+            }, name=item.get("name"))
+
+    return contributions
+
+
+async def apply_order(order: dict, sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) an order's contribution to the buckets"""
+    await apply_orders([order], sign)
+
+
+async def apply_orders(orders: list, sign: int = 1):
+    """apply_order for several orders in one bulk write"""
+    if not database.connected or database.sales_rollups is None:
+        return
+
+    contributions = {}
+    for order in orders:
+        for rollup_id, doc in order_contributions(order).items():
+            merged = contributions.get(rollup_id)
+            if merged is None:
+                contributions[rollup_id] = doc
+                continue
+            if doc.get("name"):
+                merged["name"] = doc["name"]
+            for field, value in doc["inc"].items():
+                merged["inc"][field] = merged["inc"].get(field, 0) + value
+
+    operations = []
+    for rollup_id, doc in contributions.items():
+        update = {
+            "$inc": {field: value * sign for field, value in doc["inc"].items()},
+            "$setOnInsert": {
+                "granularity": doc["granularity"], "bucket": doc["bucket"],
+                "dim": doc["dim"], "key": doc["key"],
+            },
+        }
+        if doc.get("name"):
+            update["$set"] = {"name": doc["name"]}
+        operations.append(UpdateOne({"_id": rollup_id}, update, upsert=True))
+
+    if not operations:
+        return
+    try:
+        await database.sales_rollups.bulk_write(operations, ordered=False)
+    except Exception as e:
+        logger.error("Failed to update sales rollups: %s", e)
+
+
+async def rebuild(start: datetime = None, end: datetime = None, batch_size: int = 1000) -> int:
+    """Recompute the buckets for [start, end) from the orders collection.
+
+    Buckets in the range are replaced, so run it while few orders are being
+    placed: an order that lands mid-rebuild may be counted twice or not at all.
+    Only a full rebuild (no start or end) marks the rollups as backfilled.
+    Returns the number of orders processed.
+    """
+    created_range = {}
+    if start:
+        created_range["$gte"] = bucket_start(start, GRANULARITY_DAY)
+    if end:
+        created_range["$lt"] = end
+    query = {"status": {"$ne": "cancelled"}}
+    if created_range:
+        query["created_at"] = created_range
+
+    buckets = {}
+    processed = 0
+    cursor = database.orders.find(query, ORDER_PROJECTION).batch_size(batch_size)
+    async for order in cursor:
+        processed += 1
+        for rollup_id, doc in order_contributions(order).items():
+            existing = buckets.get(rollup_id)
+            if existing is None:
+                buckets[rollup_id] = doc
+                continue
+            for field, value in doc["inc"].items():
+                existing["inc"][field] = existing["inc"].get(field, 0) + value
+
+    bucket_filter = {"bucket": created_range} if created_range else {}
+    await database.sales_rollups.delete_many(bucket_filter)
+
+    operations = []
+    for rollup_id, doc in buckets.items():
+        replacement = {k: v for k, v in doc.items() if k != "inc"}
+        replacement.update(doc["inc"])
+        operations.append(ReplaceOne({"_id": rollup_id}, replacement, upsert=True))
+        if len(operations) >= batch_size:
+            await database.sales_rollups.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        await database.sales_rollups.bulk_write(operations, ordered=False)
+
+    if start is None and end is None:
+        await database.counters.update_one(
+            {"_id": READY_MARKER_ID},
+            {"$set": {"completed_at": datetime.utcnow(), "orders": processed}},
+            upsert=True
+        )
+    return processed
+
+
+async def is_ready() -> bool:
+    """Whether history has been backfilled and reports may read the rollups"""
+    global _ready, _ready_checked_at
+    if _ready:
+        return True
+    if not database.connected or database.sales_rollups is None or database.counters is None:
+        return False
+    now = time.monotonic()
+    if now - _ready_checked_at < READY_RECHECK_SECONDS:
+        return False
+    _ready_checked_at = now
+    try:
+        _ready = await database.counters.find_one({"_id": READY_MARKER_ID}, {"_id": 1}) is not None
+    except Exception as e:
+        logger.error("Failed to check rollup backfill marker: %s", e)
+    return _ready
+
+
+def _bucket_match(dim: str, granularity: str, start: datetime, end: datetime) -> dict:
+    return {
+        "dim": dim,
+        "granularity": granularity,
+        "bucket": {"$gte": bucket_start(start, granularity), "$lte": end},
+    }
+
+
+async def product_totals(
+    start: datetime,
+    end: datetime,
+    product_ids: Optional[List[str]] = None,
+    limit: int = None
+) -> list:
+    """Per-product qty/revenue/order lines over the range, by revenue desc"""
+    match = _bucket_match(DIM_PRODUCT, GRANULARITY_DAY, start, end)
+    if product_ids is not None:
+        match["key"] = {"$in": product_ids}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": "$key",
+            "name": {"$last": "$name"},
+            "qty": {"$sum": "$qty"},
+            "revenue": {"$sum": "$revenue"},
+            "orders": {"$sum": "$orders"},
+        }},
+        {"$match": {"orders": {"$gt": 0}}},
+        {"$sort": {"revenue": -1}},
+    ]
+    if limit:
+        pipeline.append({"$limit": limit})
+    return await (await database.sales_rollups.aggregate(pipeline)).to_list()
+
+
+async def daily_totals(start: datetime, end: datetime, dim: str = DIM_TOTAL, key: str = None) -> list:
+    """Daily buckets of one dimension: [{"date": "YYYY-MM-DD", "key", "orders", "qty", "revenue"}]"""
+    match = _bucket_match(dim, GRANULARITY_DAY, start, end)
+    if key is not None:
+        match["key"] = key
+    docs = await database.sales_rollups.find(match).sort("bucket", 1).to_list()
+    return [{
+        "date": d["bucket"].strftime("%Y-%m-%d"),
+        "key": d["key"],
+        "orders": d.get("orders", 0),
+        "qty": d.get("qty", 0),
+        "revenue": d.get("revenue", 0),
+    } for d in docs]
+
+
+async def hourly_distribution(start: datetime, end: datetime) -> list:
+    """Orders and revenue by hour of day over the range"""
+    pipeline = [
+        {"$match": _bucket_match(DIM_TOTAL, GRANULARITY_HOUR, start, end)},
+        {"$group": {"_id": {"$hour": "$bucket"}, "orders": {"$sum": "$orders"}, "revenue": {"$sum": "$revenue"}}},
+        {"$match": {"orders": {"$gt": 0}}},
+        {"$sort": {"_id": 1}},
+    ]
+    results = await (await database.sales_rollups.aggregate(pipeline)).to_list()
+    return [{"hour": r["_id"], "orders": r["orders"], "revenue": r["revenue"]} for r in results]
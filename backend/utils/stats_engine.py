@@ -0,0 +1,185 @@
+"""Dashboard statistics computed in a single aggregation.
+
+All /api/stats panels (today, pending, period totals, top products, revenue
+by type, hourly and daily distribution) are separate branches of one
+$facet over the orders collection, so a dashboard refresh is one
+round-trip and no order documents are loaded into Python. Once the sales
+rollups have been backfilled, the period panels are read from the rollup
+buckets instead and the orders facet only covers today and open orders.
+"""
+from datetime import datetime
+from typing import List, Optional
+
+from .. import database
+from . import rollups
+
+PENDING_STATUSES = ["new", "preparing"]
+ORDER_TYPES = ["dine_in", "takeaway", "delivery"]
+TOP_PRODUCTS_LIMIT = 50
+
+
+def _revenue_if(condition: dict) -> dict:
+    return {"$sum": {"$cond": [condition, "$total", 0]}}
+
+
+def build_stats_pipeline(
+    today_start: datetime,
+    start_date: datetime,
+    end_date: datetime,
+    product_ids: Optional[List[str]] = None,
+    include_period: bool = True
+) -> list:
+    """One $facet pipeline producing the dashboard panels (today/pending only
+    when include_period is False)"""
+    period_match = {"$match": {
+        "created_at": {"$gte": start_date, "$lte": end_date},
+        "status": {"$ne": "cancelled"}
+    }}
+
+    top_products = [period_match, {"$unwind": "$items"}]
+    if product_ids is not None:
+        top_products.append({"$match": {"items.product_id": {"$in": product_ids}}})
+    top_products.extend([
+        {"$group": {
+            "_id": "$items.name",
+            "product_id": {"$first": "$items.product_id"},
+            "count": {"$sum": "$items.qty"},
+            "revenue": {"$sum": {"$multiply": ["$items.qty", "$items.price"]}}
+        }},
+        {"$sort": {"revenue": -1}},
+        {"$limit": TOP_PRODUCTS_LIMIT}
+    ])
+
+    facets = {
+        "today": [
+            {"$match": {"created_at": {"$gte": today_start}}},
+            {"$group": {
+                "_id": None,
+                "orders": {"$sum": 1},
+                "revenue": _revenue_if({"$ne": ["$status", "cancelled"]}),
+                "completed": {"$sum": {"$cond": [{"$eq": ["$status", "completed"]}, 1, 0]}}
+            }}
+        ],
+        "pending": [
+            {"$match": {"status": {"$in": PENDING_STATUSES}}},
+            {"$count": "count"}
+        ],
+    }
+    if include_period:
+        facets.update({
+            "period": [
+                period_match,
+                {"$group": {"_id": None, "orders": {"$sum": 1}, "revenue": {"$sum": "$total"}}}
+            ],
+            "by_type": [
+                period_match,
+                {"$group": {"_id": "$order_type", "revenue": {"$sum": "$total"}, "count": {"$sum": 1}}}
+            ],
+            "hourly": [
+                period_match,
+                {"$group": {"_id": {"$hour": "$created_at"}, "orders": {"$sum": 1}, "revenue": {"$sum": "$total"}}},
+                {"$sort": {"_id": 1}}
+            ],
+            "daily": [
+                period_match,
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "orders_count": {"$sum": 1},
+                    "revenue": {"$sum": "$total"}
+                }},
+                {"$sort": {"_id": 1}}
+            ],
+            "top_products": top_products,
+        })
+
+    lower = min(start_date, today_start) if include_period else today_start
+    return [
+        # Only orders in today/the period, plus open orders for the pending counter
+        {"$match": {"$or": [
+            {"created_at": {"$gte": lower}},
+            {"status": {"$in": PENDING_STATUSES}}
+        ]}},
+        {"$project": {
+            "created_at": 1, "status": 1, "total": 1, "order_type": 1,
+            "items.product_id": 1, "items.name": 1, "items.qty": 1, "items.price": 1
+        }},
+        {"$facet": facets}
+    ]
+
+
+async def _period_from_rollups(start_date: datetime, end_date: datetime, product_ids: Optional[List[str]]) -> dict:
+    """Period panels in the same shape as the $facet branches, read from rollups"""
+    daily_rows = await rollups.daily_totals(start_date, end_date)
+    type_rows = await rollups.daily_totals(start_date, end_date, dim="order_type")
+    products = await rollups.product_totals(start_date, end_date, product_ids, limit=TOP_PRODUCTS_LIMIT)
+
+    by_type = {}
+    for r in type_rows:
+        entry = by_type.setdefault(r["key"], {"_id": r["key"], "revenue": 0, "count": 0})
+        entry["revenue"] += r["revenue"]
+        entry["count"] += r["orders"]
+
+    return {
+        "period": [{
+            "orders": sum(r["orders"] for r in daily_rows),
+            "revenue": sum(r["revenue"] for r in daily_rows),
+        }],
+        "by_type": list(by_type.values()),
+        "hourly": [
+            {"_id": r["hour"], "orders": r["orders"], "revenue": r["revenue"]}
+            for r in await rollups.hourly_distribution(start_date, end_date)
+        ],
+        "daily": [
+            {"_id": r["date"], "orders_count": r["orders"], "revenue": r["revenue"]}
+            for r in daily_rows if r["orders"] > 0
+        ],
+        "top_products": [
+            {"_id": p["name"], "product_id": p["_id"], "count": p["qty"], "revenue": p["revenue"]}
+            for p in products
+        ],
+    }
+
+
+async def compute_stats(
+    today_start: datetime,
+    start_date: datetime,
+    end_date: datetime,
+    product_ids: Optional[List[str]] = None
+) -> dict:
+    """Run the stats pipeline and shape its facets into dashboard panels"""
+    use_rollups = await rollups.is_ready()
+    pipeline = build_stats_pipeline(
+        today_start, start_date, end_date, product_ids, include_period=not use_rollups
+    )
+    results = await (await database.orders.aggregate(pipeline)).to_list()
+    facets = results[0] if results else {}
+    if use_rollups:
+        facets.update(await _period_from_rollups(start_date, end_date, product_ids))
+
+    def first(name: str) -> dict:
+        rows = facets.get(name) or []
+        return rows[0] if rows else {}
+
+    today = first("today")
+    period = first("period")
+
+    revenue_by_type = {t: {"revenue": 0, "count": 0} for t in ORDER_TYPES}
+    for r in facets.get("by_type", []):
+        if r["_id"] in revenue_by_type:
+            revenue_by_type[r["_id"]] = {"revenue": r["revenue"], "count": r["count"]}
+
+    return {
+        "today_orders": today.get("orders", 0),
+        "today_revenue": today.get("revenue", 0),
+        "pending_orders": first("pending").get("count", 0),
+        "completed_orders": today.get("completed", 0),
+        "period_orders": period.get("orders", 0),
+        "period_revenue": period.get("revenue", 0),
+        "top_products": facets.get("top_products", []),
+        "daily": {r["_id"]: r for r in facets.get("daily", [])},
+        "revenue_by_type": revenue_by_type,
+        "hourly_distribution": [
+            {"hour": r["_id"], "orders": r["orders"], "revenue": r["revenue"]}
+            for r in facets.get("hourly", [])
+        ],
+    }
@@ -3,7 +3,8 @@ Zone geometry and detection utilities.
 
 This module handles:
 1. Converting circular zones to GeoJSON polygons for MongoDB storage
-2. Detecting which zone a coordinate falls within using geospatial queries
+2. Detecting which zone a coordinate falls within, using an in-memory
+   index over the enabled zones (bounding-box prefilter + point-in-polygon)
 
 CRITICAL: Coordinate order matters!
 - GeoJSON uses [longitude, latitude] (lng first)
@@ -11,9 +12,16 @@ CRITICAL: Coordinate order matters!
 Always convert explicitly when crossing boundaries.
 """
 
+import asyncio
+import logging
 import math
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
+
 from .. import database
+from ..config import CHANNEL_ZONES
+from ..redis_manager import redis_manager
+
+logger = logging.getLogger(__name__)
 
 
 def circle_to_polygon(
@@ -67,13 +75,138 @@ def circle_to_polygon(
     return [coords]
 
 
-def detect_zone(lat: float, lng: float) -> Optional[dict]:
+def _point_in_ring(lng: float, lat: float, ring: List[Tuple[float, float]]) -> bool:
+    """Ray casting test against one closed ring of (lng, lat) vertices"""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i]
+        xj, yj = ring[j]
+        if (yi > lat) != (yj > lat) and lng < (xj - xi) * (lat - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def _geometry_polygons(geometry: dict) -> List[List[List[Tuple[float, float]]]]:
+    """GeoJSON Polygon/MultiPolygon as a list of polygons, each a list of rings.
+
+    Polygons without an outer ring are left out; malformed coordinates raise
+    TypeError/ValueError/IndexError.
+    """
+    if not isinstance(geometry, dict):
+        return []
+    if geometry.get("type") == "Polygon":
+        polygons = [geometry.get("coordinates") or []]
+    elif geometry.get("type") == "MultiPolygon":
+        polygons = geometry.get("coordinates") or []
+    else:
+        return []
+    return [
+        [[(float(c[0]), float(c[1])) for c in ring] for ring in polygon if ring]
+        for polygon in polygons if polygon and polygon[0]
+    ]
+
+
+class _IndexedZone:
+    __slots__ = ("zone", "polygons", "min_lng", "min_lat", "max_lng", "max_lat")
+
+    def __init__(self, zone: dict, polygons: list):
+        self.zone = zone
+        self.polygons = polygons
+        outer = [c for polygon in polygons for c in polygon[0]]
+        self.min_lng = min(c[0] for c in outer)
+        self.max_lng = max(c[0] for c in outer)
+        self.min_lat = min(c[1] for c in outer)
+        self.max_lat = max(c[1] for c in outer)
+
+    def contains(self, lat: float, lng: float) -> bool:
+        if not (self.min_lng <= lng <= self.max_lng and self.min_lat <= lat <= self.max_lat):
+            return False
+        for outer, *holes in self.polygons:
+            if _point_in_ring(lng, lat, outer) and not any(_point_in_ring(lng, lat, h) for h in holes):
+                return True
+        return False
+
+
+class ZoneIndex:
+    """In-memory spatial index over the enabled delivery zones.
+
+    Zones are kept sorted by priority (lowest number first), so the first
+    zone containing a point is the one that wins. The index is loaded on
+    first use and dropped whenever a zone changes (on every worker, via
+    CHANNEL_ZONES).
+    """
+
+    def __init__(self):
+        self._zones: Optional[List[_IndexedZone]] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+        redis_manager.on_invalidation(CHANNEL_ZONES, self._on_invalidation)
+
+    async def _get_zones(self) -> List[_IndexedZone]:
+        zones = self._zones
+        if zones is not None:
+            return zones
+        async with self._lock:
+            if self._zones is not None:
+                return self._zones
+            generation = self._generation
+            docs = await database.delivery_zones.find({"enabled": True}).sort("priority", 1).to_list()
+            zones = []
+            for doc in docs:
+                try:
+                    polygons = _geometry_polygons(doc.get("geometry"))
+                except (TypeError, ValueError, IndexError) as e:
+                    logger.warning("Skipping zone %s with malformed geometry: %s", doc.get("_id"), e)
+                    continue
+                if not polygons:
+                    logger.warning("Skipping zone %s without polygon coordinates", doc.get("_id"))
+                    continue
+                zones.append(_IndexedZone(doc, polygons))
+            # A zone changed while loading; use this result once but don't keep it
+            if generation == self._generation:
+                self._zones = zones
+            return zones
+
+    def _match(self, zones: List[_IndexedZone], lat: float, lng: float) -> Optional[dict]:
+        for indexed in zones:
+            if indexed.contains(lat, lng):
+                return indexed.zone
+        return None
+
+    async def detect(self, lat: float, lng: float) -> Optional[dict]:
+        return self._match(await self._get_zones(), lat, lng)
+
+    async def detect_many(self, points: Iterable[Tuple[float, float]]) -> List[Optional[dict]]:
+        zones = await self._get_zones()
+        return [self._match(zones, lat, lng) for lat, lng in points]
+
+    def _drop(self):
+        self._generation += 1
+        self._zones = None
+
+    async def invalidate(self):
+        """Drop the index here and on every other worker"""
+        self._drop()
+        try:
+            await redis_manager.publish(CHANNEL_ZONES, {"type": "zones_invalidated"})
+        except Exception as e:
+            logger.error("Failed to publish zone invalidation: %s", e)
+
+    async def _on_invalidation(self, data):
+        self._drop()
+
+
+zone_index = ZoneIndex()
+
+
+async def detect_zone(lat: float, lng: float) -> Optional[dict]:
     """
     Find the delivery zone containing the given coordinates.
 
-    Uses MongoDB $geoIntersects query to find all enabled zones
-    containing the point, then returns the highest priority zone
-    (lowest priority number).
+    Served from the in-memory zone index: a bounding-box check followed by
+    a point-in-polygon test over the enabled zones, in priority order.
 
     Args:
         lat: Latitude of the point to check
@@ -87,35 +220,32 @@ def detect_zone(lat: float, lng: float) -> Optional[dict]:
         the zone with the lowest priority number wins (priority 1 beats 2).
 
     Note:
-        Coordinate order: Input is (lat, lng) but internally converted
-        to GeoJSON [lng, lat] for the query.
+        Coordinate order: Input is (lat, lng); zone geometry is stored in
+        GeoJSON [lng, lat] order.
     """
     if not database.connected or database.delivery_zones is None:
         return None
 
-    # GeoJSON Point: coordinates are [lng, lat]
-    point = {
-        "type": "Point",
-        "coordinates": [lng, lat]  # GeoJSON order: [lng, lat]
-    }
-
-    # Find all enabled zones containing this point, sorted by priority
-    # Lower priority number = higher precedence
     try:
-        zones = list(database.delivery_zones.find({
-            "enabled": True,
-            "geometry": {
-                "$geoIntersects": {
-                    "$geometry": point
-                }
-            }
-        }).sort("priority", 1).limit(1))
-
-        return zones[0] if zones else None
-    except Exception:
+        return await zone_index.detect(lat, lng)
+    except Exception as e:
+        logger.error("Zone detection failed: %s", e)
         return None
 
 
+async def detect_many(points: Iterable[Tuple[float, float]]) -> List[Optional[dict]]:
+    """Bulk detect_zone for a list of (lat, lng) points (e.g. route planning)"""
+    points = list(points)
+    if not database.connected or database.delivery_zones is None:
+        return [None] * len(points)
+
+    try:
+        return await zone_index.detect_many(points)
+    except Exception as e:
+        logger.error("Bulk zone detection failed: %s", e)
+        return [None] * len(points)
+
+
 def calculate_polygon_centroid(geometry: dict) -> dict:
     """
     Calculate centroid of a GeoJSON Polygon.
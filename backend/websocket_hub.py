@@ -0,0 +1,289 @@
+"""Process-wide WebSocket fan-out hub.
+
+A single reader per worker tails the order event stream and fans each
+event out to the sockets subscribed to its topics through a bounded
+per-client queue. Clients that cannot keep up (queue full) are evicted
+instead of backing up the listener.
+
+Topics:
+- "kitchen": every event (admin orders board, POS)
+- "order:<order_id>": events for a single order (customer tracking page)
+
+A reconnecting client passes the seq of the last order event it applied
+and is first replayed what it missed from the order feed (see order_feed).
+"""
+import asyncio
+import json
+import logging
+from typing import Iterable, Optional
+
+from fastapi import WebSocket
+
+from .config import WS_CLIENT_QUEUE_SIZE
+from .redis_manager import redis_manager, event_bus, STREAM_ORDERS
+from . import order_feed
+from .order_feed import parse_seq
+
+logger = logging.getLogger(__name__)
+
+# Close code sent to evicted slow consumers ("Try Again Later")
+WS_CLOSE_SLOW_CONSUMER = 1013
+
+TOPIC_KITCHEN = "kitchen"
+_TOPIC_PREFIX_ORDER = "order:"
+
+
+def order_topic(order_id: str) -> str:
+    return f"order:{order_id}"
+
+
+def is_valid_topic(topic: str) -> bool:
+    """Only the kitchen firehose and non-empty order topics are allowed"""
+    if topic == TOPIC_KITCHEN:
+        return True
+    return topic.startswith(_TOPIC_PREFIX_ORDER) and len(topic) > len(_TOPIC_PREFIX_ORDER)
+
+
+def event_topics(event: dict) -> set:
+    """Topics an order event is routed to (the kitchen always gets everything)"""
+    topics = {TOPIC_KITCHEN}
+    order = event.get("order") or {}
+    order_id = event.get("order_id") or order.get("_id")
+    if order_id:
+        topics.add(order_topic(str(order_id)))
+    return topics
+
+
+def event_messages(text: str) -> list:
+    """(message, topics) pairs to deliver for a raw event message.
+
+    A "new_orders" batch goes to the kitchen as is; every order in it also
+    goes to its own order topic as a "new_order" event with the batch's
+    seq, so those subscribers never see other orders.
+    """
+    try:
+        event = json.loads(text)
+    except (TypeError, ValueError):
+        return [(text, {TOPIC_KITCHEN})]
+    if not isinstance(event, dict):
+        return [(text, {TOPIC_KITCHEN})]
+    if event.get("type") != "new_orders":
+        return [(text, event_topics(event))]
+    messages = [(text, {TOPIC_KITCHEN})]
+    for order in event.get("orders") or []:
+        single = {"type": "new_order", "order": order}
+        topics = event_topics(single) - {TOPIC_KITCHEN}
+        if topics:
+            if "seq" in event:
+                single["seq"] = event["seq"]
+            messages.append((json.dumps(single, default=str), topics))
+    return messages
+
+
+def _message_seq(text: str):
+    """Feed position of an event message, None for unsequenced messages"""
+    try:
+        event = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    return parse_seq(event["seq"]) if isinstance(event, dict) and "seq" in event else None
+
+
+class WebSocketClient:
+    """A connected socket with its own bounded send queue and sender task."""
+
+    def __init__(self, websocket: WebSocket, queue_size: int = WS_CLIENT_QUEUE_SIZE):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender_task: Optional[asyncio.Task] = None
+        self.topics: set = set()
+        self.closed = False
+        self.held: Optional[list] = None  # live messages parked during a replay
+
+    def send(self, text: str) -> bool:
+        """Queue a message for delivery. Returns False if the queue is full."""
+        if self.closed:
+            return False
+        if self.held is not None:
+            if len(self.held) >= self.queue.maxsize:
+                return False
+            self.held.append(text)
+            return True
+        try:
+            self.queue.put_nowait(text)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def hold(self):
+        """Park live messages until release(), so a replay can go out first"""
+        self.held = []
+
+    def release(self, replayed: Iterable[str] = ()) -> bool:
+        """Queue the replayed messages, then the parked live ones that the
+        replay did not already cover. Returns False if the queue overflowed."""
+        held, self.held = self.held or [], None
+        last = None
+        for text in replayed:
+            last = _message_seq(text) or last
+            if not self.send(text):
+                return False
+        for text in held:
+            seq = _message_seq(text)
+            if last is not None and seq is not None and seq <= last:
+                continue
+            if not self.send(text):
+                return False
+        return True
+
+    async def _sender(self):
+        try:
+            while True:
+                text = await self.queue.get()
+                await self.websocket.send_text(text)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug("WebSocket send failed, dropping client: %s", e)
+            self.closed = True
+
+
+class WebSocketHub:
+    """Fans order stream events out to topic-subscribed WebSocket clients."""
+
+    def __init__(self):
+        self.clients: set = set()
+        self.subscribers: dict = {}  # topic -> set of WebSocketClient
+        self._listener_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the shared Redis listener task"""
+        if self._listener_task is None:
+            self._listener_task = asyncio.create_task(self._listen())
+            logger.info("WebSocket hub started")
+
+    async def stop(self):
+        """Stop the listener and drop all clients"""
+        if self._listener_task:
+            self._listener_task.cancel()
+            try:
+                await self._listener_task
+            except asyncio.CancelledError:
+                pass
+            self._listener_task = None
+        for client in list(self.clients):
+            await self.unregister(client)
+
+    def register(self, websocket: WebSocket, topics: Iterable[str] = (TOPIC_KITCHEN,), hold: bool = False) -> WebSocketClient:
+        """Register an accepted socket, subscribe it to topics and start its sender task.
+
+        With hold=True live messages are parked until client.release().
+        """
+        client = WebSocketClient(websocket)
+        if hold:
+            client.hold()
+        client.sender_task = asyncio.create_task(client._sender())
+        self.clients.add(client)
+        self.subscribe(client, topics)
+        return client
+
+    def subscribe(self, client: WebSocketClient, topics: Iterable[str]):
+        for topic in topics:
+            if not is_valid_topic(topic):
+                continue
+            client.topics.add(topic)
+            self.subscribers.setdefault(topic, set()).add(client)
+
+    def unsubscribe(self, client: WebSocketClient, topics: Iterable[str]):
+        for topic in list(topics):
+            client.topics.discard(topic)
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+    async def unregister(self, client: WebSocketClient):
+        """Remove a client and stop its sender task"""
+        self.clients.discard(client)
+        self.unsubscribe(client, client.topics)
+        client.closed = True
+        if client.sender_task:
+            client.sender_task.cancel()
+            try:
+                await client.sender_task
+            except asyncio.CancelledError:
+                pass
+            client.sender_task = None
+
+    def broadcast(self, text: str, topics: Iterable[str] = (TOPIC_KITCHEN,), skip: set = None) -> set:
+        """Queue a message for every client subscribed to any of the topics
+        (except those in `skip`), evicting slow consumers. Returns the recipients."""
+        recipients = set()
+        for topic in topics:
+            recipients |= self.subscribers.get(topic, set())
+        if skip:
+            recipients -= skip
+        for client in recipients:
+            if client.closed or not client.send(text):
+                asyncio.create_task(self._evict(client))
+        return recipients
+
+    def dispatch(self, data: str):
+        """Route a raw event message to the topics of the event(s) it carries"""
+        sent = set()
+        for text, topics in event_messages(data):
+            sent |= self.broadcast(text, topics, skip=sent)
+
+    async def replay(self, client: WebSocketClient, since: str):
+        """Send a held client the feed events it missed after `since` (or a
+        resync notice), then its parked live messages"""
+        events = await order_feed.events_since(since)
+        if events is None:
+            messages = [json.dumps({"type": "resync", "seq": await order_feed.latest_seq()})]
+        else:
+            messages = []
+            for event in events:
+                # At most one message per event: kitchen subscribers get the batch
+                for text, topics in event_messages(event):
+                    if topics & client.topics:
+                        messages.append(text)
+                        break
+        if not client.release(messages):
+            await self._evict(client)
+
+    async def _evict(self, client: WebSocketClient):
+        if client not in self.clients:
+            return
+        logger.warning("Evicting slow WebSocket consumer")
+        await self.unregister(client)
+        try:
+            await client.websocket.close(code=WS_CLOSE_SLOW_CONSUMER)
+        except Exception:
+            pass
+
+    async def _listen(self):
+        """Tail the order event stream once per process.
+
+        The last entry ID is kept across errors, so events written while
+        Redis was unreachable are delivered once it is back.
+        """
+        last_id = None
+        while True:
+            try:
+                if redis_manager.redis is None:
+                    await asyncio.sleep(5)
+                    continue
+                if last_id is None:
+                    last_id = await event_bus.latest_id(STREAM_ORDERS)
+                for entry_id, event in await event_bus.read(STREAM_ORDERS, last_id):
+                    last_id = entry_id
+                    self.dispatch(order_feed.with_seq(event, entry_id))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("WebSocket hub listener error: %s", e)
+                await asyncio.sleep(1)
+
+
+websocket_hub = WebSocketHub()
@@ -5,6 +5,7 @@ function menuApp() {
         selectedCategory: null,
         searchQuery: '',
         cart: [],
+        checkoutAttempt: null,  // {body, key} of the order being submitted
         showCart: false,
         orderSuccess: false,
         orderNumber: '',
@@ -737,12 +738,23 @@ function menuApp() {
                     orderData.promo_code = this.promoCode;
                 }
 
+                // Double taps and retries of the same order reuse its key, so
+                // the server creates it once and replays the response
+                const body = JSON.stringify(orderData);
+                if (!this.checkoutAttempt || this.checkoutAttempt.body !== body) {
+                    this.checkoutAttempt = { body, key: this._newIdempotencyKey() };
+                }
+
                 const response = await fetch('/api/orders', {
                     method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
-                    body: JSON.stringify(orderData)
+                    headers: {
+                        'Content-Type': 'application/json',
+                        'Idempotency-Key': this.checkoutAttempt.key
+                    },
+                    body
                 });
 
+                if (response.status !== 409) this.checkoutAttempt = null;
                 if (response.ok) {
                     const order = await response.json();
                     this.cart = [];
@@ -776,6 +788,11 @@ function menuApp() {
 
         // ==================== Utilities ====================
 
+        _newIdempotencyKey() {
+            if (window.crypto && crypto.randomUUID) return crypto.randomUUID();
+            return Date.now().toString(36) + '-' + Math.random().toString(36).slice(2);
+        },
+
         _adjustColor(hex, amount) {
             const r = Math.max(0, Math.min(255, parseInt(hex.slice(1, 3), 16) + amount));
             const g = Math.max(0, Math.min(255, parseInt(hex.slice(3, 5), 16) + amount));
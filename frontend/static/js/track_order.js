@@ -11,18 +11,11 @@ function trackOrderApp(orderId) {
         callingWaiter: false,
         showToast: false,
         toastMessage: '',
-        pollingInterval: null,
+        reconnecting: false,
 
         async init() {
             await this.loadOrder();
             this.connectWebSocket();
-
-            // Fallback polling if WebSocket fails
-            this.pollingInterval = setInterval(() => {
-                if (!this.wsConnected) {
-                    this.loadOrder();
-                }
-            }, 10000); // Poll every 10 seconds
         },
 
         async loadOrder() {
@@ -50,11 +43,18 @@ function trackOrderApp(orderId) {
 
         connectWebSocket() {
             const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-            this.ws = new WebSocket(`${protocol}//${window.location.host}/ws`);
+            // Subscribe to this order's events only
+            this.ws = new WebSocket(`${protocol}//${window.location.host}/ws?order_id=${encodeURIComponent(this.orderId)}`);
 
             this.ws.onopen = () => {
                 console.log('WebSocket connected');
                 this.wsConnected = true;
+
+                // Catch up on anything missed while disconnected
+                if (this.reconnecting) {
+                    this.reconnecting = false;
+                    this.loadOrder();
+                }
             };
 
             this.ws.onmessage = (event) => {
@@ -62,7 +62,7 @@ function trackOrderApp(orderId) {
                     const data = JSON.parse(event.data);
 
                     // Filter messages for this order
-                    if (data.type === 'order_updated' && data.order_id === this.orderId) {
+                    if (data.type === 'order_updated' && data.order_id === this.orderId && data.status) {
                         console.log('Order status updated:', data.status);
                         this.order.status = data.status;
 
@@ -87,6 +87,7 @@ function trackOrderApp(orderId) {
             this.ws.onclose = () => {
                 console.log('WebSocket disconnected');
                 this.wsConnected = false;
+                this.reconnecting = true;
                 // Reconnect after 3 seconds
                 setTimeout(() => this.connectWebSocket(), 3000);
             };
@@ -144,9 +145,6 @@ function trackOrderApp(orderId) {
             if (this.ws) {
                 this.ws.close();
             }
-            if (this.pollingInterval) {
-                clearInterval(this.pollingInterval);
-            }
         }
     };
 }
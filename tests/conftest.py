@@ -0,0 +1,8 @@
+import os
+import sys
+
+# backend.config requires these; the tests never connect to either
+os.environ.setdefault("MONGODB_URL", "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=300")
+os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:1")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,121 @@
+"""In-memory stand-in for the redis.asyncio commands the job queue and the
+Telegram notifier use (lists, strings, hashes, sorted sets, pipelines)"""
+import asyncio
+import time
+
+
+def _slice(items, start, end):
+    end = len(items) + end if end < 0 else end
+    return items[start:end + 1]
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return record
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    # strings
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+    # lists
+    async def lpush(self, key, *values):
+        items = self.data.setdefault(key, [])
+        for value in values:
+            items.insert(0, value)
+        return len(items)
+
+    async def rpush(self, key, *values):
+        items = self.data.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    async def lrange(self, key, start, end):
+        return list(_slice(self.data.get(key, []), start, end))
+
+    async def ltrim(self, key, start, end):
+        self.data[key] = list(_slice(self.data.get(key, []), start, end))
+        return True
+
+    async def lrem(self, key, count, value):
+        items = self.data.get(key, [])
+        removed = 0
+        while value in items and (count == 0 or removed < count):
+            items.remove(value)
+            removed += 1
+        return removed
+
+    async def lmove(self, src, dst, src_side="RIGHT", dst_side="LEFT"):
+        items = self.data.get(src)
+        if not items:
+            return None
+        value = items.pop() if src_side == "RIGHT" else items.pop(0)
+        target = self.data.setdefault(dst, [])
+        target.insert(0, value) if dst_side == "LEFT" else target.append(value)
+        return value
+
+    async def blmove(self, src, dst, timeout, src_side="RIGHT", dst_side="LEFT"):
+        deadline = time.monotonic() + timeout
+        while True:
+            value = await self.lmove(src, dst, src_side, dst_side)
+            if value is not None or time.monotonic() >= deadline:
+                return value
+            await asyncio.sleep(0.005)
+
+    # hashes
+    async def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = value
+        return 1
+
+    async def hgetall(self, key):
+        return dict(self.data.get(key, {}))
+
+    async def hdel(self, key, field):
+        return int(self.data.get(key, {}).pop(field, None) is not None)
+
+    # sorted sets
+    async def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    async def zrangebyscore(self, key, low, high, start=0, num=None):
+        members = sorted((s, m) for m, s in self.data.get(key, {}).items() if low <= s <= high)
+        members = [m for _, m in members][start:]
+        return members[:num] if num is not None else members
+
+    async def zrem(self, key, member):
+        return int(self.data.get(key, {}).pop(member, None) is not None)
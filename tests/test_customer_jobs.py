@@ -0,0 +1,76 @@
+"""Customer records from order jobs against an in-memory customers collection"""
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from backend import database, jobs
+
+
+class FakeCustomers:
+    """bulk_write of UpdateOne with the filters and updates the jobs use;
+    phone is unique, so a second upsert insert fails with 11000"""
+
+    def __init__(self, docs=()):
+        self.docs = [dict(d) for d in docs]
+
+    def _match(self, doc, query):
+        history = doc.get("order_history", [])
+        return doc["phone"] == query["phone"] and not set(query["order_history"]["$nin"]) & set(history)
+
+    def _apply(self, doc, update, inserted):
+        if inserted:
+            doc.update(update.get("$setOnInsert", {}))
+        doc.update(update.get("$set", {}))
+        push = update["$push"]["order_history"]
+        doc["order_history"] = (doc.get("order_history", []) + push["$each"])[push["$slice"]:]
+
+    async def bulk_write(self, operations, ordered=True):
+        errors = []
+        for index, op in enumerate(operations):
+            query, update, upsert = op._filter, op._doc, op._upsert
+            doc = next((d for d in self.docs if self._match(d, query)), None)
+            if doc is not None:
+                self._apply(doc, update, inserted=False)
+            elif upsert:
+                if any(d["phone"] == query["phone"] for d in self.docs):
+                    errors.append({"index": index, "code": 11000, "errmsg": "duplicate key"})
+                    continue
+                doc = {"phone": query["phone"]}
+                self._apply(doc, update, inserted=True)
+                self.docs.append(doc)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    def get(self, phone):
+        return next(d for d in self.docs if d["phone"] == phone)
+
+
+@pytest.fixture
+def customers(monkeypatch):
+    fake = FakeCustomers([{"phone": "0501112233", "name": "Оля", "order_history": ["a"]}])
+    monkeypatch.setattr(database, "connected", True)
+    monkeypatch.setattr(database, "customers", fake)
+    return fake
+
+
+def test_batch_records_new_orders_when_some_are_already_recorded(customers):
+    payload = {"orders": [
+        {"customer_phone": "050 111-22-33", "customer_name": "Оля", "order_id": "a"},
+        {"customer_phone": "0501112233", "customer_name": "", "order_id": "b"},
+        {"customer_phone": "(050)1112233", "customer_name": "Ольга", "order_id": "c"},
+        {"customer_phone": "0679998877", "customer_name": "Петро", "order_id": "d"},
+        {"customer_phone": "0679998877", "customer_name": "", "order_id": "e"},
+    ]}
+    asyncio.run(jobs.record_customer_orders(payload))
+
+    assert customers.get("0501112233")["order_history"] == ["a", "b", "c"]
+    assert customers.get("0501112233")["name"] == "Ольга"
+    assert sorted(customers.get("0679998877")["order_history"]) == ["d", "e"]
+    assert customers.get("0679998877")["name"] == "Петро"
+
+    # A retried job changes nothing
+    asyncio.run(jobs.record_customer_orders(payload))
+    assert customers.get("0501112233")["order_history"] == ["a", "b", "c"]
+    assert sorted(customers.get("0679998877")["order_history"]) == ["d", "e"]
+    assert len(customers.docs) == 2
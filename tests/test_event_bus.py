@@ -0,0 +1,159 @@
+"""EventBus consumer groups against an in-memory Redis Streams stand-in"""
+import asyncio
+import time
+
+from redis.exceptions import ResponseError
+
+from backend.redis_manager import EventBus
+
+STREAM = "orders:feed"
+GROUP = "printers"
+
+
+class FakeStreams:
+    """The stream and consumer group commands EventBus uses"""
+
+    def __init__(self):
+        self.entries = {}  # stream -> [(id, fields)]
+        self.groups = {}   # (stream, group) -> {"last": id, "pending": {id: entry state}}
+        self.seq = 0
+
+    async def xadd(self, stream, fields, maxlen=None, approximate=True):
+        self.seq += 1
+        entry_id = f"{self.seq}-0"
+        self.entries.setdefault(stream, []).append((entry_id, fields))
+        return entry_id
+
+    async def xgroup_create(self, stream, group, id="$", mkstream=False):
+        if (stream, group) in self.groups:
+            raise ResponseError("BUSYGROUP Consumer Group name already exists")
+        entries = self.entries.setdefault(stream, [])
+        last = entries[-1][0] if id == "$" and entries else "0-0"
+        self.groups[(stream, group)] = {"last": last, "pending": {}}
+
+    def _deliver(self, stream, group, consumer, entry_id):
+        pending = self.groups[(stream, group)]["pending"]
+        state = pending.setdefault(entry_id, {"times_delivered": 0})
+        state.update(consumer=consumer, delivered_at=time.monotonic())
+        state["times_delivered"] += 1
+        return entry_id, dict(self.entries[stream])[entry_id]
+
+    async def xautoclaim(self, stream, group, consumer, min_idle_time, count=100):
+        now = time.monotonic()
+        pending = self.groups[(stream, group)]["pending"]
+        idle = [i for i, s in pending.items() if (now - s["delivered_at"]) * 1000 >= min_idle_time]
+        claimed = [self._deliver(stream, group, consumer, i) for i in sorted(idle, key=_key)[:count]]
+        return ["0-0", claimed, []]
+
+    async def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        (stream, _), = streams.items()
+        state = self.groups[(stream, group)]
+        new = [i for i, _ in self.entries[stream] if _key(i) > _key(state["last"])][:count]
+        if not new:
+            await asyncio.sleep((block or 0) / 1000)
+            return []
+        state["last"] = new[-1]
+        return [[stream, [self._deliver(stream, group, consumer, i) for i in new]]]
+
+    async def xpending_range(self, stream, group, min, max, count):
+        state = self.groups[(stream, group)]["pending"].get(min)
+        return [{"message_id": min, **state}] if state else []
+
+    async def xack(self, stream, group, *ids):
+        pending = self.groups[(stream, group)]["pending"]
+        return sum(pending.pop(i, None) is not None for i in ids)
+
+
+def _key(entry_id):
+    ms, _, n = entry_id.partition("-")
+    return int(ms), int(n)
+
+
+class FakeManager:
+    def __init__(self):
+        self.redis = FakeStreams()
+
+
+async def _until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def _stop(*tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_group_delivers_each_event_to_one_consumer_and_acks():
+    async def run():
+        bus = EventBus(FakeManager())
+        await bus.ensure_group(STREAM, GROUP)
+        await bus.ensure_group(STREAM, GROUP)  # BUSYGROUP is not an error
+        handled = []
+
+        async def handler(event):
+            handled.append(event["n"])
+
+        consumers = [
+            asyncio.create_task(bus.consume(STREAM, GROUP, f"c{n}", handler, block=10))
+            for n in range(2)
+        ]
+        for n in range(50):
+            await bus.publish(STREAM, {"n": n})
+        await _until(lambda: len(handled) >= 50)
+        await asyncio.sleep(0.05)
+        await _stop(*consumers)
+        return handled, bus.manager.redis.groups[(STREAM, GROUP)]["pending"]
+
+    handled, pending = asyncio.run(run())
+    assert sorted(handled) == list(range(50))
+    assert pending == {}
+
+
+def test_failing_event_is_retried_then_dropped_after_max_deliveries():
+    async def run():
+        bus = EventBus(FakeManager())
+        await bus.ensure_group(STREAM, GROUP)
+        attempts = []
+
+        async def handler(event):
+            attempts.append(event["n"])
+            raise RuntimeError("printer offline")
+
+        consumer = asyncio.create_task(
+            bus.consume(STREAM, GROUP, "c0", handler, max_deliveries=3, claim_idle_ms=0, block=10)
+        )
+        await bus.publish(STREAM, {"n": 1})
+        await _until(lambda: not bus.manager.redis.groups[(STREAM, GROUP)]["pending"] and attempts)
+        await asyncio.sleep(0.05)
+        await _stop(consumer)
+        return attempts
+
+    assert asyncio.run(run()) == [1, 1, 1]
+
+
+def test_entries_of_a_dead_consumer_are_reclaimed():
+    async def run():
+        bus = EventBus(FakeManager())
+        await bus.ensure_group(STREAM, GROUP)
+        await bus.publish(STREAM, {"n": 1})
+        # "dead" read the entry and never acked it
+        await bus.manager.redis.xreadgroup(GROUP, "dead", {STREAM: ">"}, count=10)
+        handled = []
+
+        async def handler(event):
+            handled.append(event["n"])
+
+        consumer = asyncio.create_task(
+            bus.consume(STREAM, GROUP, "alive", handler, claim_idle_ms=20, block=10)
+        )
+        await _until(lambda: handled)
+        await _stop(consumer)
+        return handled, bus.manager.redis.groups[(STREAM, GROUP)]["pending"]
+
+    handled, pending = asyncio.run(run())
+    assert handled == [1]
+    assert pending == {}
@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+
+from backend.utils.geocoding import Geocoder, GeocodingError, GeocodingProvider, normalize_address
+
+
+class FakeProvider(GeocodingProvider):
+    def __init__(self, result=(48.92, 24.71), error=None):
+        self.result = result
+        self.error = error
+        self.calls = []
+
+    async def geocode(self, address, locality):
+        self.calls.append(address)
+        await asyncio.sleep(0.01)
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_normalize_expands_abbreviations():
+    assert normalize_address("вул. Незалежності, 36") == "вулиця незалежності 36"
+    assert normalize_address("Вулиця  незалежності 36") == "вулиця незалежності 36"
+    assert normalize_address("просп. Миру 5") == normalize_address("пр-т Миру, 5") == "проспект миру 5"
+    assert normalize_address("б-р Шевченка 1") == "бульвар шевченка 1"
+    assert normalize_address("вул. Об’їзна 2") == normalize_address("вул. Об'їзна 2")
+
+
+def test_normalize_keeps_building_letters():
+    assert normalize_address("вул. Незалежності, буд. 36") == "вулиця незалежності 36"
+    assert normalize_address("вул. Незалежності, б. 36") == "вулиця незалежності 36"
+    assert normalize_address("вул. Незалежності 36 б") == "вулиця незалежності 36 б"
+    assert normalize_address("вул. Незалежності 36 б") != normalize_address("вул. Незалежності 36")
+    assert normalize_address("вул. Незалежності 36б") == "вулиця незалежності 36б"
+
+
+def test_normalize_leaves_pr_alone():
+    # "пр." is as often "провулок" as "проспект"
+    assert normalize_address("пр. Миру 5") == "пр миру 5"
+
+
+def test_equivalent_addresses_share_one_lookup():
+    async def run():
+        provider = FakeProvider()
+        geocoder = Geocoder(provider)
+        first = await geocoder.geocode("вул. Незалежності, 36")
+        second = await geocoder.geocode("вулиця незалежності 36")
+        other = await geocoder.geocode("вул. Незалежності, 36 б")
+        return provider.calls, first, second, other
+
+    calls, first, second, other = asyncio.run(run())
+    assert first == second == other == (48.92, 24.71)
+    assert calls == ["вул. Незалежності, 36", "вул. Незалежності, 36 б"]
+
+
+def test_concurrent_lookups_are_coalesced():
+    async def run():
+        provider = FakeProvider()
+        geocoder = Geocoder(provider)
+        results = await asyncio.gather(*(geocoder.geocode("вул. Миру 5") for _ in range(10)))
+        return provider.calls, results
+
+    calls, results = asyncio.run(run())
+    assert len(calls) == 1
+    assert set(results) == {(48.92, 24.71)}
+
+
+def test_not_found_is_cached():
+    async def run():
+        provider = FakeProvider(result=None)
+        geocoder = Geocoder(provider)
+        results = [await geocoder.geocode("вул. Неіснуюча 1") for _ in range(3)]
+        return provider.calls, results
+
+    calls, results = asyncio.run(run())
+    assert results == [None, None, None]
+    assert len(calls) == 1
+
+
+def test_provider_error_returns_none():
+    async def run():
+        geocoder = Geocoder(FakeProvider(error=GeocodingError("OVER_QUERY_LIMIT")))
+        return await geocoder.geocode("вул. Миру 5")
+
+    assert asyncio.run(run()) is None
+
+
+def test_provider_without_geocode_cannot_be_created():
+    class IncompleteProvider(GeocodingProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteProvider()
@@ -0,0 +1,91 @@
+"""One pub/sub subscription per worker dispatching to per-channel handlers"""
+import asyncio
+import json
+
+from backend.config import CHANNEL_CACHE, CHANNEL_MENU, CHANNEL_PROMO, CHANNEL_SETTINGS, CHANNEL_ZONES
+from backend.menu_cache import menu_cache
+from backend.redis_manager import RedisManager, redis_manager
+from backend.settings_service import settings_service
+from backend.utils.promo import promo_table
+from backend.utils.zones import zone_index
+
+
+class FakePubSub:
+    def __init__(self, broker):
+        self.broker = broker
+        self.channels = []
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, *channels):
+        self.channels = list(channels)
+        self.broker.subscriptions.append(self)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        self.broker.subscriptions.remove(self)
+
+
+class FakeBroker:
+    def __init__(self):
+        self.subscriptions = []
+
+    def pubsub(self):
+        return FakePubSub(self)
+
+    async def publish(self, channel, data):
+        for pubsub in self.subscriptions:
+            if channel in pubsub.channels:
+                await pubsub.queue.put({"type": "message", "channel": channel, "data": data})
+
+
+def test_one_subscription_serves_every_channel():
+    async def run():
+        manager = RedisManager()
+        manager.redis = FakeBroker()
+        seen = []
+
+        async def on_menu(data):
+            seen.append(("menu", data))
+
+        async def on_zones(data):
+            seen.append(("zones", data))
+            raise RuntimeError("a failing handler doesn't stop the listener")
+
+        manager.on_invalidation(CHANNEL_MENU, on_menu)
+        manager.on_invalidation(CHANNEL_ZONES, on_zones)
+        manager._local["menu"] = ("cached", 0, 0)
+        listener = asyncio.create_task(manager._listen_invalidations())
+        await asyncio.sleep(0.01)
+        subscriptions = list(manager.redis.subscriptions)
+
+        await manager.publish(CHANNEL_ZONES, {"type": "zones_invalidated"})
+        await manager.publish(CHANNEL_MENU, {"type": "menu_invalidated"})
+        manager._local["menu"] = ("cached", 0, 0)
+        await manager.publish(CHANNEL_CACHE, {"keys": ["menu"]})
+        await asyncio.sleep(0.01)
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+        return subscriptions, seen, dict(manager._local)
+
+    subscriptions, seen, local = asyncio.run(run())
+    assert len(subscriptions) == 1
+    assert set(subscriptions[0].channels) == {CHANNEL_CACHE, CHANNEL_MENU, CHANNEL_ZONES}
+    # Every handler is told about the (re)subscribe first, then gets its messages
+    assert seen[:2] == [("menu", None), ("zones", None)]
+    assert [(name, json.loads(data)) for name, data in seen[2:]] == [
+        ("zones", {"type": "zones_invalidated"}),
+        ("menu", {"type": "menu_invalidated"}),
+    ]
+    assert local == {}
+
+
+def test_services_register_with_the_shared_listener():
+    handlers = redis_manager._invalidation_handlers
+    assert set(handlers) >= {CHANNEL_CACHE, CHANNEL_SETTINGS, CHANNEL_MENU, CHANNEL_ZONES, CHANNEL_PROMO}
+    assert handlers[CHANNEL_SETTINGS] == settings_service._on_invalidation
+    assert handlers[CHANNEL_MENU] == menu_cache._on_invalidation
+    assert handlers[CHANNEL_ZONES] == zone_index._on_invalidation
+    assert handlers[CHANNEL_PROMO] == promo_table._on_invalidation
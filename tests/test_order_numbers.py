@@ -0,0 +1,124 @@
+"""Concurrent order number allocation against an in-memory counters collection"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from backend import database
+from backend.utils import order_helpers
+from backend.utils.order_helpers import OrderNumberAllocator
+
+NOW = datetime(2026, 3, 1, 12, 30)
+
+
+class FakeCounters:
+    """The counters operations the allocator uses, yielding to the event
+    loop around every round-trip like a real driver does"""
+
+    def __init__(self):
+        self.docs = {}
+        self.inflight = 0
+        self.max_inflight = 0
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(0)
+        return self.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        await asyncio.sleep(0)
+        if query["_id"] not in self.docs and upsert:
+            self.docs[query["_id"]] = {"_id": query["_id"], **update["$setOnInsert"]}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        self.inflight += 1
+        self.max_inflight = max(self.max_inflight, self.inflight)
+        await asyncio.sleep(0)
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], "seq": 0})
+        doc["seq"] += update["$inc"]["seq"]
+        result = dict(doc)
+        await asyncio.sleep(0)
+        self.inflight -= 1
+        return result
+
+
+class FakeOrders:
+    def __init__(self, existing=0):
+        self.existing = existing
+
+    async def count_documents(self, query):
+        await asyncio.sleep(0)
+        return self.existing
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    fake = FakeCounters()
+    monkeypatch.setattr(database, "connected", True)
+    monkeypatch.setattr(database, "counters", fake)
+    monkeypatch.setattr(database, "orders", FakeOrders(existing=7))
+    return fake
+
+
+@pytest.mark.parametrize("block_size", [1, 5])
+def test_concurrent_numbers_are_unique_and_gap_free(counters, block_size):
+    async def run():
+        # Two workers sharing one counter document
+        workers = [OrderNumberAllocator(block_size), OrderNumberAllocator(block_size)]
+        return await asyncio.gather(*(workers[n % 2].next(NOW) for n in range(200)))
+
+    numbers = asyncio.run(run())
+    assert sorted(numbers) == list(range(8, 208))
+
+
+def test_single_numbers_are_not_serialized(counters):
+    async def run():
+        allocator = OrderNumberAllocator(1)
+        return await asyncio.gather(*(allocator.next(NOW) for _ in range(50)))
+
+    numbers = asyncio.run(run())
+    assert len(set(numbers)) == 50
+    assert counters.max_inflight > 1
+
+
+def test_generate_order_numbers_reserves_a_block(counters, monkeypatch):
+    monkeypatch.setattr(order_helpers, "order_number_allocator", OrderNumberAllocator(1))
+
+    async def run():
+        batches = await asyncio.gather(*(order_helpers.generate_order_numbers(10, NOW) for _ in range(5)))
+        single = await order_helpers.generate_order_number()
+        return batches, single
+
+    batches, single = asyncio.run(run())
+    numbers = [n for batch in batches for n in batch]
+    assert sorted(numbers) == [f"ORD-20260301-{n:03d}" for n in range(8, 58)]
+    for batch in batches:
+        # One $inc per batch: its numbers are consecutive
+        seqs = [int(n.rsplit("-", 1)[1]) for n in batch]
+        assert seqs == list(range(seqs[0], seqs[0] + 10))
+    assert single.startswith("ORD-")
+
+
+@pytest.mark.parametrize("block_size", [1, 5])
+def test_thousands_of_mixed_allocations_are_unique(counters, block_size):
+    workers = [OrderNumberAllocator(block_size) for _ in range(4)]
+
+    async def allocate(n):
+        worker = workers[n % len(workers)]
+        if n % 3 == 0:
+            return await worker.next_many(NOW, 1 + n % 7)
+        return [await worker.next(NOW)]
+
+    async def run():
+        return await asyncio.gather(*(allocate(n) for n in range(3000)))
+
+    batches = asyncio.run(run())
+    numbers = [number for batch in batches for number in batch]
+    assert len(numbers) == len(set(numbers))
+    issued = counters.docs["orders:20260301"]["seq"]
+    unused = set(range(8, issued + 1)) - set(numbers)
+    if block_size == 1:
+        # No block held in memory: every reserved number was handed out
+        assert not unused
+    else:
+        # Only the rest of each worker's current block is still unused
+        assert len(unused) < len(workers) * block_size
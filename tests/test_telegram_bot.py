@@ -0,0 +1,131 @@
+"""TelegramNotifier against a local fake Bot API server"""
+import asyncio
+import time
+
+from aiohttp import web
+
+from backend import jobs, telegram_bot
+from backend.config import JOB_WORKERS
+from backend.job_queue import JobQueue, JOBS_QUEUE
+from backend.redis_manager import redis_manager
+from backend.telegram_bot import TelegramNotifier, TELEGRAM_DEAD, TELEGRAM_PENDING, MAX_DIGEST_ATTEMPTS
+from fake_redis import FakeRedis
+
+
+class FakeTelegram:
+    """Answers sendMessage with the queued (status, body) responses, then 200"""
+
+    def __init__(self, responses=()):
+        self.responses = list(responses)
+        self.messages = []
+
+    async def send_message(self, request):
+        self.messages.append(await request.json())
+        if self.responses:
+            status, body = self.responses.pop(0)
+            return web.json_response(body, status=status)
+        return web.json_response({"ok": True, "result": {}})
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/sendMessage", self.send_message)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def _notifier(url, digest_window=0.05):
+    return TelegramNotifier(token="TOKEN", chat_id="42", api_url=url, digest_window=digest_window)
+
+
+async def _until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_rate_limit_is_retried_after_retry_after():
+    async def run():
+        async with FakeTelegram([(429, {"ok": False, "parameters": {"retry_after": 1}})]) as server:
+            notifier = _notifier(server.url)
+            started = time.monotonic()
+            assert await notifier.enqueue("hello", "hello")
+            await _until(lambda: notifier.metrics["sent"])
+            elapsed = time.monotonic() - started
+            await notifier.close()
+            return server.messages, elapsed, notifier.metrics
+
+    messages, elapsed, metrics = asyncio.run(run())
+    assert len(messages) == 2
+    assert elapsed >= 1
+    assert metrics["rate_limited"] == 1 and metrics["sent"] == 1
+
+
+def test_burst_through_job_queue_collapses_into_one_digest(monkeypatch):
+    order = {"items": [], "total": 100, "order_type": "dine_in"}
+
+    async def run():
+        monkeypatch.setattr(redis_manager, "redis", FakeRedis())
+        async with FakeTelegram() as server:
+            notifier = _notifier(server.url, digest_window=0.5)
+            monkeypatch.setattr(telegram_bot, "notifier", notifier)
+            queue = JobQueue(workers=JOB_WORKERS)
+            queue.handlers = jobs.job_queue.handlers
+            await queue.start()
+            try:
+                started = time.monotonic()
+                for n in range(20):
+                    await queue.enqueue(jobs.JOB_TELEGRAM_NEW_ORDER, {"order": {**order, "order_number": f"ORD-{n}"}})
+                # Jobs only buffer the line: the workers are free long before the window ends
+                await _until(lambda: not redis_manager.redis.data.get(JOBS_QUEUE)
+                             and len(redis_manager.redis.data.get(TELEGRAM_PENDING, [])) == 20)
+                drained = time.monotonic() - started
+                await _until(lambda: server.messages)
+                await asyncio.sleep(0.6)  # one more window: nothing else is sent
+            finally:
+                await queue.stop()
+                await notifier.close()
+            return server.messages, drained, notifier.metrics
+
+    messages, drained, metrics = asyncio.run(run())
+    assert drained < 0.5
+    assert len(messages) == 1
+    assert "20 нових сповіщень" in messages[0]["text"]
+    assert metrics["coalesced"] == 19
+
+
+def test_failed_digest_is_retried_then_dead_lettered(monkeypatch):
+    async def run():
+        redis = FakeRedis()
+        monkeypatch.setattr(redis_manager, "redis", redis)
+        rejected = [(400, {"ok": False, "description": "chat not found"})] * MAX_DIGEST_ATTEMPTS
+        async with FakeTelegram(rejected) as server:
+            notifier = _notifier(server.url, digest_window=60)
+            await notifier.enqueue("hello", "hello")
+            for _ in range(MAX_DIGEST_ATTEMPTS - 1):
+                await notifier.flush()
+                assert len(redis.data[TELEGRAM_PENDING]) == 1
+            await notifier.flush()
+            await notifier.close()
+            return server.messages, redis.data, notifier.metrics
+
+    messages, data, metrics = asyncio.run(run())
+    assert len(messages) == MAX_DIGEST_ATTEMPTS
+    assert data[TELEGRAM_PENDING] == []
+    assert len(data[TELEGRAM_DEAD]) == 1
+    assert metrics["dead"] == 1
+
+
+def test_unconfigured_notifier_skips_queueing():
+    async def run():
+        return await TelegramNotifier(token="", chat_id="").enqueue("hello", "hello")
+
+    assert asyncio.run(run()) is False
@@ -0,0 +1,50 @@
+"""/ws topic scoping and cleanup"""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.config import WS_STAFF_TOKEN
+from backend.main import app
+from backend.websocket_hub import websocket_hub
+
+
+def _subscriptions(ws, topics):
+    ws.send_text(json.dumps({"action": "subscribe", "topics": topics}))
+    while True:
+        message = json.loads(ws.receive_text())
+        if message["type"] == "subscriptions":
+            return message["topics"]
+
+
+def test_unscoped_socket_gets_no_topics_and_cannot_join_kitchen():
+    client = TestClient(app)
+    with client.websocket_connect("/ws") as ws:
+        assert _subscriptions(ws, ["kitchen", "order:1"]) == ["order:1"]
+
+
+def test_tracking_socket_is_scoped_to_its_order():
+    client = TestClient(app)
+    with client.websocket_connect("/ws?order_id=42") as ws:
+        assert _subscriptions(ws, []) == ["order:42"]
+
+
+def test_staff_socket_gets_the_kitchen():
+    client = TestClient(app)
+    with client.websocket_connect(f"/ws?token={WS_STAFF_TOKEN}") as ws:
+        assert _subscriptions(ws, []) == ["kitchen"]
+    with client.websocket_connect("/ws?token=wrong") as ws:
+        assert _subscriptions(ws, ["kitchen"]) == []
+
+
+def test_failed_replay_unregisters_the_client(monkeypatch):
+    async def broken_replay(client, since):
+        raise ConnectionError("redis went away")
+
+    monkeypatch.setattr(websocket_hub, "replay", broken_replay)
+    client = TestClient(app)
+    with pytest.raises(Exception):
+        with client.websocket_connect(f"/ws?token={WS_STAFF_TOKEN}&since=1-0") as ws:
+            ws.receive_text()
+    assert not websocket_hub.clients
+    assert not websocket_hub.subscribers
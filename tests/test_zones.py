@@ -0,0 +1,53 @@
+"""Zone index: detection over the enabled zones"""
+import asyncio
+
+from backend import database
+from backend.utils.zones import circle_to_polygon, zone_index
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda d: d[key] * direction)
+        return self
+
+    async def to_list(self):
+        return self.docs
+
+
+class FakeZones:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query):
+        return FakeCursor([d for d in self.docs if d["enabled"] == query["enabled"]])
+
+
+def _zone(zone_id, priority, geometry):
+    return {"_id": zone_id, "priority": priority, "enabled": True, "geometry": geometry}
+
+
+def test_malformed_zones_are_skipped(monkeypatch):
+    center = {"type": "Polygon", "coordinates": circle_to_polygon(48.92, 24.71, 2.0)}
+    monkeypatch.setattr(database, "delivery_zones", FakeZones([
+        _zone("empty", 0, {"type": "Polygon", "coordinates": []}),
+        _zone("no-outer", 1, {"type": "Polygon", "coordinates": [[]]}),
+        _zone("missing", 2, {"type": "MultiPolygon"}),
+        _zone("no-geometry", 3, None),
+        _zone("bad-point", 4, {"type": "Polygon", "coordinates": [[[24.7], [24.8, 48.9]]]}),
+        _zone("not-a-number", 5, {"type": "Polygon", "coordinates": [[["x", "y"]]]}),
+        _zone("center", 6, center),
+    ]))
+    zone_index._drop()
+
+    async def run():
+        return await zone_index.detect_many([(48.92, 24.71), (50.45, 30.52)])
+
+    try:
+        inside, outside = asyncio.run(run())
+    finally:
+        zone_index._drop()
+    assert inside["_id"] == "center"
+    assert outside is None